@@ -110,3 +110,42 @@ def compute_gradient(X, y, w, b):
 
     return dj_db,dj_dw
 
+
+def compute_cost_surface(X, y, w, b, max_bytes=2**25):
+    """
+    Computes the cost J(w,b) at many parameter points (e.g. a meshgrid) in one broadcasted pass
+    Args:
+      X (ndarray (m,) or (m,n)): Data, m examples (with n features)
+      y (ndarray (m,)) : target values
+      w (ndarray (...) or (...,n)): model parameters at each point; scalar per point when X is (m,)
+      b (ndarray (...)) : model parameter at each point, broadcastable against w
+      max_bytes (int)  : points are evaluated in chunks so the (points, m) error block stays below this size
+    Returns
+      cost (ndarray (...)): cost at each point
+    """
+    X, y, w, b, shape = _surface_points(X, y, w, b)
+    m = X.shape[0]
+    cost = np.empty(len(b))
+    rows = max(1, max_bytes // (8 * m))
+    for start in range(0, len(b), rows):
+        err = w[start:start+rows] @ X.T           #(rows,n)(n,m)=(rows,m)
+        err += b[start:start+rows, np.newaxis]
+        err -= y
+        cost[start:start+rows] = np.einsum('ij,ij->i', err, err)
+    cost /= 2*m
+    return cost.reshape(shape)
+
+def _surface_points(X, y, w, b):
+    """ flattens broadcast (w,b) points to w (P,n), b (P,); returns X as (m,n) and the grid shape """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    w = np.asarray(w, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if X.ndim == 1:
+        X = X[:, np.newaxis]
+        w = w[..., np.newaxis]
+    n = X.shape[1]
+    shape = np.broadcast_shapes(w.shape[:-1], b.shape)
+    w = np.broadcast_to(w, shape + (n,)).reshape(-1, n)
+    b = np.broadcast_to(b, shape).reshape(-1)
+    return X, y, w, b, shape
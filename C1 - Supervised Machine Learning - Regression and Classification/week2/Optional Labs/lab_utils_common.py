@@ -110,3 +110,236 @@ def compute_gradient(X, y, w, b):
 
     return dj_db,dj_dw
 
+
+class CostStats:
+    """
+    Sufficient statistics of a training set for squared-error linear regression.
+    J(w,b) and its gradient depend on the data only through m, the feature and target means,
+    and the centered moments X'X, X'y, y'y, so once these are accumulated any number of (w,b)
+    points can be evaluated in O(n^2) each, independent of m.
+    The moments are kept about the means (equivalent to X'X, X'y, y'y, sum(x), sum(y)), which avoids
+    the cancellation the raw sums suffer near the minimum. Data can be added in chunks with update().
+    """
+    def __init__(self, X=None, y=None):
+        self.m = 0
+        self.scalar_w = None      # True when X is (m,) and w is a scalar per point
+        self.x_mean = self.y_mean = None
+        self.Sxx = self.Sxy = None
+        self.Syy = 0.0
+        if X is not None:
+            self.update(X, y)
+
+    def update(self, X, y):
+        """
+        Adds examples to the statistics (pairwise merge of means and centered moments)
+        Args:
+          X (ndarray (k,) or (k,n)): examples
+          y (ndarray (k,))         : target values
+        Returns
+          self
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self.scalar_w is None:
+            self.scalar_w = X.ndim == 1
+        if X.ndim == 1:
+            X = X[:, np.newaxis]
+        k = X.shape[0]
+        if k == 0:
+            return self
+        x_mean = X.mean(axis=0)
+        y_mean = y.mean()
+        Xc = X - x_mean
+        yc = y - y_mean
+        Sxx = Xc.T @ Xc
+        Sxy = Xc.T @ yc
+        Syy = yc @ yc
+        if self.m == 0:
+            self.m, self.x_mean, self.y_mean = k, x_mean, y_mean
+            self.Sxx, self.Sxy, self.Syy = Sxx, Sxy, Syy
+            return self
+        m = self.m + k
+        dx = x_mean - self.x_mean
+        dy = y_mean - self.y_mean
+        f = self.m * k / m
+        self.Sxx = self.Sxx + Sxx + f * np.outer(dx, dx)
+        self.Sxy = self.Sxy + Sxy + f * dx * dy
+        self.Syy = self.Syy + Syy + f * dy * dy
+        self.x_mean = self.x_mean + dx * (k / m)
+        self.y_mean = self.y_mean + dy * (k / m)
+        self.m = m
+        return self
+
+    def _points(self, w, b):
+        w = np.asarray(w, dtype=float)
+        b = np.asarray(b, dtype=float)
+        if self.scalar_w:
+            w = w[..., np.newaxis]
+        n = len(self.x_mean)
+        shape = np.broadcast_shapes(w.shape[:-1], b.shape)
+        return np.broadcast_to(w, shape + (n,)).reshape(-1, n), np.broadcast_to(b, shape).reshape(-1), shape
+
+    def cost(self, w, b):
+        """
+        Computes J(w,b) at any number of points (w and b broadcast against each other)
+        Args:
+          w (ndarray (...) or (...,n)): model parameters at each point
+          b (ndarray (...))           : model parameter at each point
+        Returns
+          cost (ndarray (...)): cost at each point
+        """
+        W, B, shape = self._points(w, b)
+        r = W @ self.x_mean + B - self.y_mean          # mean residual at each point
+        quad = np.einsum('pi,ij,pj->p', W, self.Sxx, W)
+        cost = (quad - 2 * (W @ self.Sxy) + self.Syy + self.m * r**2) / (2 * self.m)
+        return np.maximum(cost, 0).reshape(shape)
+
+    def gradient(self, w, b):
+        """
+        Computes the gradient of J(w,b) at any number of points
+        Args:
+          w (ndarray (...) or (...,n)): model parameters at each point
+          b (ndarray (...))           : model parameter at each point
+        Returns
+          dj_db (ndarray (...)):            The gradient of the cost w.r.t. the parameter b.
+          dj_dw (ndarray (...) or (...,n)): The gradient of the cost w.r.t. the parameters w.
+        """
+        W, B, shape = self._points(w, b)
+        r = W @ self.x_mean + B - self.y_mean
+        dj_dw = (W @ self.Sxx - self.Sxy) / self.m + r[:, np.newaxis] * self.x_mean
+        dj_dw = dj_dw.reshape(shape) if self.scalar_w else dj_dw.reshape(shape + (len(self.x_mean),))
+        return r.reshape(shape), dj_dw
+
+
+class TrainingHistory:
+    """
+    Bounded record of a training run backed by one preallocated structured array
+    (fields iter, cost and, when w_shape is given, w, b, dj_dw, dj_db).
+    Every `every`-th iteration is recorded; what happens once `capacity` records are held depends on mode:
+      'decimate': drop every other record and double `every`, so the whole run stays covered
+      'ring'    : keep the most recent `capacity` records
+      'spill'   : append the records to the .npy file `path` and start over; call close() at the end
+                  (or use the history in a with block), then load() returns the whole run
+    w_shape is the shape of w, () for a scalar w.
+    Memory stays flat however many iterations are run. Fields are read as zero-copy views,
+    e.g. hist["cost"], hist["w"][:,0]; hist["params"] and hist["grads"] yield (w, b) and (dj_dw, dj_db) pairs.
+    In spill mode these views only cover the records not yet written to the file; use load() for the full run.
+    """
+    def __init__(self, w_shape=None, capacity=100000, every=1, mode='decimate', path=None, dtype=np.float64):
+        if mode not in ('decimate', 'ring', 'spill'):
+            raise ValueError(f"unknown mode {mode!r}")
+        if mode == 'spill' and path is None:
+            raise ValueError("mode 'spill' needs a path")
+        fields = [('iter', np.int64), ('cost', dtype)]
+        if w_shape is not None:
+            w_shape = tuple(w_shape) if np.iterable(w_shape) else (int(w_shape),)
+            fields += [('w', dtype, w_shape), ('b', dtype), ('dj_dw', dtype, w_shape), ('dj_db', dtype)]
+        self.dtype = np.dtype(fields)
+        self.capacity = int(capacity)
+        self.every = max(int(every), 1)
+        self.mode = mode
+        self.path = path
+        self.spilled = 0          # records already written to path
+        # ring mode writes each record twice, at k and k+capacity, so the newest `capacity`
+        # records are always one contiguous slice
+        self._data = np.zeros(2 * self.capacity if mode == 'ring' else self.capacity, dtype=self.dtype)
+        self._start = 0
+        self._n = 0
+        self._file = None
+
+    def due(self, i):
+        """ True when iteration i will be recorded (lets callers skip computing the cost otherwise) """
+        return i % self.every == 0
+
+    def record(self, i, cost, w=None, b=None, dj_dw=None, dj_db=None):
+        """ Records iteration i if it is due; w, b, dj_dw, dj_db are copied into the buffer """
+        if i % self.every:
+            return
+        if self._n == self.capacity:
+            self._full()
+            if i % self.every:
+                return
+        row = (i, cost) if len(self.dtype) == 2 else (i, cost, w, b, dj_dw, dj_db)
+        if self.mode == 'ring':
+            k = (self._start + self._n) % self.capacity
+            self._data[k] = self._data[k + self.capacity] = row
+            if self._n == self.capacity:
+                self._start = (self._start + 1) % self.capacity
+                return
+        else:
+            self._data[self._n] = row
+        self._n += 1
+
+    def _full(self):
+        if self.mode == 'decimate':
+            kept = (self._n + 1) // 2
+            self._data[:kept] = self._data[:self._n:2]
+            self._n = kept
+            self.every *= 2
+        elif self.mode == 'spill':
+            self._write(self._data[:self._n])
+            self._n = 0
+
+    def _write(self, records):
+        if self._file is None:
+            if self.spilled:
+                # reopened after close(): append to the records already in the file
+                self._file = open(self.path, 'r+b')
+                self._file.seek(0, 2)
+            else:
+                self._file = open(self.path, 'wb')
+                self._header()
+        records.tofile(self._file)
+        self.spilled += len(records)
+
+    def _header(self):
+        self._file.seek(0)
+        np.lib.format.write_array_header_1_0(self._file, {'descr': np.lib.format.dtype_to_descr(self.dtype),
+                                                          'fortran_order': False, 'shape': (self.spilled,)})
+        self._file.seek(0, 2)
+
+    def flush(self):
+        """ spill mode: writes the buffered records and updates the .npy header (readable with load()) """
+        if self.mode != 'spill' or (self._file is None and self._n == 0):
+            return
+        self._write(self._data[:self._n])
+        self._n = 0
+        self._header()
+        self._file.flush()
+
+    def close(self):
+        """ spill mode: flushes and closes the file; recording afterwards appends to it again """
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self, mmap_mode='r'):
+        """ all records of a spilled run, memory-mapped from path (closes the file first) """
+        self.close()
+        return np.load(self.path, mmap_mode=mmap_mode)
+
+    @property
+    def records(self):
+        """ records held in memory, oldest first (a view, no copy); in spill mode only the unflushed tail """
+        return self._data[self._start:self._start + self._n]
+
+    def __len__(self):
+        return self._n
+
+    def keys(self):
+        names = list(self.dtype.names)
+        return names + ['params', 'grads'] if 'w' in names else names
+
+    def __getitem__(self, key):
+        if key == 'params':
+            return self.records[['w', 'b']]
+        if key == 'grads':
+            return self.records[['dj_dw', 'dj_db']]
+        return self.records[key]
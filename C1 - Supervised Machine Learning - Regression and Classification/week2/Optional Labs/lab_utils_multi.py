@@ -1,10 +1,12 @@
 import numpy as np
 import copy
 import math
+from itertools import islice
 from scipy.stats import norm
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import axes3d
 from matplotlib.ticker import MaxNLocator
+from lab_utils_common import CostStats, TrainingHistory
 dlblue = '#0096ff'; dlorange = '#FF9300'; dldarkred='#C00000'; dlmagenta='#FF40FF'; dlpurple='#7030A0'; 
 plt.style.use('./deeplearning.mplstyle')
 
@@ -69,11 +71,7 @@ def plt_contour_wgrad(x, y, hist, ax, w_range=[-100, 500, 5], b_range=[-500, 500
                 contours = [0.1,50,1000,5000,10000,25000,50000], 
                       resolution=5, w_final=200, b_final=100,step=10 ):
     b0,w0 = np.meshgrid(np.arange(*b_range),np.arange(*w_range))
-    z=np.zeros_like(b0)
-    n,_ = w0.shape
-    for i in range(w0.shape[0]):
-        for j in range(w0.shape[1]):
-            z[i][j] = compute_cost(x, y, w0[i][j], b0[i][j] )
+    z = CostStats(x, y).cost(w0, b0)
    
     CS = ax.contour(w0, b0, z, contours, linewidths=2,
                    colors=[dlblue, dlorange, dldarkred, dlmagenta, dlpurple]) 
@@ -97,21 +95,19 @@ def plt_contour_wgrad(x, y, hist, ax, w_range=[-100, 500, 5], b_range=[-500, 500
 
 
 # plots p1 vs p2. Prange is an array of entries [min, max, steps]. In feature scaling lab.
-def plt_contour_multi(x, y, w, b, ax, prange, p1, p2, title="", xlabel="", ylabel=""): 
+# stats: optional CostStats of (x,y); the grid is evaluated from it in O(n^2) per point, independent of m
+def plt_contour_multi(x, y, w, b, ax, prange, p1, p2, title="", xlabel="", ylabel="", stats=None): 
     contours = [1e2, 2e2,3e2,4e2, 5e2, 6e2, 7e2,8e2,1e3, 1.25e3,1.5e3, 1e4, 1e5, 1e6, 1e7]
     px,py = np.meshgrid(np.linspace(*(prange[p1])),np.linspace(*(prange[p2])))
-    z=np.zeros_like(px)
-    n,_ = px.shape
-    for i in range(px.shape[0]):
-        for j in range(px.shape[1]):
-            w_ij = w
-            b_ij = b
-            if p1 <= 3: w_ij[p1] = px[i,j]
-            if p1 == 4: b_ij = px[i,j]
-            if p2 <= 3: w_ij[p2] = py[i,j]
-            if p2 == 4: b_ij = py[i,j]
-                
-            z[i][j] = compute_cost(x, y, w_ij, b_ij )
+    # parameters at every grid point: w, b with p1/p2 replaced by the grid values
+    w_ij = np.broadcast_to(np.asarray(w, dtype=float), px.shape + (len(w),)).copy()
+    b_ij = np.full(px.shape, float(b))
+    if p1 <= 3: w_ij[..., p1] = px
+    if p1 == 4: b_ij = px
+    if p2 <= 3: w_ij[..., p2] = py
+    if p2 == 4: b_ij = py
+    if stats is None: stats = CostStats(x, y)
+    z = stats.cost(w_ij, b_ij)
     CS = ax.contour(px, py, z, contours, linewidths=2,
                    colors=[dlblue, dlorange, dldarkred, dlmagenta, dlpurple]) 
     ax.clabel(CS, inline=1, fmt='%1.2e', fontsize=10)
@@ -169,12 +165,9 @@ def plt_divergence(p_hist, J_hist, x_train,y_train):
 
     # Print w vs cost to see minimum
     fix_b = 100
+    stats = CostStats(x_train, y_train)
     w_array = np.arange(-70000, 70000, 1000)
-    cost = np.zeros_like(w_array)
-
-    for i in range(len(w_array)):
-        tmp_w = w_array[i]
-        cost[i] = compute_cost(x_train, y_train, tmp_w, fix_b)
+    cost = stats.cost(w_array, fix_b)
 
     ax.plot(w_array, cost)
     ax.plot(x,v, c=dlmagenta)
@@ -188,10 +181,7 @@ def plt_divergence(p_hist, J_hist, x_train,y_train):
     #===============
 
     tmp_b,tmp_w = np.meshgrid(np.arange(-35000, 35000, 500),np.arange(-70000, 70000, 500))
-    z=np.zeros_like(tmp_b)
-    for i in range(tmp_w.shape[0]):
-        for j in range(tmp_w.shape[1]):
-            z[i][j] = compute_cost(x_train, y_train, tmp_w[i][j], tmp_b[i][j] )
+    z = stats.cost(tmp_w, tmp_b)
 
     ax = fig.add_subplot(gs[2:], projection='3d')
     ax.plot_surface(tmp_w, tmp_b, z,  alpha=0.3, color=dlblue)
@@ -222,6 +212,21 @@ def add_line(dj_dx, x1, y1, d, ax):
             arrowprops=dict(arrowstyle="->"),
             horizontalalignment='left', verticalalignment='top')
 
+def _cost_curve(x_train, y_train, f_compute_cost, w_array, fix_b):
+    """
+    Cost at each w in w_array with b fixed, as computed by f_compute_cost
+    With b fixed the cost is a quadratic in w, so a cost function that agrees with the library cost at
+    three values of w (e.g. the compute_cost written in the lab) agrees at all of them: the whole curve
+    is then computed in one broadcasted pass. Any other function is evaluated one point at a time.
+    """
+    cost = CostStats(x_train, y_train).cost(w_array, fix_b)
+    if f_compute_cost is compute_cost:
+        return cost
+    probes = [0, len(w_array)//2, len(w_array)-1]
+    if np.allclose([f_compute_cost(x_train, y_train, w_array[i], fix_b) for i in probes], cost[probes]):
+        return cost
+    return np.array([f_compute_cost(x_train, y_train, w, fix_b) for w in w_array])
+
 def plt_gradients(x_train,y_train, f_compute_cost, f_compute_gradient):
     #===============
     #  First subplot
@@ -232,11 +237,7 @@ def plt_gradients(x_train,y_train, f_compute_cost, f_compute_gradient):
     fix_b = 100
     w_array = np.linspace(-100, 500, 50)
     w_array = np.linspace(0, 400, 50)
-    cost = np.zeros_like(w_array)
-
-    for i in range(len(w_array)):
-        tmp_w = w_array[i]
-        cost[i] = f_compute_cost(x_train, y_train, tmp_w, fix_b)
+    cost = _cost_curve(x_train, y_train, f_compute_cost, w_array, fix_b)
     ax[0].plot(w_array, cost,linewidth=1)
     ax[0].set_title("Cost vs w, with gradient; b set to 100")
     ax[0].set_ylabel('Cost')
@@ -285,10 +286,12 @@ def norm_plot(ax, data):
     axr.axis('off')
     
 def plot_cost_i_w(X,y,hist):
-    ws = np.array([ p[0] for p in hist["params"]])
+    ws = hist["w"] if isinstance(hist, TrainingHistory) else np.array([ p[0] for p in hist["params"]])
     rng = max(abs(ws[:,0].min()),abs(ws[:,0].max()))
     wr = np.linspace(-rng+0.27,rng+0.27,20)
-    cst = [compute_cost(X,y,np.array([wr[i],-32, -67, -1.46]), 221) for i in range(len(wr))]
+    w_i = np.tile(np.array([0., -32, -67, -1.46]), (len(wr), 1))
+    w_i[:,0] = wr
+    cst = CostStats(X, y).cost(w_i, 221)
 
     fig,ax = plt.subplots(1,2,figsize=(12,3))
     ax[0].plot(hist["iter"], (hist["cost"]));  ax[0].set_title("Cost vs Iteration")
@@ -303,7 +306,17 @@ def plot_cost_i_w(X,y,hist):
 # Regression Routines
 ##########################################################
 
-def compute_gradient_matrix(X, y, w, b): 
+def _residual(X, y, w, b, scratch=None):
+    """ f_wb - y for all examples, written into scratch (shape (m,), or (m,1) for a column w) when given """
+    if X.ndim == 1:
+        err = np.multiply(X, w, out=scratch)
+    else:
+        err = np.matmul(X, w, out=scratch)
+    err += b
+    err -= y
+    return err
+
+def compute_gradient_matrix(X, y, w, b, out=None, scratch=None): 
     """
     Computes the gradient for linear regression 
  
@@ -312,64 +325,69 @@ def compute_gradient_matrix(X, y, w, b):
       y : (array_like Shape (m,1)) actual value 
       w : (array_like Shape (n,1)) Values of parameters of the model      
       b : (scalar )                Values of parameter of the model      
+      out : (array_like Shape (n,1)) optional, receives dj_dw (same shape as w)
+      scratch : (array_like Shape (m,1)) optional work buffer for the errors (same shape as X @ w)
     Returns
       dj_dw: (array_like Shape (n,1)) The gradient of the cost w.r.t. the parameters w. 
       dj_db: (scalar)                The gradient of the cost w.r.t. the parameter b. 
-                                  
+    y and w may also be 1-D, shapes (m,) and (n,); dj_dw then has shape (n,)
     """
-    m,n = X.shape
-    f_wb = X @ w + b              
-    e   = f_wb - y                
-    dj_dw  = (1/m) * (X.T @ e)    
-    dj_db  = (1/m) * np.sum(e)    
+    m = X.shape[0]
+    e = _residual(X, y, w, b, scratch)
+    if X.ndim == 1:
+        dj_dw = np.dot(e, X) / m
+    else:
+        dj_dw = np.matmul(X.T, e, out=out)   #(n,m)(m,) or (n,m)(m,1)
+        dj_dw /= m
+    dj_db = e.sum() / m
         
     return dj_db,dj_dw
 
 #Function to calculate the cost
-def compute_cost_matrix(X, y, w, b, verbose=False):
+def compute_cost_matrix(X, y, w, b, verbose=False, scratch=None):
     """
     Computes the gradient for linear regression 
      Args:
       X : (array_like Shape (m,n)) variable such as house size 
-      y : (array_like Shape (m,)) actual value 
-      w : (array_like Shape (n,)) parameters of the model 
+      y : (array_like Shape (m,) or (m,1)) actual value 
+      w : (array_like Shape (n,) or (n,1)) parameters of the model 
       b : (scalar               ) parameter of the model 
       verbose : (Boolean) If true, print out intermediate value f_wb
+      scratch : (array_like Shape (m,) or (m,1)) optional work buffer (same shape as X @ w)
     Returns
       cost: (scalar)                      
     """ 
-    m,n = X.shape
+    m = X.shape[0]
 
     # calculate f_wb for all examples.
-    f_wb = X @ w + b  
+    if verbose:
+        print("f_wb:")
+        print(X @ w + b)
     # calculate cost
-    total_cost = (1/(2*m)) * np.sum((f_wb-y)**2)
-
-    if verbose: print("f_wb:")
-    if verbose: print(f_wb)
+    e = _residual(X, y, w, b, scratch)
+    total_cost = np.vdot(e, e) / (2*m)    # vdot flattens, so column vectors work too
         
     return total_cost
 
-# Loop version of multi-variable compute_cost
-def compute_cost(X, y, w, b): 
+# Vectorized multi-variable compute_cost (same results as the loop version in the lab)
+def compute_cost(X, y, w, b, scratch=None): 
     """
     compute cost
     Args:
       X : (ndarray): Shape (m,n) matrix of examples with multiple features
       w : (ndarray): Shape (n)   parameters for prediction   
       b : (scalar):              parameter  for prediction   
+      scratch : (ndarray): Shape (m,) optional work buffer, reused across calls so no memory is allocated;
+                           its dtype (e.g. float32) sets the precision of the computation
     Returns
       cost: (scalar)             cost
     """
     m = X.shape[0]
-    cost = 0.0
-    for i in range(m):                                
-        f_wb_i = np.dot(X[i],w) + b       
-        cost = cost + (f_wb_i - y[i])**2              
-    cost = cost/(2*m)                                 
+    err = _residual(X, y, w, b, scratch)
+    cost = np.vdot(err, err) / (2*m)
     return(np.squeeze(cost)) 
 
-def compute_gradient(X, y, w, b): 
+def compute_gradient(X, y, w, b, out=None, scratch=None): 
     """
     Computes the gradient for linear regression 
     Args:
@@ -377,26 +395,22 @@ def compute_gradient(X, y, w, b):
       y : (ndarray Shape (m,))  target value of each example
       w : (ndarray Shape (n,))  parameters of the model      
       b : (scalar)              parameter of the model      
+      out : (ndarray Shape (n,)) optional, receives dj_dw
+      scratch : (ndarray Shape (m,)) optional work buffer for the errors
     Returns
       dj_dw : (ndarray Shape (n,)) The gradient of the cost w.r.t. the parameters w. 
       dj_db : (scalar)             The gradient of the cost w.r.t. the parameter b. 
     """
-    m,n = X.shape           #(number of examples, number of features)
-    dj_dw = np.zeros((n,))
-    dj_db = 0.
-
-    for i in range(m):                             
-        err = (np.dot(X[i], w) + b) - y[i]   
-        for j in range(n):                         
-            dj_dw[j] = dj_dw[j] + err * X[i,j]    
-        dj_db = dj_db + err                        
-    dj_dw = dj_dw/m                                
-    dj_db = dj_db/m                                
-        
-    return dj_db,dj_dw
+    return compute_gradient_matrix(X, y, w, b, out=out, scratch=scratch)
+
+def _buffer_kwargs(cost_function, gradient_function, scratch, dj_dw):
+    """ work buffers for the routines above; functions written in a lab are called without them """
+    grad_kw = dict(out=dj_dw, scratch=scratch) if gradient_function in (compute_gradient, compute_gradient_matrix) else {}
+    cost_kw = dict(scratch=scratch) if cost_function in (compute_cost, compute_cost_matrix) else {}
+    return cost_kw, grad_kw
 
 #This version saves more values and is more verbose than the assigment versons
-def gradient_descent_houses(X, y, w_in, b_in, cost_function, gradient_function, alpha, num_iters): 
+def gradient_descent_houses(X, y, w_in, b_in, cost_function, gradient_function, alpha, num_iters, hist=None): 
     """
     Performs batch gradient descent to learn theta. Updates theta by taking 
     num_iters gradient steps with learning rate alpha
@@ -410,23 +424,30 @@ def gradient_descent_houses(X, y, w_in, b_in, cost_function, gradient_function,
       gradient_function: function to compute the gradient
       alpha : (float) Learning rate
       num_iters : (int) number of iterations to run gradient descent
+      hist : (TrainingHistory) optional recorder, e.g. a ring or spill mode one for very long runs
     Returns
       w : (array_like Shape (n,)) Updated values of parameters of the model after
           running gradient descent
       b : (scalar)                Updated value of parameter of the model after
           running gradient descent
+      hist : (TrainingHistory)    cost, w, b and gradients at the recorded iterations
     """
     
     # number of training examples
     m = len(X)
     
-    # An array to store values at each iteration primarily for graphing later
-    hist={}
-    hist["cost"] = []; hist["params"] = []; hist["grads"]=[]; hist["iter"]=[];
-    
-    w = copy.deepcopy(w_in)  #avoid modifying global w within function
+    w = np.array(w_in, dtype=X.dtype if X.dtype.kind == 'f' else float)  #avoid modifying global w within function
     b = b_in
-    save_interval = np.ceil(num_iters/10000) # prevent resource exhaustion for long runs
+
+    # Preallocated record of cost, w, b and gradients for graphing later (bounded, see TrainingHistory)
+    if hist is None:
+        hist = TrainingHistory(w.shape, capacity=max(1, min(num_iters, 10000)), every=math.ceil(num_iters/10000))
+
+    # preallocated buffers: the vectorized cost/gradient routines write into these, so the loop allocates nothing
+    scratch = np.empty((m,) + w.shape[1:], dtype=w.dtype)
+    dj_dw = np.empty_like(w)
+    step = np.empty_like(w)
+    cost_kw, grad_kw = _buffer_kwargs(cost_function, gradient_function, scratch, dj_dw)
 
     print(f"Iteration Cost          w0       w1       w2       w3       b       djdw0    djdw1    djdw2    djdw3    djdb  ")
     print(f"---------------------|--------|--------|--------|--------|--------|--------|--------|--------|--------|--------|")
@@ -434,32 +455,31 @@ def gradient_descent_houses(X, y, w_in, b_in, cost_function, gradient_function,
     for i in range(num_iters):
 
         # Calculate the gradient and update the parameters
-        dj_db,dj_dw = gradient_function(X, y, w, b)   
+        dj_db,dj_dw = gradient_function(X, y, w, b, **grad_kw)   
 
-        # Update Parameters using w, b, alpha and gradient
-        w = w - alpha * dj_dw               
+        # Update Parameters using w, b, alpha and gradient (in place)
+        np.multiply(dj_dw, alpha, out=step)
+        w -= step
         b = b - alpha * dj_db               
       
         # Save cost J,w,b at each save interval for graphing
-        if i == 0 or i % save_interval == 0:     
-            hist["cost"].append(cost_function(X, y, w, b))
-            hist["params"].append([w,b])
-            hist["grads"].append([dj_dw,dj_db])
-            hist["iter"].append(i)
+        if hist.due(i):
+            hist.record(i, cost_function(X, y, w, b, **cost_kw), w, b, dj_dw, dj_db)
 
         # Print cost every at intervals 10 times or as many iterations if < 10
         if i% math.ceil(num_iters/10) == 0:
             #print(f"Iteration {i:4d}: Cost {cost_function(X, y, w, b):8.2f}   ")
-            cst = cost_function(X, y, w, b)
+            cst = cost_function(X, y, w, b, **cost_kw)
             print(f"{i:9d} {cst:0.5e} {w[0]: 0.1e} {w[1]: 0.1e} {w[2]: 0.1e} {w[3]: 0.1e} {b: 0.1e} {dj_dw[0]: 0.1e} {dj_dw[1]: 0.1e} {dj_dw[2]: 0.1e} {dj_dw[3]: 0.1e} {dj_db: 0.1e}")
        
     return w, b, hist #return w,b and history for graphing
 
-def run_gradient_descent(X,y,iterations=1000, alpha = 1e-6):
-
+def run_gradient_descent(X,y,iterations=1000, alpha = 1e-6, dtype=np.float64):
+    """ dtype=np.float32 runs gradient descent in single precision (half the memory traffic) """
+    X = np.asarray(X, dtype=dtype); y = np.asarray(y, dtype=dtype)
     m,n = X.shape
     # initialize parameters
-    initial_w = np.zeros(n)
+    initial_w = np.zeros(n, dtype=dtype)
     initial_b = 0
     # run gradient descent
     w_out, b_out, hist_out = gradient_descent_houses(X ,y, initial_w, initial_b,
@@ -468,18 +488,19 @@ def run_gradient_descent(X,y,iterations=1000, alpha = 1e-6):
     
     return(w_out, b_out, hist_out)
 
-# compact extaction of hist data
+# compact extaction of hist data (views into the TrainingHistory buffer, no copies)
 #x = hist["iter"]
-#J  = np.array([ p    for p in hist["cost"]])
-#ws = np.array([ p[0] for p in hist["params"]])
-#dj_ws = np.array([ p[0] for p in hist["grads"]])
+#J  = hist["cost"]
+#ws = hist["w"]
+#dj_ws = hist["dj_dw"]
 
-#bs = np.array([ p[1] for p in hist["params"]]) 
+#bs = hist["b"]
 
-def run_gradient_descent_feng(X,y,iterations=1000, alpha = 1e-6):
+def run_gradient_descent_feng(X,y,iterations=1000, alpha = 1e-6, dtype=np.float64):
+    X = np.asarray(X, dtype=dtype); y = np.asarray(y, dtype=dtype)
     m,n = X.shape
     # initialize parameters
-    initial_w = np.zeros(n)
+    initial_w = np.zeros(n, dtype=dtype)
     initial_b = 0
     # run gradient descent
     w_out, b_out, hist_out = gradient_descent(X ,y, initial_w, initial_b,
@@ -488,7 +509,7 @@ def run_gradient_descent_feng(X,y,iterations=1000, alpha = 1e-6):
     
     return(w_out, b_out)
 
-def gradient_descent(X, y, w_in, b_in, cost_function, gradient_function, alpha, num_iters): 
+def gradient_descent(X, y, w_in, b_in, cost_function, gradient_function, alpha, num_iters, hist=None): 
     """
     Performs batch gradient descent to learn theta. Updates theta by taking 
     num_iters gradient steps with learning rate alpha
@@ -502,44 +523,49 @@ def gradient_descent(X, y, w_in, b_in, cost_function, gradient_function, alpha,
       gradient_function: function to compute the gradient
       alpha : (float) Learning rate
       num_iters : (int) number of iterations to run gradient descent
+      hist : (TrainingHistory) optional recorder, e.g. a ring or spill mode one for very long runs
     Returns
       w : (array_like Shape (n,)) Updated values of parameters of the model after
           running gradient descent
       b : (scalar)                Updated value of parameter of the model after
           running gradient descent
+      hist : (TrainingHistory)    cost, w, b and gradients at the recorded iterations
     """
     
     # number of training examples
     m = len(X)
     
-    # An array to store values at each iteration primarily for graphing later
-    hist={}
-    hist["cost"] = []; hist["params"] = []; hist["grads"]=[]; hist["iter"]=[];
-    
-    w = copy.deepcopy(w_in)  #avoid modifying global w within function
+    w = np.array(w_in, dtype=X.dtype if X.dtype.kind == 'f' else float)  #avoid modifying global w within function
     b = b_in
-    save_interval = np.ceil(num_iters/10000) # prevent resource exhaustion for long runs
+
+    # Preallocated record of cost, w, b and gradients for graphing later (bounded, see TrainingHistory)
+    if hist is None:
+        hist = TrainingHistory(w.shape, capacity=max(1, min(num_iters, 10000)), every=math.ceil(num_iters/10000))
+
+    # preallocated buffers: the vectorized cost/gradient routines write into these, so the loop allocates nothing
+    scratch = np.empty((m,) + w.shape[1:], dtype=w.dtype)
+    dj_dw = np.empty_like(w)
+    step = np.empty_like(w)
+    cost_kw, grad_kw = _buffer_kwargs(cost_function, gradient_function, scratch, dj_dw)
 
     for i in range(num_iters):
 
         # Calculate the gradient and update the parameters
-        dj_db,dj_dw = gradient_function(X, y, w, b)   
+        dj_db,dj_dw = gradient_function(X, y, w, b, **grad_kw)   
 
-        # Update Parameters using w, b, alpha and gradient
-        w = w - alpha * dj_dw               
+        # Update Parameters using w, b, alpha and gradient (in place)
+        np.multiply(dj_dw, alpha, out=step)
+        w -= step
         b = b - alpha * dj_db               
       
         # Save cost J,w,b at each save interval for graphing
-        if i == 0 or i % save_interval == 0:     
-            hist["cost"].append(cost_function(X, y, w, b))
-            hist["params"].append([w,b])
-            hist["grads"].append([dj_dw,dj_db])
-            hist["iter"].append(i)
+        if hist.due(i):
+            hist.record(i, cost_function(X, y, w, b, **cost_kw), w, b, dj_dw, dj_db)
 
         # Print cost every at intervals 10 times or as many iterations if < 10
         if i% math.ceil(num_iters/10) == 0:
             #print(f"Iteration {i:4d}: Cost {cost_function(X, y, w, b):8.2f}   ")
-            cst = cost_function(X, y, w, b)
+            cst = cost_function(X, y, w, b, **cost_kw)
             print(f"Iteration {i:9d}, Cost: {cst:0.5e}")
     return w, b, hist #return w,b and history for graphing
 
@@ -565,5 +591,168 @@ def zscore_normalize_features(X,rtn_ms=False):
         return(X_norm, mu, sigma)
     else:
         return(X_norm)
-    
-    
+
+
+##########################################################
+# Out-of-core mini-batch gradient descent
+##########################################################
+
+def step_decay(alpha, drop=0.5, every=1000):
+    """ learning rate schedule: alpha * drop**(t // every) at update t """
+    return lambda t: alpha * drop ** (t // every)
+
+def inverse_decay(alpha, decay=1e-3):
+    """ learning rate schedule: alpha / (1 + decay*t) at update t """
+    return lambda t: alpha / (1 + decay * t)
+
+def _has_header(path):
+    with open(path, 'rb') as f:
+        first = f.readline().split(b',')[0]
+    try:
+        float(first)
+        return False
+    except ValueError:
+        return True
+
+def scan_data(path, chunk_rows=65536, skiprows=None, dtype=np.float64):
+    """
+    One pass over a comma separated file in the houses.txt / ex1data2.txt format
+    (features in the leading columns, target in the last), reading chunk_rows lines at a time
+    Args:
+      path : (str) data file
+      chunk_rows : (int) lines held in memory at once
+      skiprows : (int) header lines to skip; None skips one line if the first field is not a number
+    Returns
+      stats : (CostStats) sufficient statistics of the whole file (m, means, moments)
+      offsets : (list) byte offset of every chunk, for reading the chunks back in any order
+    """
+    if skiprows is None:
+        skiprows = 1 if _has_header(path) else 0
+    stats = CostStats()
+    offsets = []
+    with open(path, 'rb') as f:
+        for _ in range(skiprows):
+            f.readline()
+        while True:
+            offset = f.tell()
+            chunk = _read_chunk(f, chunk_rows, dtype)
+            if chunk is None:       # end of file
+                break
+            X, y = chunk
+            if len(y) == 0:         # only blank lines in this chunk
+                continue
+            offsets.append(offset)
+            stats.update(X, y)
+    return stats, offsets
+
+def _read_chunk(f, chunk_rows, dtype):
+    """ next chunk_rows lines of an open file as (X, y), blank lines dropped; None at the end of the file """
+    lines = list(islice(f, chunk_rows))
+    if not lines:
+        return None
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return np.empty((0, 0), dtype=dtype), np.empty(0, dtype=dtype)
+    data = np.loadtxt(lines, delimiter=',', dtype=dtype, ndmin=2)
+    return data[:, :-1], data[:, -1]
+
+def iter_minibatches(path, offsets, batch_size=32, chunk_rows=65536, rng=None, dtype=np.float64,
+                     mu=None, sigma=None):
+    """
+    Yields shuffled (X, y) mini-batches of a file scanned by scan_data, one chunk in memory at a time:
+    chunks are visited in random order and the rows of each chunk are permuted.
+    When mu and sigma are given the features are z-score normalized with them.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    with open(path, 'rb') as f:
+        for c in rng.permutation(len(offsets)):
+            f.seek(offsets[c])
+            chunk = _read_chunk(f, chunk_rows, dtype)
+            if chunk is None or len(chunk[1]) == 0:
+                continue
+            X, y = chunk
+            order = rng.permutation(len(y))
+            X, y = X[order], y[order]
+            if mu is not None:
+                X -= mu
+                X /= sigma
+            for s in range(0, len(y), batch_size):
+                yield X[s:s+batch_size], y[s:s+batch_size]
+
+def minibatch_gradient_descent(path, alpha=0.01, num_epochs=10, batch_size=32, chunk_rows=65536,
+                               skiprows=None, normalize=True, seed=None, hist=None, dtype=np.float64,
+                               verbose=True):
+    """
+    Mini-batch (batch_size=1: stochastic) gradient descent for linear regression on a data file that
+    need not fit in memory. Memory use is bounded by chunk_rows, whatever the number of rows.
+    A first pass collects CostStats, which supply the z-score normalization and the exact cost and
+    gradient over the whole training set at any (w,b) without another pass over the file.
+
+    Args:
+      path : (str) data file in the houses.txt / ex1data2.txt format
+      alpha : (float or function) learning rate, or a schedule alpha(t) of the update count t
+              such as step_decay(0.1) or inverse_decay(0.1)
+      num_epochs : (int) passes over the data
+      batch_size : (int) examples per update
+      chunk_rows : (int) lines read from the file at a time
+      skiprows : (int) header lines, see scan_data
+      normalize : (boolean) train on z-score normalized features (w,b are returned for the raw features)
+      seed : (int) seed of the shuffling
+      hist : (TrainingHistory) optional recorder; by default one decimated to 1000 records
+      dtype : numpy dtype the data is read in
+      verbose : (boolean) print the cost after (up to) 10 of the epochs
+    Returns
+      w : (ndarray Shape (n,)) parameters for the raw (unnormalized) features
+      b : (scalar)             parameter of the model
+      hist : (TrainingHistory) whole training set cost, w, b and gradients during training
+    """
+    schedule = alpha if callable(alpha) else (lambda t: alpha)
+    stats, offsets = scan_data(path, chunk_rows, skiprows, dtype)
+    n = len(stats.x_mean)
+    if normalize:
+        mu = stats.x_mean
+        sigma = np.sqrt(np.diag(stats.Sxx) / stats.m)
+        sigma[sigma == 0] = 1
+    else:
+        mu, sigma = np.zeros(n), np.ones(n)
+    if hist is None:
+        hist = TrainingHistory(n, capacity=1000)
+
+    rng = np.random.default_rng(seed)
+    w = np.zeros(n, dtype=dtype)
+    b = 0.0
+    # buffers reused by every update
+    scratch = np.empty(batch_size, dtype=dtype)
+    dj_dw = np.empty_like(w)
+    step = np.empty_like(w)
+
+    def raw(w, b):
+        """ parameters for the raw features """
+        w_raw = w / sigma
+        return w_raw, b - w_raw @ mu
+
+    def record(t):
+        w_raw, b_raw = raw(w, b)
+        dj_db_raw, dj_dw_raw = stats.gradient(w_raw, b_raw)
+        hist.record(t, stats.cost(w_raw, b_raw), w_raw, b_raw, dj_dw_raw, dj_db_raw)
+
+    t = 0
+    for epoch in range(num_epochs):
+        for X, y in iter_minibatches(path, offsets, batch_size, chunk_rows, rng, dtype,
+                                     mu.astype(dtype), sigma.astype(dtype)):
+            if hist.due(t):
+                record(t)
+            dj_db, _ = compute_gradient_matrix(X, y, w, b, out=dj_dw, scratch=scratch[:len(y)])
+            lr = schedule(t)
+            np.multiply(dj_dw, lr, out=step)
+            w -= step
+            b = b - lr * dj_db
+            t += 1
+        if verbose and epoch % math.ceil(num_epochs/10) == 0:
+            w_raw, b_raw = raw(w, b)
+            print(f"Epoch {epoch:4d}, updates {t:9d}, Cost: {stats.cost(w_raw, b_raw):0.5e}")
+    if hist.due(t):
+        record(t)
+
+    w_raw, b_raw = raw(w, b)
+    return w_raw, float(b_raw), hist
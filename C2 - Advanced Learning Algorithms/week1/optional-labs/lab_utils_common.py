@@ -184,9 +184,10 @@ def gradient_descent(X, y, w_in, b_in, alpha, num_iters, logistic=False, lambda_
     Returns:
       w (ndarray): Shape (n,) or (n,1)    Updated values of parameters; matches incoming shape
       b (scalar):                         Updated value of parameter
+      J_history (ndarray):                cost at the recorded iterations (a view into a bounded TrainingHistory)
     """
-    # An array to store cost J and w's at each iteration primarily for graphing later
-    J_history = []
+    # Preallocated record of cost J primarily for graphing later; past 100000 iterations it is decimated
+    hist = TrainingHistory(capacity=max(1, min(num_iters, 100000)))
     w = copy.deepcopy(w_in)  #avoid modifying global w within function
     b = b_in
     w = w.reshape(-1,1)      #prep for matrix operations
@@ -204,8 +205,8 @@ def gradient_descent(X, y, w_in, b_in, alpha, num_iters, logistic=False, lambda_
 
         # Save cost J at each iteration
         ccost = compute_cost_matrix(X, y, w, b, logistic, lambda_)
-        if Trace and i<100000:      # prevent resource exhaustion
-            J_history.append( ccost )
+        if Trace:
+            hist.record(i, ccost)
 
         # Print cost every at intervals 10 times or as many iterations if < 10
         if i% math.ceil(num_iters / 10) == 0:
@@ -217,7 +218,141 @@ def gradient_descent(X, y, w_in, b_in, alpha, num_iters, logistic=False, lambda_
                 print(f" alpha now {alpha}")
             last_cost = ccost
 
-    return w.reshape(w_in.shape), b, J_history  #return final w,b and J history for graphing
+    return w.reshape(w_in.shape), b, hist["cost"]  #return final w,b and J history for graphing
+
+class TrainingHistory:
+    """
+    Bounded record of a training run backed by one preallocated structured array
+    (fields iter, cost and, when w_shape is given, w, b, dj_dw, dj_db).
+    Every `every`-th iteration is recorded; what happens once `capacity` records are held depends on mode:
+      'decimate': drop every other record and double `every`, so the whole run stays covered
+      'ring'    : keep the most recent `capacity` records
+      'spill'   : append the records to the .npy file `path` and start over; call close() at the end
+                  (or use the history in a with block), then load() returns the whole run
+    w_shape is the shape of w, () for a scalar w.
+    Memory stays flat however many iterations are run. Fields are read as zero-copy views,
+    e.g. hist["cost"], hist["w"][:,0]; hist["params"] and hist["grads"] yield (w, b) and (dj_dw, dj_db) pairs.
+    In spill mode these views only cover the records not yet written to the file; use load() for the full run.
+    """
+    def __init__(self, w_shape=None, capacity=100000, every=1, mode='decimate', path=None, dtype=np.float64):
+        if mode not in ('decimate', 'ring', 'spill'):
+            raise ValueError(f"unknown mode {mode!r}")
+        if mode == 'spill' and path is None:
+            raise ValueError("mode 'spill' needs a path")
+        fields = [('iter', np.int64), ('cost', dtype)]
+        if w_shape is not None:
+            w_shape = tuple(w_shape) if np.iterable(w_shape) else (int(w_shape),)
+            fields += [('w', dtype, w_shape), ('b', dtype), ('dj_dw', dtype, w_shape), ('dj_db', dtype)]
+        self.dtype = np.dtype(fields)
+        self.capacity = int(capacity)
+        self.every = max(int(every), 1)
+        self.mode = mode
+        self.path = path
+        self.spilled = 0          # records already written to path
+        # ring mode writes each record twice, at k and k+capacity, so the newest `capacity`
+        # records are always one contiguous slice
+        self._data = np.zeros(2 * self.capacity if mode == 'ring' else self.capacity, dtype=self.dtype)
+        self._start = 0
+        self._n = 0
+        self._file = None
+
+    def due(self, i):
+        """ True when iteration i will be recorded (lets callers skip computing the cost otherwise) """
+        return i % self.every == 0
+
+    def record(self, i, cost, w=None, b=None, dj_dw=None, dj_db=None):
+        """ Records iteration i if it is due; w, b, dj_dw, dj_db are copied into the buffer """
+        if i % self.every:
+            return
+        if self._n == self.capacity:
+            self._full()
+            if i % self.every:
+                return
+        row = (i, cost) if len(self.dtype) == 2 else (i, cost, w, b, dj_dw, dj_db)
+        if self.mode == 'ring':
+            k = (self._start + self._n) % self.capacity
+            self._data[k] = self._data[k + self.capacity] = row
+            if self._n == self.capacity:
+                self._start = (self._start + 1) % self.capacity
+                return
+        else:
+            self._data[self._n] = row
+        self._n += 1
+
+    def _full(self):
+        if self.mode == 'decimate':
+            kept = (self._n + 1) // 2
+            self._data[:kept] = self._data[:self._n:2]
+            self._n = kept
+            self.every *= 2
+        elif self.mode == 'spill':
+            self._write(self._data[:self._n])
+            self._n = 0
+
+    def _write(self, records):
+        if self._file is None:
+            if self.spilled:
+                # reopened after close(): append to the records already in the file
+                self._file = open(self.path, 'r+b')
+                self._file.seek(0, 2)
+            else:
+                self._file = open(self.path, 'wb')
+                self._header()
+        records.tofile(self._file)
+        self.spilled += len(records)
+
+    def _header(self):
+        self._file.seek(0)
+        np.lib.format.write_array_header_1_0(self._file, {'descr': np.lib.format.dtype_to_descr(self.dtype),
+                                                          'fortran_order': False, 'shape': (self.spilled,)})
+        self._file.seek(0, 2)
+
+    def flush(self):
+        """ spill mode: writes the buffered records and updates the .npy header (readable with load()) """
+        if self.mode != 'spill' or (self._file is None and self._n == 0):
+            return
+        self._write(self._data[:self._n])
+        self._n = 0
+        self._header()
+        self._file.flush()
+
+    def close(self):
+        """ spill mode: flushes and closes the file; recording afterwards appends to it again """
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self, mmap_mode='r'):
+        """ all records of a spilled run, memory-mapped from path (closes the file first) """
+        self.close()
+        return np.load(self.path, mmap_mode=mmap_mode)
+
+    @property
+    def records(self):
+        """ records held in memory, oldest first (a view, no copy); in spill mode only the unflushed tail """
+        return self._data[self._start:self._start + self._n]
+
+    def __len__(self):
+        return self._n
+
+    def keys(self):
+        names = list(self.dtype.names)
+        return names + ['params', 'grads'] if 'w' in names else names
+
+    def __getitem__(self, key):
+        if key == 'params':
+            return self.records[['w', 'b']]
+        if key == 'grads':
+            return self.records[['dj_dw', 'dj_db']]
+        return self.records[key]
+
 
 def zscore_normalize_features(X):
     """
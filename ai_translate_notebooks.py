@@ -7,11 +7,22 @@ import os
 import sys
 import re
 import time
-import random
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import translation_config as config
+import markdown_protect
+from code_comments import translate_code_lines
+from notebook_io import NotebookDocument
+from translation_cache import open_default_cache
+from translation_client import ChatTranslator, open_registry
+from translation_engine import TranslationEngine
+from translation_metrics import default_metrics_path, get_metrics
+from translation_memory import open_default_memory
+from translation_manifest import NotebookManifest, cell_hash, manifest_path, source_unchanged
+from translation_planner import estimate_for, plan_corpus, print_estimate
+from translation_ratelimit import backoff_delay, parse_retry_after
 
 # 设置UTF-8编码输出
 if sys.platform == 'win32':
@@ -19,32 +30,11 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-class AITranslator:
-    def __init__(self, api_keys: List[str], base_url: str, model: str):
-        self.api_keys = api_keys
-        self.base_url = base_url.rstrip('/')
-        self.model = model
-        self.current_key_index = 0
-        self.request_count = 0
-        self.error_count = 0
-        
-    def get_current_key(self) -> str:
-        """获取当前使用的API密钥"""
-        return self.api_keys[self.current_key_index % len(self.api_keys)]
-    
-    def rotate_key(self):
-        """轮换到下一个API密钥"""
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        print(f"  → 切换到API密钥 {self.current_key_index + 1}/{len(self.api_keys)}")
-    
-    def translate_text(self, text: str, max_retries: int = 3) -> str:
-        """
-        使用AI API翻译文本
-        """
-        if not text or not text.strip():
-            return text
-            
-        # 构建翻译提示
+class AITranslator(ChatTranslator):
+    response_prefixes = ('翻译：', '中文翻译：', '译文：')
+
+    def prompt_messages(self, text: str) -> List[dict]:
+        """翻译提示词"""
         prompt = f"""请将以下英文文本翻译为中文，保持原有的格式和结构：
 
 原文：
@@ -59,6 +49,38 @@ class AITranslator:
 
 翻译："""
 
+        return [
+            {
+                'role': 'user', 
+                'content': prompt
+            }
+        ]
+
+    def translate_text(self, text: str, max_retries: int = 3) -> str:
+        """
+        使用AI API翻译文本
+        """
+        if not text or not text.strip():
+            return text
+        
+        # 预演模式：只记录文本
+        if self._recording is not None:
+            self._recording.append(text)
+            return text
+        
+        # 并发引擎已翻译的结果
+        if text in self.translated:
+            return self.translated[text]
+        # 并发引擎已重试过仍失败的文本使用原文，不再逐段同步重试
+        if text in self.failed:
+            return text
+        
+        # 本地缓存
+        if self.cache is not None:
+            cached = self.cache.get(self.cache_key(text))
+            if cached is not None:
+                return cached
+
         for attempt in range(max_retries):
             try:
                 headers = {
@@ -66,41 +88,20 @@ class AITranslator:
                     'Content-Type': 'application/json',
                 }
                 
-                data = {
-                    'model': self.model,
-                    'messages': [
-                        {
-                            'role': 'user', 
-                            'content': prompt
-                        }
-                    ],
-                    'temperature': 0.3,
-                    'max_tokens': 2000
-                }
-                
-                response = requests.post(
+                response = self.session.post(
                     f"{self.base_url}/chat/completions",
                     headers=headers,
-                    json=data,
+                    json=self.build_payload(text),
                     timeout=30
                 )
                 
                 self.request_count += 1
                 
                 if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        translated_text = result['choices'][0]['message']['content'].strip()
-                        
-                        # 清理翻译结果（移除可能的前缀说明）
-                        if translated_text.startswith(('翻译：', '中文翻译：', '译文：')):
-                            translated_text = re.sub(r'^[^：]*：\s*', '', translated_text)
-                        
-                        # 添加小延迟避免API限制
-                        time.sleep(random.uniform(0.5, 1.0))
-                        return translated_text
-                    else:
-                        raise Exception("API响应格式错误")
+                    translated_text = self.parse_response(response)
+                    if self.cache is not None:
+                        self.cache.put(self.cache_key(text), text, translated_text)
+                    return translated_text
                         
                 elif response.status_code == 401:
                     print(f"    API密钥无效，尝试切换...")
@@ -108,8 +109,11 @@ class AITranslator:
                     continue
                     
                 elif response.status_code == 429:
-                    wait_time = (attempt + 1) * 5
-                    print(f"    API限制，{wait_time}秒后重试...")
+                    # 优先按服务端的 Retry-After 等待
+                    wait_time = parse_retry_after(response.headers.get('Retry-After'))
+                    if wait_time is None:
+                        wait_time = backoff_delay(attempt)
+                    print(f"    API限制，{wait_time:.0f}秒后重试...")
                     time.sleep(wait_time)
                     self.rotate_key()
                     continue
@@ -128,8 +132,10 @@ class AITranslator:
                         self.rotate_key()
                 else:
                     print(f"    翻译失败，使用原文: {str(e)[:100]}")
+                    self.failed.add(text)
                     return text
         
+        self.failed.add(text)
         return text
 
     def translate_markdown_cell(self, source: List[str]) -> List[str]:
@@ -143,28 +149,8 @@ class AITranslator:
         if not full_text.strip():
             return source
             
-        # 保护代码块、链接、图片等
-        protected_items = []
-        
-        # 保护模式：代码块、链接、图片、HTML标签、数学公式
-        patterns = [
-            (r'```[\s\S]*?```', 'CODE_BLOCK'),
-            (r'`[^`]+`', 'INLINE_CODE'),
-            (r'\$\$[\s\S]*?\$\$', 'MATH_BLOCK'),
-            (r'\$[^$]+\$', 'MATH_INLINE'),
-            (r'\[([^\]]+)\]\(([^\)]+)\)', 'LINK'),
-            (r'<img[^>]+>', 'IMAGE'),
-            (r'<[^>]+>', 'HTML_TAG'),
-            (r'!\[([^\]]*)\]\(([^\)]+)\)', 'IMAGE_MD'),
-        ]
-        
-        # 替换保护项
-        for i, (pattern, item_type) in enumerate(patterns):
-            matches = list(re.finditer(pattern, full_text))
-            for j, match in enumerate(matches):
-                placeholder = f"__PROTECTED_{i}_{j}__"
-                protected_items.append((placeholder, match.group()))
-                full_text = full_text.replace(match.group(), placeholder, 1)
+        # 保护代码块、链接、图片、HTML标签、数学公式（单次扫描）
+        full_text, protected_items = markdown_protect.protect(full_text)
         
         # 翻译文本
         if full_text.strip():
@@ -172,9 +158,8 @@ class AITranslator:
         else:
             translated_text = full_text
         
-        # 恢复保护项
-        for placeholder, original in protected_items:
-            translated_text = translated_text.replace(placeholder, original)
+        # 按序号恢复保护项
+        translated_text = markdown_protect.restore(translated_text, protected_items)
         
         # 转换回列表格式
         lines = translated_text.split('\n')
@@ -188,36 +173,10 @@ class AITranslator:
         return result if result else source
 
     def translate_code_cell(self, source: List[str]) -> List[str]:
-        """翻译代码单元格中的注释"""
-        translated_source = []
-        
-        for line in source:
-            # 翻译Python注释
-            if line.strip().startswith('#'):
-                comment_match = re.match(r'(\s*)(#+)(\s*)(.*)', line)
-                if comment_match:
-                    indent = comment_match.group(1)
-                    hashes = comment_match.group(2)
-                    space = comment_match.group(3)
-                    comment_text = comment_match.group(4)
-                    
-                    if comment_text.strip() and not comment_text.strip().startswith(('!', 'TODO', 'FIXME')):
-                        translated_comment = self.translate_text(comment_text)
-                        translated_line = f"{indent}{hashes}{space}{translated_comment}\n"
-                        translated_source.append(translated_line)
-                    else:
-                        translated_source.append(line)
-                else:
-                    translated_source.append(line)
-            else:
-                # 翻译字符串中的用户提示（谨慎处理）
-                if 'print(' in line and any(word in line.lower() for word in ['training', 'test', 'error', 'accuracy', 'loss']):
-                    # 保护字符串内容的简单翻译
-                    translated_source.append(line)
-                else:
-                    translated_source.append(line)
-        
-        return translated_source
+        """翻译代码单元格中的注释和文档字符串（连续的整行注释合并为一段翻译）"""
+        # 按行跳过特殊注释，注释块中的其余行照常翻译
+        return translate_code_lines(source, self.translate_text,
+                                    lambda line: line.startswith(('!', 'TODO', 'FIXME')))
 
 def find_untranslated_notebooks(source_dir: Path, target_dir: Path) -> List[tuple]:
     """查找未翻译的notebook文件"""
@@ -236,55 +195,97 @@ def find_untranslated_notebooks(source_dir: Path, target_dir: Path) -> List[tupl
         if not target_path.exists():
             untranslated.append((notebook_path, target_path))
         else:
-            # 检查源文件是否比目标文件新
-            if notebook_path.stat().st_mtime > target_path.stat().st_mtime:
+            # 检查源文件是否比目标文件新（内容与上次完整翻译时相同则跳过）
+            if notebook_path.stat().st_mtime > target_path.stat().st_mtime \
+                    and not source_unchanged(target_dir, notebook_path, target_path):
                 untranslated.append((notebook_path, target_path))
     
     return untranslated
 
-def translate_notebook(translator: AITranslator, source_path: Path, target_path: Path) -> bool:
+def translate_notebook(translator: AITranslator, source_path: Path, target_path: Path,
+                       engine: Optional[TranslationEngine] = None,
+                       manifest: Optional[NotebookManifest] = None) -> bool:
     """翻译单个notebook文件"""
     try:
         print(f"正在翻译: {source_path.relative_to(source_path.parents[3])}")
         
-        # 读取原始notebook
-        with open(source_path, 'r', encoding='utf-8') as f:
-            notebook = json.load(f)
+        # 读取原始notebook（只解析单元格的cell_type/source，outputs按原字节保留）
+        with NotebookDocument(source_path) as notebook:
+            cells = notebook.cells
+            cell_keys = [cell_hash(cell) for cell in cells]
+            all_texts = translator.collect_texts(cells)
+        
+            # 复用清单中未变化单元格的译文
+            reused = set()
+            if manifest is not None:
+                for i, cell in enumerate(cells):
+                    translated_source = manifest.lookup(cell_keys[i])
+                    if translated_source is not None:
+                        cell['source'] = translated_source
+                        reused.add(i)
+                print(f"  复用 {len(reused)}/{len(cells)} 个未变化的单元格")
+        
+            # 并发翻译所有文本，结果写入共享结果表
+            if engine is not None:
+                pending = [cell for i, cell in enumerate(cells) if i not in reused]
+                texts = translator.collect_texts(pending)
+                print(f"  并发翻译 {len(texts)} 段文本...")
+                translator.translated.update(translator.translate_segments(texts, engine))
         
-        # 翻译每个单元格
-        total_cells = len(notebook.get('cells', []))
-        for i, cell in enumerate(notebook.get('cells', [])):
-            cell_type = cell.get('cell_type')
-            print(f"  处理单元格 {i+1}/{total_cells} ({cell_type})", end='')
+            # 翻译每个单元格
+            total_cells = len(cells)
+            for i, cell in enumerate(cells):
+                cell_type = cell.get('cell_type')
+                print(f"  处理单元格 {i+1}/{total_cells} ({cell_type})", end='')
+            
+                if i in reused:
+                    print(" (复用)")
+                    continue
+            
+                # 单元格内所有文本都翻译成功时才记入清单
+                texts = translator.collect_texts([cell])
             
-            if cell_type == 'markdown':
-                source = cell.get('source', [])
-                if source:
-                    if isinstance(source, list):
-                        cell['source'] = translator.translate_markdown_cell(source)
-                    elif isinstance(source, str):
-                        cell['source'] = translator.translate_markdown_cell([source])
-                print(" ✓")
+                if cell_type == 'markdown':
+                    source = cell.get('source', [])
+                    if source:
+                        if isinstance(source, list):
+                            cell['source'] = translator.translate_markdown_cell(source)
+                        elif isinstance(source, str):
+                            cell['source'] = translator.translate_markdown_cell([source])
+                    print(" ✓")
                         
-            elif cell_type == 'code':
-                source = cell.get('source', [])
-                if source:
-                    if isinstance(source, list):
-                        cell['source'] = translator.translate_code_cell(source)
-                    elif isinstance(source, str):
-                        lines = source.split('\n')
-                        translated_lines = translator.translate_code_cell([l + '\n' for l in lines])
-                        cell['source'] = ''.join(translated_lines)
-                print(" ✓")
-            else:
-                print(" (跳过)")
+                elif cell_type == 'code':
+                    source = cell.get('source', [])
+                    if source:
+                        if isinstance(source, list):
+                            cell['source'] = translator.translate_code_cell(source)
+                        elif isinstance(source, str):
+                            lines = source.split('\n')
+                            translated_lines = translator.translate_code_cell([l + '\n' for l in lines])
+                            cell['source'] = ''.join(translated_lines)
+                    print(" ✓")
+                else:
+                    print(" (跳过)")
+            
+                if manifest is not None and not translator.failed.intersection(texts):
+                    manifest.record(cell_keys[i], cell.get('source', []))
+        
+            # 确保目标目录存在
+            target_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # 确保目标目录存在
-        target_path.parent.mkdir(parents=True, exist_ok=True)
+            # 保存翻译后的notebook（原子替换；内容未变化时不改写）
+            written = notebook.write(target_path)
+            get_metrics().inc('translation_writes_total', result='written' if written else 'unchanged')
+            if not written:
+                print("  译文未变化，跳过写入")
         
-        # 保存翻译后的notebook
-        with open(target_path, 'w', encoding='utf-8') as f:
-            json.dump(notebook, f, ensure_ascii=False, indent=1)
+            # 全部文本翻译成功时记录源文件哈希
+            if manifest is not None:
+                complete = not translator.failed.intersection(all_texts)
+                manifest.source_digest = notebook.digest() if complete else None
+        
+        if manifest is not None:
+            manifest.save()
         
         print(f"  [完成] 请求数: {translator.request_count}, 错误数: {translator.error_count}")
         return True
@@ -322,10 +323,17 @@ def main():
     print(f"🔑 API密钥数量: {len(API_KEYS)}")
     print(f"🌐 API地址: {BASE_URL}")
     print(f"🧠 模型: {MODEL}")
+    print(f"⚡ 并发数: {config.max_workers * len(API_KEYS)}")
     print("-" * 60)
     
     # 创建翻译器
     translator = AITranslator(API_KEYS, BASE_URL, MODEL)
+    translator.cache = open_default_cache()
+    translator.memory = open_default_memory(translator.cache)
+    registry = open_registry(translator)
+    engine = TranslationEngine(registry.request, API_KEYS,
+                               max_workers=config.max_workers, max_retries=config.max_retries,
+                               max_concurrency=config.max_concurrency)
     
     # 查找未翻译的文件
     untranslated_files = find_untranslated_notebooks(source_dir, target_dir)
@@ -336,6 +344,11 @@ def main():
     
     print(f"📊 找到 {len(untranslated_files)} 个需要翻译的文件")
     
+    # 去重规划：全库相同的片段（副本、检查点中的重复内容）只翻译一次
+    plan = plan_corpus(translator, untranslated_files, target_dir)
+    plan.print_report()
+    print_estimate(estimate_for(translator, plan, len(API_KEYS), translator.cache, source_dir))
+    
     # 确认是否继续
     response = input("\n是否开始翻译？(y/n): ")
     if response.lower() != 'y':
@@ -348,11 +361,19 @@ def main():
     success_count = 0
     start_time = time.time()
     
+    # 先并发翻译全部去重后的片段，再逐个notebook套用
+    print(f"🔁 翻译去重后的 {len(plan.unique)} 段文本...")
+    translator.translated.update(translator.translate_segments(plan.unique, engine))
+    
     for i, (source_path, target_path) in enumerate(untranslated_files, 1):
         print(f"\n[{i}/{len(untranslated_files)}]", end=' ')
         
-        if translate_notebook(translator, source_path, target_path):
+        manifest = NotebookManifest(manifest_path(target_dir, target_path))
+        notebook_start = time.perf_counter()
+        if translate_notebook(translator, source_path, target_path, engine, manifest):
             success_count += 1
+        get_metrics().set('translation_notebook_seconds', time.perf_counter() - notebook_start,
+                          notebook=target_path.relative_to(target_dir).as_posix())
         
         # 每5个文件显示一次进度统计
         if i % 5 == 0:
@@ -367,6 +388,20 @@ def main():
     print(f"⏱️  总用时: {total_time:.1f} 秒")
     print(f"📡 总请求数: {translator.request_count}")
     print(f"❌ 错误数: {translator.error_count}")
+    http_stats = translator.session.stats()
+    print(f"🔌 连接: {http_stats['requests']} 次请求, 新建 {http_stats['connections']} 个连接, 复用率 {http_stats['reuse_rate']:.0%}")
+    cache_stats = translator.cache.stats()
+    hedge_stats = registry.stats()
+    if len(registry.backends) > 1:
+        print(f"🪁 对冲请求: 补发 {hedge_stats['hedges']} 次, 备用后端胜出 {hedge_stats['hedge_wins']} 次")
+    registry.close()
+    if translator.memory is not None:
+        print(f"🧠 翻译记忆: 修补复用 {translator.memory.patched} 段, 附带参考译文 {translator.memory.referenced} 段")
+    print(f"💾 缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次, 共 {cache_stats['entries']} 条")
+    translator.cache.close()
+    get_metrics().set('translation_run_seconds', total_time)
+    get_metrics().write(default_metrics_path())
+    print(f"📈 指标: {default_metrics_path()}.json / .prom")
     print(f"📁 输出目录: {target_dir}")
 
 if __name__ == '__main__':
@@ -2,47 +2,44 @@
 AI翻译脚本 - 翻译Jupyter Notebook文件 (简化版)
 使用指定API进行智能翻译
 """
-import json
 import os
 import sys
-import re
 import time
-import random
+import contextlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Optional
 
 # 修复Windows编码问题
 if sys.platform == 'win32':
-    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 import requests
 
-class AITranslator:
-    def __init__(self, api_keys: List[str], base_url: str, model: str):
-        self.api_keys = api_keys
-        self.base_url = base_url.rstrip('/')
-        self.model = model
-        self.current_key_index = 0
-        self.request_count = 0
-        self.error_count = 0
-        
-    def get_current_key(self) -> str:
-        """获取当前使用的API密钥"""
-        return self.api_keys[self.current_key_index % len(self.api_keys)]
-    
-    def rotate_key(self):
-        """轮换到下一个API密钥"""
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        print(f"  -> 切换到API密钥 {self.current_key_index + 1}/{len(self.api_keys)}")
-    
-    def translate_text(self, text: str, max_retries: int = 3) -> str:
-        """使用AI API翻译文本"""
-        if not text or not text.strip():
-            return text
-            
-        # 构建翻译提示
+import translation_config as config
+import markdown_protect
+from code_comments import translate_code_lines
+from notebook_io import NotebookDocument
+from translation_backends import BackendRegistry
+from translation_cache import open_default_cache
+from translation_client import ChatTranslator, cell_source_lines, open_registry
+from translation_engine import TranslationEngine
+from translation_journal import TranslationJournal
+from translation_metrics import default_metrics_path, get_metrics
+from translation_memory import open_default_memory
+from translation_manifest import NotebookManifest, cell_hash, manifest_path, source_unchanged
+from translation_planner import estimate_for, plan_corpus, print_estimate
+from translation_ratelimit import backoff_delay, parse_retry_after
+
+class AITranslator(ChatTranslator):
+    temperature = 0.2
+
+    def prompt_messages(self, text: str) -> List[dict]:
+        """翻译提示词"""
         system_prompt = "你是一个专业的机器学习教程翻译专家。请将英文内容翻译为简洁、准确的中文，保持原有格式和技术术语的准确性。"
         
         user_prompt = f"""请将以下英文翻译为中文：
@@ -57,6 +54,34 @@ class AITranslator:
 
 翻译结果："""
 
+        return [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_prompt}
+        ]
+
+    def translate_text(self, text: str, max_retries: int = 3) -> str:
+        """使用AI API翻译文本"""
+        if not text or not text.strip():
+            return text
+        
+        # 预演模式：只记录文本
+        if self._recording is not None:
+            self._recording.append(text)
+            return text
+        
+        # 并发引擎已翻译的结果
+        if text in self.translated:
+            return self.translated[text]
+        # 并发引擎已重试过仍失败的文本使用原文，不再逐段同步重试
+        if text in self.failed:
+            return text
+        
+        # 本地缓存
+        if self.cache is not None:
+            cached = self.cache.get(self.cache_key(text))
+            if cached is not None:
+                return cached
+
         for attempt in range(max_retries):
             try:
                 headers = {
@@ -64,40 +89,20 @@ class AITranslator:
                     'Content-Type': 'application/json',
                 }
                 
-                data = {
-                    'model': self.model,
-                    'messages': [
-                        {'role': 'system', 'content': system_prompt},
-                        {'role': 'user', 'content': user_prompt}
-                    ],
-                    'temperature': 0.2,
-                    'max_tokens': 2000
-                }
-                
-                response = requests.post(
+                response = self.session.post(
                     f"{self.base_url}/chat/completions",
                     headers=headers,
-                    json=data,
+                    json=self.build_payload(text),
                     timeout=30
                 )
                 
                 self.request_count += 1
                 
                 if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        translated_text = result['choices'][0]['message']['content'].strip()
-                        
-                        # 清理不必要的前缀
-                        prefixes = ['翻译结果：', '翻译：', '中文翻译：', '译文：']
-                        for prefix in prefixes:
-                            if translated_text.startswith(prefix):
-                                translated_text = translated_text[len(prefix):].strip()
-                        
-                        time.sleep(random.uniform(0.5, 1.0))
-                        return translated_text
-                    else:
-                        raise Exception("API响应格式错误")
+                    translated_text = self.parse_response(response)
+                    if self.cache is not None:
+                        self.cache.put(self.cache_key(text), text, translated_text)
+                    return translated_text
                         
                 elif response.status_code == 401:
                     print(f"    API密钥无效，尝试切换...")
@@ -105,8 +110,11 @@ class AITranslator:
                     continue
                     
                 elif response.status_code == 429:
-                    wait_time = (attempt + 1) * 5
-                    print(f"    API限制，{wait_time}秒后重试...")
+                    # 优先按服务端的 Retry-After 等待
+                    wait_time = parse_retry_after(response.headers.get('Retry-After'))
+                    if wait_time is None:
+                        wait_time = backoff_delay(attempt)
+                    print(f"    API限制，{wait_time:.0f}秒后重试...")
                     time.sleep(wait_time)
                     if len(self.api_keys) > 1:
                         self.rotate_key()
@@ -124,6 +132,7 @@ class AITranslator:
                     time.sleep(wait_time)
                 else:
                     print(f"    网络错误，使用原文: {str(e)[:80]}")
+                    self.failed.add(text)
                     return text
             except Exception as e:
                 self.error_count += 1
@@ -134,40 +143,19 @@ class AITranslator:
                     time.sleep(wait_time)
                 else:
                     print(f"    翻译失败，使用原文: {str(e)[:80]}")
+                    self.failed.add(text)
                     return text
         
+        self.failed.add(text)
         return text
 
     def protect_content(self, text: str) -> tuple:
-        """保护不应翻译的内容"""
-        protected_items = []
-        
-        # 保护模式：代码、公式、链接等
-        patterns = [
-            (r'```[\s\S]*?```', 'CODE_BLOCK'),
-            (r'`[^`\n]+`', 'INLINE_CODE'),
-            (r'\$\$[\s\S]*?\$\$', 'MATH_BLOCK'),
-            (r'\$[^$\n]+\$', 'MATH_INLINE'),
-            (r'!\[[^\]]*\]\([^)]+\)', 'IMAGE_MD'),
-            (r'\[[^\]]+\]\([^)]+\)', 'LINK'),
-            (r'<[^>]+>', 'HTML_TAG'),
-        ]
-        
-        # 替换保护内容
-        for i, (pattern, item_type) in enumerate(patterns):
-            matches = list(re.finditer(pattern, text))
-            for j, match in enumerate(matches):
-                placeholder = f"__PROTECT_{i}_{j}__"
-                protected_items.append((placeholder, match.group()))
-                text = text.replace(match.group(), placeholder, 1)
-        
-        return text, protected_items
+        """保护不应翻译的内容（代码、公式、链接等），单次扫描"""
+        return markdown_protect.protect(text)
 
     def restore_content(self, text: str, protected_items: list) -> str:
-        """恢复保护的内容"""
-        for placeholder, original in protected_items:
-            text = text.replace(placeholder, original)
-        return text
+        """按序号恢复保护的内容"""
+        return markdown_protect.restore(text, protected_items)
 
     def translate_markdown_cell(self, source: List[str]) -> List[str]:
         """翻译markdown单元格"""
@@ -204,36 +192,17 @@ class AITranslator:
         return result if result else source
 
     def translate_code_cell(self, source: List[str]) -> List[str]:
-        """翻译代码单元格中的注释"""
-        translated_source = []
-        
-        for line in source:
-            if line.strip().startswith('#') and not line.strip().startswith('#!/'):
-                # 提取注释
-                comment_match = re.match(r'(\s*)(#+)(\s*)(.*)', line)
-                if comment_match:
-                    indent = comment_match.group(1)
-                    hashes = comment_match.group(2)
-                    space = comment_match.group(3)
-                    comment_text = comment_match.group(4).strip()
-                    
-                    # 跳过特殊注释
-                    skip_keywords = ['TODO', 'FIXME', 'NOTE:', 'WARNING:', 'DEBUG', '#!']
-                    if comment_text and not any(kw in comment_text for kw in skip_keywords):
-                        try:
-                            translated_comment = self.translate_text(comment_text)
-                            translated_line = f"{indent}{hashes}{space}{translated_comment}\n"
-                            translated_source.append(translated_line)
-                        except:
-                            translated_source.append(line)
-                    else:
-                        translated_source.append(line)
-                else:
-                    translated_source.append(line)
-            else:
-                translated_source.append(line)
-        
-        return translated_source
+        """翻译代码单元格中的注释和文档字符串（连续的整行注释合并为一段翻译）"""
+        # 跳过特殊注释行（注释块中的其余行照常翻译）；shebang 提取后只剩 ! 开头的正文
+        skip_keywords = ['TODO', 'FIXME', 'NOTE:', 'WARNING:', 'DEBUG']
+        try:
+            return translate_code_lines(source, self.translate_text,
+                                        lambda line: line.startswith('!') or any(kw in line for kw in skip_keywords))
+        except Exception:
+            return source
+
+# 查找notebook时跳过的目录（路径中包含这些名称即跳过）
+SKIP_DIRS = ('notebooks-zh', 'archive', '.git', '__pycache__')
 
 def find_notebooks_to_translate(source_dir: Path, target_dir: Path) -> List[tuple]:
     """查找需要翻译的notebook文件"""
@@ -242,7 +211,7 @@ def find_notebooks_to_translate(source_dir: Path, target_dir: Path) -> List[tupl
     for notebook_path in source_dir.rglob('*.ipynb'):
         # 跳过特定目录
         path_str = str(notebook_path)
-        if any(skip in path_str.lower() for skip in ['notebooks-zh', 'archive', '.git', '__pycache__']):
+        if any(skip in path_str.lower() for skip in SKIP_DIRS):
             continue
             
         # 计算目标路径
@@ -257,7 +226,8 @@ def find_notebooks_to_translate(source_dir: Path, target_dir: Path) -> List[tupl
             # 检查文件修改时间
             source_mtime = notebook_path.stat().st_mtime
             target_mtime = target_path.stat().st_mtime
-            if source_mtime > target_mtime:
+            # 源文件只是修改时间变了、内容与上次完整翻译时相同，则不必重新处理
+            if source_mtime > target_mtime and not source_unchanged(target_dir, notebook_path, target_path):
                 needs_translation = True
         
         if needs_translation:
@@ -265,48 +235,79 @@ def find_notebooks_to_translate(source_dir: Path, target_dir: Path) -> List[tupl
     
     return notebooks_to_translate
 
-def translate_notebook(translator: AITranslator, source_path: Path, target_path: Path) -> bool:
+def translate_notebook(translator: AITranslator, source_path: Path, target_path: Path,
+                       engine: Optional[TranslationEngine] = None,
+                       manifest: Optional[NotebookManifest] = None) -> bool:
     """翻译单个notebook"""
     try:
         print(f"翻译: {source_path.name}")
         
-        # 读取源文件
-        with open(source_path, 'r', encoding='utf-8') as f:
-            notebook = json.load(f)
+        # 读取源文件（只解析单元格的cell_type/source，outputs按原字节保留）
+        with NotebookDocument(source_path) as notebook:
+            cells = notebook.cells
+            cell_keys = [cell_hash(cell) for cell in cells]
+            all_texts = translator.collect_texts(cells)
+            complete = True
+        
+            # 复用清单中未变化单元格的译文
+            reused = set()
+            if manifest is not None:
+                for i, cell in enumerate(cells):
+                    translated_source = manifest.lookup(cell_keys[i])
+                    if translated_source is not None:
+                        cell['source'] = translated_source
+                        reused.add(i)
+                print(f"  复用 {len(reused)}/{len(cells)} 个未变化的单元格")
         
-        # 翻译单元格
-        cells = notebook.get('cells', [])
-        for i, cell in enumerate(cells):
-            cell_type = cell.get('cell_type', '')
-            source = cell.get('source', [])
+            # 并发翻译所有文本，结果写入共享结果表
+            if engine is not None:
+                pending = [cell for i, cell in enumerate(cells) if i not in reused]
+                texts = translator.collect_texts(pending)
+                print(f"  并发翻译 {len(texts)} 段文本...")
+                translator.translated.update(translator.translate_segments(texts, engine))
+        
+            # 翻译单元格
+            for i, cell in enumerate(cells):
+                cell_type = cell.get('cell_type', '')
+                source = cell_source_lines(cell)
             
-            if not source:
-                continue
+                if not source or i in reused:
+                    continue
                 
-            print(f"  单元格 {i+1}/{len(cells)} ({cell_type})", end='')
+                print(f"  单元格 {i+1}/{len(cells)} ({cell_type})", end='')
             
-            try:
-                if cell_type == 'markdown':
-                    if isinstance(source, str):
-                        source = [source]
-                    cell['source'] = translator.translate_markdown_cell(source)
-                    print(" [MD翻译完成]")
-                elif cell_type == 'code':
-                    if isinstance(source, str):
-                        source = source.split('\n')
-                        source = [line + '\n' for line in source[:-1]] + [source[-1]]
-                    cell['source'] = translator.translate_code_cell(source)
-                    print(" [代码注释完成]")
-                else:
-                    print(" [跳过]")
-            except Exception as e:
-                print(f" [错误: {str(e)[:30]}]")
-                # 出错时保持原内容不变
+                try:
+                    texts = translator.collect_texts([cell])
+                    if cell_type == 'markdown':
+                        cell['source'] = translator.translate_markdown_cell(source)
+                        print(" [MD翻译完成]")
+                    elif cell_type == 'code':
+                        cell['source'] = translator.translate_code_cell(source)
+                        print(" [代码注释完成]")
+                    else:
+                        print(" [跳过]")
+                    # 单元格内所有文本都翻译成功时才记入清单
+                    if manifest is not None and not translator.failed.intersection(texts):
+                        manifest.record(cell_keys[i], cell['source'])
+                except Exception as e:
+                    print(f" [错误: {str(e)[:30]}]")
+                    # 出错时保持原内容不变
+                    complete = False
         
-        # 保存文件
-        target_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(target_path, 'w', encoding='utf-8') as f:
-            json.dump(notebook, f, ensure_ascii=False, indent=1)
+            # 保存文件（原子替换；内容与已有译文相同时不改写，保留原修改时间）
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            written = notebook.write(target_path)
+            get_metrics().inc('translation_writes_total', result='written' if written else 'unchanged')
+            if not written:
+                print("  译文未变化，跳过写入")
+        
+            # 全部文本翻译成功时记录源文件哈希
+            if manifest is not None:
+                complete = complete and not translator.failed.intersection(all_texts)
+                manifest.source_digest = notebook.digest() if complete else None
+        
+        if manifest is not None:
+            manifest.save()
         
         print(f"  完成: {target_path.relative_to(target_path.parents[2])}")
         return True
@@ -315,6 +316,77 @@ def translate_notebook(translator: AITranslator, source_path: Path, target_path:
         print(f"  失败: {e}")
         return False
 
+# 工作进程中的翻译器（每个进程一个）
+_worker_translator: Optional[AITranslator] = None
+_worker_engine: Optional[TranslationEngine] = None
+_worker_registry: Optional[BackendRegistry] = None
+_worker_target_dir: Optional[Path] = None
+
+def _init_worker(api_keys: List[str], base_url: str, model: str, target_dir: Path,
+                 counter, processes: int):
+    """工作进程初始化：分配密钥，创建翻译器、并发引擎，载入断点日志"""
+    global _worker_translator, _worker_engine, _worker_registry, _worker_target_dir
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    
+    # 密钥足够时每个进程使用不同的密钥，总并发上限在进程间平分
+    keys = api_keys[index::processes] if len(api_keys) >= processes else api_keys
+    _worker_translator = AITranslator(keys, base_url, model)
+    _worker_translator.cache = open_default_cache()
+    _worker_translator.memory = open_default_memory(_worker_translator.cache)
+    _worker_translator.journal = TranslationJournal(Path(__file__).parent / config.journal_dir)
+    _worker_translator.journal.load()
+    _worker_registry = open_registry(_worker_translator)
+    _worker_engine = TranslationEngine(_worker_registry.request, keys,
+                                       max_workers=config.max_workers, max_retries=config.max_retries,
+                                       max_concurrency=max(1, config.max_concurrency // processes))
+    _worker_target_dir = target_dir
+
+def _worker_counters() -> Dict[str, int]:
+    translator = _worker_translator
+    memory = translator.memory
+    return {
+        'requests': translator.request_count,
+        'errors': translator.error_count,
+        'failed': len(translator.failed),
+        'cache_hits': translator.cache.hits,
+        'cache_misses': translator.cache.misses,
+        'memory_patched': memory.patched if memory is not None else 0,
+        'memory_referenced': memory.referenced if memory is not None else 0,
+        'hedges': _worker_registry.hedges,
+        'hedge_wins': _worker_registry.hedge_wins,
+    }
+
+def _worker_stats(before: Dict[str, int]) -> dict:
+    """本进程自 before 以来的统计增量"""
+    stats = {key: value - before[key] for key, value in _worker_counters().items()}
+    stats['pid'] = os.getpid()
+    stats['http'] = _worker_translator.session.stats()
+    stats['metrics'] = get_metrics().snapshot()  # 本进程的累计指标
+    return stats
+
+def _translate_segments_in_worker(texts: List[str]) -> dict:
+    """在工作进程中翻译一份去重后的片段，译文写入共享缓存和断点日志"""
+    before = _worker_counters()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_translator.translated.update(_worker_translator.translate_segments(texts, _worker_engine))
+    return _worker_stats(before)
+
+def _translate_in_worker(source_path: Path, target_path: Path) -> dict:
+    """在工作进程中翻译一个notebook，返回结果和本次的统计增量"""
+    before = _worker_counters()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        manifest = NotebookManifest(manifest_path(_worker_target_dir, target_path))
+        start = time.perf_counter()
+        ok = translate_notebook(_worker_translator, source_path, target_path, _worker_engine, manifest)
+        get_metrics().set('translation_notebook_seconds', time.perf_counter() - start,
+                          notebook=target_path.relative_to(_worker_target_dir).as_posix())
+    stats = _worker_stats(before)
+    stats.update(ok=ok, log=log.getvalue())
+    return stats
+
 def main():
     """主函数"""
     print("AI翻译脚本 - Jupyter Notebook翻译器")
@@ -326,6 +398,9 @@ def main():
     MODEL = "GPT-5-mini"
     # =====================================
     
+    # 支持逗号分隔的多个密钥
+    API_KEYS = [key.strip() for item in API_KEYS for key in item.split(',') if key.strip()]
+    
     # 验证配置
     if not API_KEYS or API_KEYS[0] == "your-api-key-1":
         print("错误: 请配置API密钥!")
@@ -340,10 +415,14 @@ def main():
     print(f"目标目录: {target_dir}")
     print(f"API密钥: {len(API_KEYS)} 个")
     print(f"模型: {MODEL}")
+    print(f"并发数: {config.max_workers * len(API_KEYS)}")
+    print(f"进程数: {config.max_processes}")
     print("-" * 50)
     
-    # 创建翻译器
-    translator = AITranslator(API_KEYS, BASE_URL, MODEL)
+    # 断点日志：上次中断时已完成的片段
+    journal = TranslationJournal(root_dir / config.journal_dir)
+    if journal.load():
+        print(f"断点日志: {len(journal)} 个已完成的片段，将从断点继续")
     
     # 查找待翻译文件
     notebooks = find_notebooks_to_translate(root_dir, target_dir)
@@ -358,6 +437,16 @@ def main():
     if len(notebooks) > 5:
         print(f"  ... 还有 {len(notebooks) - 5} 个文件")
     
+    # 去重规划：全库相同的片段（副本、检查点中的重复内容）只翻译一次
+    planner = AITranslator(API_KEYS, BASE_URL, MODEL)
+    plan = plan_corpus(planner, notebooks, target_dir)
+    plan.print_report()
+    
+    # 预估本轮的请求数、令牌、费用和耗时
+    cache = open_default_cache()
+    print_estimate(estimate_for(planner, plan, len(API_KEYS), cache, root_dir))
+    cache.close()
+    
     # 确认开始
     response = input("\n开始翻译? (y/N): ")
     if response.lower() != 'y':
@@ -367,29 +456,85 @@ def main():
     print("\n开始翻译...")
     print("=" * 50)
     
-    # 执行翻译
+    # 执行翻译：每个notebook是一个任务，由进程池并行处理
     success_count = 0
+    totals = {'requests': 0, 'errors': 0, 'failed': 0, 'cache_hits': 0, 'cache_misses': 0,
+              'memory_patched': 0, 'memory_referenced': 0, 'hedges': 0, 'hedge_wins': 0}
+    http_stats = {}
+    metrics_snapshots = {}
     start_time = time.time()
+    processes = max(1, min(config.max_processes, len(notebooks)))
+    counter = multiprocessing.Value('i', 0)
     
-    for i, (source_path, target_path) in enumerate(notebooks, 1):
-        print(f"\n[{i}/{len(notebooks)}] ", end="")
-        
-        if translate_notebook(translator, source_path, target_path):
-            success_count += 1
+    executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                   initargs=(API_KEYS, BASE_URL, MODEL, target_dir, counter, processes))
+    try:
+        # 第一阶段：去重后的片段分给各进程翻译，译文写入共享缓存
+        segment_futures = [executor.submit(_translate_segments_in_worker, shard)
+                           for shard in plan.shards(processes)]
+        for future in as_completed(segment_futures):
+            result = future.result()
+            for key in totals:
+                totals[key] += result[key]
+            http_stats[result['pid']] = result['http']
+            metrics_snapshots[result['pid']] = result['metrics']
+        print(f"去重片段翻译完成: {len(plan.unique)} 段, 请求 {totals['requests']} 次, 用时 {time.time() - start_time:.1f}s")
         
-        # 显示中间统计
-        if i % 3 == 0:
-            elapsed = time.time() - start_time
-            print(f"进度: {success_count}/{i} 成功, 用时 {elapsed:.1f}s, 请求 {translator.request_count}")
+        # 第二阶段：逐个notebook套用译文（片段已在缓存中）
+        futures = {executor.submit(_translate_in_worker, source_path, target_path): source_path
+                   for source_path, target_path in notebooks}
+        for i, future in enumerate(as_completed(futures), 1):
+            source_path = futures[future]
+            result = future.result()
+            for key in totals:
+                totals[key] += result[key]
+            http_stats[result['pid']] = result['http']
+            metrics_snapshots[result['pid']] = result['metrics']
+            
+            if result['ok']:
+                success_count += 1
+                print(f"[{i}/{len(notebooks)}] 完成: {source_path.name} (请求 {result['requests']})")
+            else:
+                print(f"[{i}/{len(notebooks)}] 失败: {source_path.name}")
+                print(result['log'][-500:])
+            
+            # 显示中间统计
+            if i % 3 == 0:
+                elapsed = time.time() - start_time
+                print(f"进度: {success_count}/{i} 成功, 用时 {elapsed:.1f}s, 请求 {totals['requests']}")
+    except (KeyboardInterrupt, BrokenProcessPool):
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("\n翻译已中断，已完成的片段保存在断点日志中，重新运行将从断点继续")
+        return
+    executor.shutdown()
+    
+    # 全部成功后清空断点日志（结果已在缓存和清单中）
+    if success_count == len(notebooks) and totals['failed'] == 0:
+        journal.clear()
+    
+    # 合并各进程的指标，写出JSON汇总和Prometheus文本
+    metrics = get_metrics()
+    for snapshot in metrics_snapshots.values():
+        metrics.merge(snapshot)
+    metrics.set('translation_run_seconds', time.time() - start_time)
+    metrics.write(default_metrics_path())
     
     # 最终统计
     total_time = time.time() - start_time
+    connections = sum(stats['connections'] for stats in http_stats.values())
+    http_requests = sum(stats['requests'] for stats in http_stats.values())
     print("\n" + "=" * 50)
     print("翻译完成!")
     print(f"成功: {success_count}/{len(notebooks)} 个文件")
     print(f"用时: {total_time:.1f} 秒")
-    print(f"API请求: {translator.request_count} 次")
-    print(f"错误数: {translator.error_count}")
+    print(f"API请求: {totals['requests']} 次")
+    print(f"错误数: {totals['errors']}")
+    print(f"连接: {http_requests} 次请求, 新建 {connections} 个连接")
+    print(f"缓存: 命中 {totals['cache_hits']} 次, 未命中 {totals['cache_misses']} 次")
+    if totals['hedges']:
+        print(f"对冲请求: 补发 {totals['hedges']} 次, 备用后端胜出 {totals['hedge_wins']} 次")
+    print(f"翻译记忆: 修补复用 {totals['memory_patched']} 段, 附带参考译文 {totals['memory_referenced']} 段")
+    print(f"指标: {default_metrics_path()}.json / .prom")
     print(f"输出: {target_dir}")
 
 if __name__ == '__main__':
@@ -0,0 +1,257 @@
+"""
+代码单元格注释与文档字符串提取
+用 tokenize 找出注释（整行注释和行尾注释）和文档字符串的准确位置：同一缩进的连续整行注释合并为一个
+翻译单元，按原来的缩进和 # 前缀写回；未翻译的部分逐字保留。分析结果按单元格源码缓存，未变化的代码
+单元格不会重复做词法分析。tokenize 无法处理的单元格（如 %%writefile 等单元格魔法）退回按行匹配整行注释。
+IPython 的 obj? / obj?? 帮助语法不需要预先处理：tokenize 把代码后面的 ? 作为单独的记号，注释和字符串中的 ? 不受影响。
+"""
+import io
+import re
+import tokenize
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+# 以 % ! ? 开头的 IPython 行魔法、shell命令和帮助，分析前替换为等长空白
+_MAGIC_LINE = re.compile(r'^[ \t]*[%!?].*$', re.M)
+# 给工具看的指令注释（# noqa、# type: ignore[...]、# pragma: no cover、# fmt: off 等）不翻译
+_DIRECTIVE = re.compile(r'^(noqa\b|type:|pragma\b|fmt:|pylint:|isort:|mypy:|pyright:|flake8:|nosec\b)', re.I)
+_COMMENT_LINE = re.compile(r'^([ \t]*#+[ \t]*)(.*?)([ \t]*)$')
+_STRING_PREFIX = re.compile(r'^([A-Za-z]*)("""|\'\'\'|"|\')')
+
+
+class CommentUnit(NamedTuple):
+    kind: str  # 'block'（连续整行注释）、'trailing'（行尾注释）或 'docstring'
+    text: str  # 待翻译的文本，整行注释块按行以 \n 连接
+    start: int  # 在源码中替换的区间 [start, end)
+    end: int
+    layout: Tuple[Tuple[str, str], ...] = ()  # 整行注释块各行的 (前缀, 行尾)；文档字符串为 ((续行缩进, 引号), )
+
+
+def _line_offsets(source: str) -> List[int]:
+    offsets = [0]
+    for line in source.split('\n')[:-1]:
+        offsets.append(offsets[-1] + len(line) + 1)
+    return offsets
+
+
+def _block_units(source: str, rows: List[int]) -> List[CommentUnit]:
+    """把整行注释所在的行（0起）按连续行、相同前缀缩进合并为注释块"""
+    lines = source.split('\n')
+    offsets = _line_offsets(source)
+    units = []
+    block: List[Tuple[int, str, str, str]] = []
+
+    def flush():
+        if block:
+            first, last = block[0][0], block[-1][0]
+            end = offsets[last] + len(lines[last]) + (1 if last < len(lines) - 1 else 0)
+            units.append(CommentUnit(
+                'block', '\n'.join(body for _, _, body, _ in block), offsets[first], end,
+                tuple((prefix, source[offsets[row] + len(prefix) + len(body):
+                                      offsets[row] + len(lines[row]) + (1 if row < len(lines) - 1 else 0)])
+                      for row, prefix, body, _ in block)))
+            block.clear()
+
+    for row in rows:
+        match = _COMMENT_LINE.match(lines[row])
+        prefix, body = match.group(1), match.group(2)
+        indent = prefix[:len(prefix) - len(prefix.lstrip())]
+        if _DIRECTIVE.match(body):
+            body = ''
+        # 空注释行、指令注释行和缩进不同的注释行都会断开注释块
+        if block and (row != block[-1][0] + 1 or indent != block[-1][3] or not body):
+            flush()
+        if body:
+            block.append((row, prefix, body, indent))
+    flush()
+    return units
+
+
+def _fallback_units(source: str) -> List[CommentUnit]:
+    """按行匹配整行注释（无法词法分析时）"""
+    rows = [row for row, line in enumerate(source.split('\n')) if line.lstrip().startswith('#')]
+    return _block_units(source, rows)
+
+
+def _docstring_unit(source: str, token: tokenize.TokenInfo, offsets: List[int]) -> Optional[CommentUnit]:
+    # 取原始源码中的字符串：字符串内以 % ! ? 开头的行在分析用的副本里被替换成了空白
+    begin = offsets[token.start[0] - 1] + token.start[1]
+    string = source[begin:offsets[token.end[0] - 1] + token.end[1]]
+    match = _STRING_PREFIX.match(string)
+    if match is None or set(match.group(1).lower()) & {'b', 'f'}:
+        return None
+    quote = match.group(2)
+    content = string[match.end():len(string) - len(quote)]
+    core = content.strip()
+    if not core:
+        return None
+    start = begin + match.end() + content.index(core)
+    # 续行去掉公共缩进后再翻译，写回时重新加上
+    lines = core.split('\n')
+    indents = [len(line) - len(line.lstrip()) for line in lines[1:] if line.strip()]
+    indent = ' ' * min(indents) if indents else ''
+    text = '\n'.join([lines[0]] + [line[len(indent):] if line.startswith(indent) else line.lstrip()
+                                   for line in lines[1:]])
+    return CommentUnit('docstring', text, start, start + len(core), ((indent, quote),))
+
+
+@lru_cache(maxsize=4096)
+def analyze(source: str) -> Tuple[CommentUnit, ...]:
+    """分析一个代码单元格的源码，返回所有注释块、行尾注释和文档字符串（按位置排序）"""
+    masked = _MAGIC_LINE.sub(lambda match: ' ' * len(match.group(0)), source)
+    lines = source.split('\n')
+    offsets = _line_offsets(source)
+    comment_rows: List[int] = []
+    units: List[CommentUnit] = []
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(masked).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return tuple(_fallback_units(source))
+
+    expect_docstring = True  # 单元格开头或 def/class 语句体的第一条语句
+    header = False  # 当前逻辑行是 def/class 语句头
+    line_start = True
+    skip = (tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING)
+    for i, token in enumerate(tokens):
+        if token.type == tokenize.COMMENT:
+            row, col = token.start
+            if not lines[row - 1][:col].strip():
+                comment_rows.append(row - 1)
+            elif not token.string.startswith('#!'):
+                body = token.string.lstrip('#').strip()
+                if body and not _DIRECTIVE.match(body):
+                    start = offsets[row - 1] + col + token.string.index(body)
+                    units.append(CommentUnit('trailing', body, start, start + len(body)))
+            continue
+        if token.type in skip:
+            continue
+        if token.type == tokenize.NEWLINE:
+            expect_docstring = header
+            header = False
+            line_start = True
+            continue
+        if line_start and token.type == tokenize.NAME and token.string in ('def', 'class', 'async'):
+            header = True
+        if expect_docstring and line_start and token.type == tokenize.STRING:
+            following = next((t for t in tokens[i + 1:] if t.type not in skip), None)
+            if following is not None and following.type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                unit = _docstring_unit(source, token, offsets)
+                if unit is not None:
+                    units.append(unit)
+        if token.type != tokenize.ENDMARKER:
+            expect_docstring = False
+            line_start = False
+
+    units.extend(_block_units(source, comment_rows))
+    return tuple(sorted(units, key=lambda unit: unit.start))
+
+
+def extract_texts(source: str) -> List[str]:
+    """代码单元格中所有待翻译的文本"""
+    return [unit.text for unit in analyze(source)]
+
+
+def _render(unit: CommentUnit, translated: str) -> Optional[str]:
+    """把译文按原格式写回，无法安全写回时返回None（保留原文）"""
+    if unit.kind == 'trailing':
+        return ' '.join(line.strip() for line in translated.split('\n') if line.strip())
+    if unit.kind == 'docstring':
+        indent, quote = unit.layout[0]
+        if quote in translated or translated.endswith(quote[0]) or translated.endswith('\\'):
+            return None
+        lines = translated.split('\n')
+        return '\n'.join([lines[0]] + [indent + line if line.strip() else line for line in lines[1:]])
+    lines = [line for line in translated.split('\n') if line.strip()] or ['']
+    layout = unit.layout
+    rendered = []
+    for i, line in enumerate(lines):
+        prefix = layout[min(i, len(layout) - 1)][0]
+        if i == len(lines) - 1:
+            suffix = layout[-1][1]
+        else:
+            suffix = layout[i][1] if i < len(layout) - 1 else '\n'
+        rendered.append(prefix + line.strip() + suffix)
+    return ''.join(rendered)
+
+
+def _split_unit(source: str, unit: CommentUnit, skip: Callable[[str], bool]) -> List[CommentUnit]:
+    """按行应用 skip：注释块和文档字符串在 skip 为真的行处断开，这些行原样保留，其余各段分别翻译"""
+    if unit.kind == 'trailing':
+        return [] if skip(unit.text) else [unit]
+    lines = unit.text.split('\n')
+    if not any(skip(line) for line in lines):
+        return [unit]
+
+    # 每行在源码中的区间：注释块包括前缀和行尾，文档字符串的续行从去掉公共缩进后的位置开始
+    spans = []
+    pos = unit.start
+    if unit.kind == 'block':
+        for (prefix, suffix), line in zip(unit.layout, lines):
+            end = pos + len(prefix) + len(line) + len(suffix)
+            spans.append((pos, end))
+            pos = end
+    else:
+        indent = unit.layout[0][0]
+        for i, raw in enumerate(source[unit.start:unit.end].split('\n')):
+            offset = 0 if i == 0 else (len(indent) if raw.startswith(indent) else len(raw) - len(raw.lstrip()))
+            spans.append((pos + offset, pos + len(raw)))
+            pos += len(raw) + 1
+
+    parts: List[CommentUnit] = []
+    run: List[int] = []
+
+    def flush():
+        # 各段去掉首尾的空行，避免译文丢掉段落之间的空行
+        while run and not lines[run[-1]].strip():
+            run.pop()
+        while run and not lines[run[0]].strip():
+            run.pop(0)
+        if run:
+            layout = unit.layout[run[0]:run[-1] + 1] if unit.kind == 'block' else unit.layout
+            parts.append(CommentUnit(unit.kind, '\n'.join(lines[run[0]:run[-1] + 1]),
+                                     spans[run[0]][0], spans[run[-1]][1], layout))
+        run.clear()
+
+    for i, line in enumerate(lines):
+        if skip(line):
+            flush()
+        else:
+            run.append(i)
+    flush()
+    return parts
+
+
+def apply_translations(source: str, translate: Callable[[str], str],
+                       skip: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    翻译源码中的注释和文档字符串：translate(文本) -> 译文
+    skip(行) 为真的行原样保留（注释块和文档字符串在这些行处拆开翻译）；
+    译文与原文相同的单元不改动，结果与原文逐字一致
+    """
+    units = analyze(source)
+    if skip is not None:
+        units = [part for unit in units for part in _split_unit(source, unit, skip)]
+    parts = []
+    pos = 0
+    for unit in units:
+        translated = translate(unit.text)
+        if translated == unit.text:
+            continue
+        rendered = _render(unit, translated)
+        if rendered is None:
+            continue
+        parts.append(source[pos:unit.start])
+        parts.append(rendered)
+        pos = unit.end
+    parts.append(source[pos:])
+    return ''.join(parts)
+
+
+def translate_code_lines(source: List[str], translate: Callable[[str], str],
+                         skip: Optional[Callable[[str], bool]] = None) -> List[str]:
+    """按行列表翻译代码单元格（notebook中source的格式），没有变化时返回原列表"""
+    code = ''.join(source)
+    translated = apply_translations(code, translate, skip)
+    if translated == code:
+        return source
+    return [line for line in re.split(r'(?<=\n)', translated) if line]
@@ -0,0 +1,53 @@
+"""
+Markdown内容保护
+用一个合并后的正则单次扫描文本，把代码块、行内代码、LaTeX公式、图片、链接和HTML标签
+替换为按序号编号的占位符，翻译后按序号一次性恢复
+"""
+import re
+from typing import List, Tuple
+
+# 按优先级排列：同一位置能匹配多种时取靠前的（例如图片优先于链接）
+PROTECT_PATTERNS = [
+    ('CODE_BLOCK', r'```[\s\S]*?```'),
+    ('INLINE_CODE', r'`[^`\n]+`'),
+    ('MATH_BLOCK', r'\$\$[\s\S]*?\$\$'),
+    ('MATH_INLINE', r'\$[^$\n]+\$'),
+    ('IMAGE_MD', r'!\[[^\]]*\]\([^)]+\)'),
+    ('LINK', r'\[[^\]]+\]\([^)]+\)'),
+    ('HTML_TAG', r'<[^>]+>'),
+]
+
+# 用非捕获组合并：命名分组会让每个位置的匹配都记录分组，明显变慢
+PROTECT_RE = re.compile('|'.join(f'(?:{pattern})' for _, pattern in PROTECT_PATTERNS))
+PLACEHOLDER_RE = re.compile(r'__PROTECT_(\d+)__')
+
+
+def protect(text: str) -> Tuple[str, List[str]]:
+    """
+    单次扫描替换受保护内容
+    返回 (带占位符的文本, 被保护内容列表)，占位符 __PROTECT_n__ 对应列表第n项
+    """
+    segments: List[str] = []
+    parts: List[str] = []
+    pos = 0
+    for match in PROTECT_RE.finditer(text):
+        parts.append(text[pos:match.start()])
+        parts.append(f"__PROTECT_{len(segments)}__")
+        segments.append(match.group())
+        pos = match.end()
+    if not segments:
+        return text, segments
+    parts.append(text[pos:])
+    return ''.join(parts), segments
+
+
+def restore(text: str, segments: List[str]) -> str:
+    """按序号恢复占位符，未知序号保持原样"""
+    if not segments:
+        return text
+
+    def replace(match):
+        index = int(match.group(1))
+        return segments[index] if index < len(segments) else match.group()
+
+    return PLACEHOLDER_RE.sub(replace, text)
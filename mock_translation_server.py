@@ -0,0 +1,201 @@
+"""
+离线模拟翻译服务
+提供与OpenAI兼容的 /chat/completions 接口，用于在不消耗API额度的情况下测试翻译流程：
+可配置响应延迟分布、429限流注入比例和译文长度，译文为原文每行加上"中"前缀
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from translation_packing import MARKER_PATTERN, estimate_tokens
+
+# 从两个翻译脚本的提示词中取出原文
+SOURCE_PATTERN = re.compile(r'：\n\n(?:原文：\n)?(.*)\n\n翻译要求', re.S)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+class MockTranslationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.05,
+                 distribution: str = 'lognormal', jitter: float = 0.5, rate_limit: float = 0.0,
+                 retry_after: float = 1.0, response_ratio: float = 1.0, seed: Optional[int] = None):
+        """
+        latency: 平均响应延迟（秒）
+        distribution: 延迟分布 fixed / uniform / lognormal
+        jitter: uniform 时为相对波动幅度，lognormal 时为对数标准差
+        rate_limit: 返回429的请求比例（0-1）
+        retry_after: 429响应的 Retry-After 秒数
+        response_ratio: 译文长度相对原文的倍数
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未知的延迟分布: {distribution}")
+        super().__init__((host, port), MockRequestHandler)
+        self.latency = latency
+        self.distribution = distribution
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.response_ratio = response_ratio
+        self.random = random.Random(seed)
+        self.counts = {'requests': 0, 'rate_limited': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            if self.distribution == 'fixed':
+                return self.latency
+            if self.distribution == 'uniform':
+                return max(0.0, self.random.uniform(self.latency * (1 - self.jitter),
+                                                    self.latency * (1 + self.jitter)))
+            # 对数正态分布：均值保持为 latency，长尾更接近真实API
+            mu = -self.jitter ** 2 / 2
+            return self.latency * self.random.lognormvariate(mu, self.jitter)
+
+    def should_rate_limit(self) -> bool:
+        with self._lock:
+            return self.random.random() < self.rate_limit
+
+    def record(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counts[key] += amount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def fake_translate(self, text: str) -> str:
+        """每行加"中"前缀并按 response_ratio 伸缩，保留打包编号标记"""
+        lines = []
+        for line in text.split('\n'):
+            if not line.strip() or MARKER_PATTERN.fullmatch(line.strip()):
+                lines.append(line)
+                continue
+            if self.response_ratio >= 1:
+                line = line * int(round(self.response_ratio))
+            else:
+                line = line[:max(1, int(len(line) * self.response_ratio))]
+            lines.append('中' + line)
+        return '\n'.join(lines)
+
+    def start(self) -> 'MockTranslationServer':
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持keep-alive，与真实API的连接复用行为一致
+    server: MockTranslationServer
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {'error': {'message': f"未知路径: {self.path}"}})
+            return
+        try:
+            payload = json.loads(body)
+            content = payload['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError):
+            self.send_json(400, {'error': {'message': "请求体格式错误"}})
+            return
+
+        server = self.server
+        server.record('requests')
+        time.sleep(server.sample_latency())
+        if server.should_rate_limit():
+            server.record('rate_limited')
+            self.send_json(429, {'error': {'message': "Rate limit exceeded"}},
+                           {'Retry-After': f"{server.retry_after:g}"})
+            return
+
+        match = SOURCE_PATTERN.search(content)
+        translated = server.fake_translate(match.group(1) if match else content)
+        prompt_tokens = sum(estimate_tokens(message.get('content', '')) for message in payload['messages'])
+        completion_tokens = estimate_tokens(translated)
+        server.record('prompt_tokens', prompt_tokens)
+        server.record('completion_tokens', completion_tokens)
+        self.send_json(200, {
+            'id': f"mock-{server.counts['requests']}",
+            'object': 'chat.completion',
+            'model': payload.get('model', 'mock'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': translated},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        })
+
+    def send_json(self, status: int, data: dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """模拟服务的命令行参数（基准测试脚本共用）"""
+    parser.add_argument('--latency', type=float, default=0.05, help="平均响应延迟（秒）")
+    parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='lognormal', help="延迟分布")
+    parser.add_argument('--jitter', type=float, default=0.5, help="延迟波动（uniform为相对幅度，lognormal为对数标准差）")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="返回429的请求比例")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="429响应的Retry-After秒数")
+    parser.add_argument('--response-ratio', type=float, default=1.0, help="译文长度相对原文的倍数")
+    parser.add_argument('--seed', type=int, default=None, help="随机种子")
+
+
+def server_from_args(args, host: str = '127.0.0.1', port: int = 0) -> MockTranslationServer:
+    return MockTranslationServer(host, port, latency=args.latency, distribution=args.distribution,
+                                 jitter=args.jitter, rate_limit=args.rate_limit,
+                                 retry_after=args.retry_after, response_ratio=args.response_ratio,
+                                 seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线模拟翻译服务（OpenAI兼容接口）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.host, args.port)
+    print(f"模拟翻译服务已启动: {server.url}/chat/completions")
+    print("按 Ctrl+C 停止")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n统计: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
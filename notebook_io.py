@@ -0,0 +1,226 @@
+"""
+流式notebook读写
+通过mmap扫描notebook的JSON文本，只解析单元格的 cell_type 和 source，
+outputs 等其他字段（包括大体积的base64图片）不构建Python对象，写出时按原字节原样拷贝
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+_WS = re.compile(rb'\s*')
+_PLAIN = re.compile(rb'[^"\[\]{}]+')
+_SCALAR = re.compile(rb'[^,}\]\s]+')
+
+
+def _ws(data, pos: int) -> int:
+    return _WS.match(data, pos).end()
+
+
+def _skip_string(data, pos: int) -> int:
+    """跳过字符串，用find查找结束引号（比正则逐字符匹配快得多）"""
+    end = pos + 1
+    while True:
+        end = data.find(b'"', end)
+        if end < 0:
+            raise ValueError("JSON字符串没有结束")
+        # 引号前有奇数个反斜杠时是转义引号
+        backslashes = 0
+        while data[end - 1 - backslashes] == 0x5c:
+            backslashes += 1
+        end += 1
+        if backslashes % 2 == 0:
+            return end
+
+
+def _skip_value(data, pos: int) -> int:
+    """跳过一个JSON值，返回其结束位置（不构建对象）"""
+    first = data[pos:pos + 1]
+    if first == b'"':
+        return _skip_string(data, pos)
+    if first not in (b'[', b'{'):
+        return _SCALAR.match(data, pos).end()
+    depth = 0
+    while True:
+        ch = data[pos:pos + 1]
+        if ch == b'"':
+            pos = _skip_string(data, pos)
+        elif ch in (b'[', b'{'):
+            depth += 1
+            pos += 1
+        elif ch in (b']', b'}'):
+            depth -= 1
+            pos += 1
+            if depth == 0:
+                return pos
+        elif not ch:
+            raise ValueError("JSON意外结束")
+        else:
+            pos = _PLAIN.match(data, pos).end()
+
+
+def _iter_object(data, pos: int) -> Iterator[Tuple[str, int, int]]:
+    """遍历JSON对象，逐个返回 (键, 值起点, 值终点)"""
+    pos = _ws(data, pos + 1)
+    if data[pos:pos + 1] == b'}':
+        return
+    while True:
+        if data[pos:pos + 1] != b'"':
+            raise ValueError(f"位置 {pos} 处缺少键名")
+        key_end = _skip_string(data, pos)
+        key = json.loads(data[pos:key_end])
+        pos = _ws(data, key_end)
+        if data[pos:pos + 1] != b':':
+            raise ValueError(f"位置 {pos} 处缺少冒号")
+        pos = _ws(data, pos + 1)
+        end = _skip_value(data, pos)
+        yield key, pos, end
+        pos = _ws(data, end)
+        if data[pos:pos + 1] != b',':
+            return
+        pos = _ws(data, pos + 1)
+
+
+def _iter_array(data, pos: int) -> Iterator[Tuple[int, int]]:
+    """遍历JSON数组，逐个返回 (元素起点, 元素终点)"""
+    pos = _ws(data, pos + 1)
+    if data[pos:pos + 1] == b']':
+        return
+    while True:
+        end = _skip_value(data, pos)
+        yield pos, end
+        pos = _ws(data, end)
+        if data[pos:pos + 1] != b',':
+            return
+        pos = _ws(data, pos + 1)
+
+
+def _line_indent(data, pos: int) -> bytes:
+    """返回pos所在行的行首缩进"""
+    line_start = data.rfind(b'\n', 0, pos) + 1
+    return _WS.match(data, line_start).group().replace(b'\n', b'')
+
+
+def file_digest(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """文件内容的sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_write(path: Union[str, Path], data: bytes) -> bool:
+    """
+    内容变化时才写入：先写同目录临时文件再原子替换，中途崩溃不会留下半个文件
+    内容与现有文件相同时不写入（保留原mtime），返回是否写入
+    """
+    path = Path(path)
+    if path.exists() and path.stat().st_size == len(data) \
+            and file_digest(path) == hashlib.sha256(data).hexdigest():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+
+class NotebookDocument:
+    """
+    只解析单元格 cell_type/source 的notebook文档
+    cells 中每个元素是 {'cell_type': ..., 'source': ...} 字典，修改 source 后调用 write 保存
+    """
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.cells: List[dict] = []
+        self._spans: List[Optional[Tuple[int, int]]] = []
+        self._original: List[Union[str, List[str], None]] = []
+        self._file = open(self.path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射
+            self._data = b''
+        try:
+            self._scan()
+        except Exception:
+            # 格式错误时释放文件和映射，调用方反复重试也不会泄漏
+            self.close()
+            raise
+
+    def _scan(self):
+        data = self._data
+        pos = _ws(data, 0)
+        if data[pos:pos + 1] != b'{':
+            raise ValueError(f"不是有效的notebook: {self.path}")
+        for key, start, end in _iter_object(data, pos):
+            if key != 'cells' or data[start:start + 1] != b'[':
+                continue
+            for cell_start, cell_end in _iter_array(data, start):
+                cell = {}
+                span = None
+                for cell_key, value_start, value_end in _iter_object(data, cell_start):
+                    if cell_key == 'cell_type':
+                        cell['cell_type'] = json.loads(data[value_start:value_end])
+                    elif cell_key == 'source':
+                        cell['source'] = json.loads(data[value_start:value_end])
+                        span = (value_start, value_end)
+                self.cells.append(cell)
+                self._spans.append(span)
+                self._original.append(cell.get('source'))
+
+    def _dump_source(self, source, start: int) -> bytes:
+        """按原文件的缩进格式序列化source"""
+        indent = _line_indent(self._data, start)
+        text = json.dumps(source, ensure_ascii=False, indent=1).encode('utf-8')
+        return text.replace(b'\n', b'\n' + indent)
+
+    def changed_cells(self) -> List[int]:
+        """返回source被修改过的单元格序号"""
+        return [i for i, cell in enumerate(self.cells)
+                if self._spans[i] is not None and cell.get('source') != self._original[i]]
+
+    def digest(self) -> str:
+        """源文件内容的sha256"""
+        return hashlib.sha256(self._data).hexdigest()
+
+    def render(self) -> bytes:
+        """生成notebook内容：未修改的字节直接拷贝，只替换修改过的source"""
+        edits = [(self._spans[i], self.cells[i]['source']) for i in self.changed_cells()]
+        parts = []
+        with memoryview(self._data) as view:
+            pos = 0
+            for (start, end), source in edits:
+                parts.append(view[pos:start])
+                parts.append(self._dump_source(source, start))
+                pos = end
+            parts.append(view[pos:])
+            return b''.join(parts)
+
+    def write(self, target_path: Union[str, Path]) -> bool:
+        """原子写出notebook，内容与已有文件相同时跳过，返回是否写入"""
+        return atomic_write(target_path, self.render())
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self) -> 'NotebookDocument':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 翻译工具是项目根目录下的独立模块
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
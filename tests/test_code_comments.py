@@ -0,0 +1,65 @@
+from code_comments import apply_translations, extract_texts, translate_code_lines
+
+
+SOURCE = '''# Compute the cost
+# for all examples
+def f(x):
+    """Return x squared."""
+    return x ** 2  # square it
+'''
+
+
+def test_extract_merges_comment_block():
+    assert extract_texts(SOURCE) == ["Compute the cost\nfor all examples", "Return x squared.", "square it"]
+
+
+def test_apply_keeps_layout():
+    translated = apply_translations(SOURCE, lambda text: text.upper())
+    assert translated == SOURCE.replace("Compute the cost", "COMPUTE THE COST") \
+        .replace("for all examples", "FOR ALL EXAMPLES") \
+        .replace("Return x squared.", "RETURN X SQUARED.").replace("square it", "SQUARE IT")
+
+
+def test_identity_translation_is_byte_identical():
+    lines = SOURCE.splitlines(keepends=True)
+    assert translate_code_lines(lines, lambda text: text) is lines
+
+
+def test_strings_and_magics_are_not_comments():
+    assert extract_texts("s = '# not a comment'\n%matplotlib inline\n") == []
+
+
+def test_question_marks_in_comments_and_help_syntax():
+    source = "# Why does this work?\nnp.dot?\nx = 's?'  # really?\nnp.sum??\n"
+    assert extract_texts(source) == ["Why does this work?", "really?"]
+
+
+def test_tool_directives_are_not_translated():
+    source = ('import os  # noqa: F401\n'
+              'x = f()  # type: ignore[attr-defined]\n'
+              'if debug:  # pragma: no cover\n'
+              '    pass  # Only while debugging\n'
+              '# fmt: off\n'
+              '# Keep this table aligned\n'
+              '# pylint: disable=invalid-name\n')
+    assert extract_texts(source) == ["Only while debugging", "Keep this table aligned"]
+
+
+def test_docstring_lines_that_look_like_magics_are_kept():
+    source = 'def f():\n    """Format a row.\n\n    %(name)s is replaced.\n    """\n'
+    assert extract_texts(source) == ["Format a row.\n\n%(name)s is replaced."]
+
+
+def test_skip_applies_per_line():
+    source = ('# Compute the cost\n# TODO: vectorize\n# for all examples\n'
+              'def f(x):\n    """Return x squared.\n\n    NOTE: slow\n    More text here.\n    """\n')
+    seen = []
+
+    def translate(text):
+        seen.append(text)
+        return text.upper()
+
+    translated = apply_translations(source, translate, lambda line: line.startswith(('TODO', 'NOTE:')))
+    assert seen == ["Compute the cost", "for all examples", "Return x squared.", "More text here."]
+    assert translated == ('# COMPUTE THE COST\n# TODO: vectorize\n# FOR ALL EXAMPLES\n'
+                          'def f(x):\n    """RETURN X SQUARED.\n\n    NOTE: slow\n    MORE TEXT HERE.\n    """\n')
@@ -0,0 +1,81 @@
+"""C1 week 1 optional labs: the cost curve plotted by plt_gradients (needs the labs' matplotlib/ipywidgets)"""
+import importlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('ipywidgets')
+
+LAB_DIR = (Path(__file__).resolve().parent.parent
+           / 'C1 - Supervised Machine Learning - Regression and Classification' / 'week1' / 'Optional Labs')
+X_TRAIN = np.array([1.0, 1.7, 2.0, 2.5, 3.0, 3.2])
+Y_TRAIN = np.array([250, 300, 480, 430, 630, 730])
+W_ARRAY = np.linspace(0, 400, 50)
+
+
+@pytest.fixture
+def lab(monkeypatch):
+    import matplotlib
+    matplotlib.use('Agg')
+    # the lab modules load their style sheet relative to the lab folder, and every
+    # lab folder has its own lab_utils_common
+    monkeypatch.chdir(LAB_DIR)
+    monkeypatch.syspath_prepend(str(LAB_DIR))
+    for name in ('lab_utils_common', 'lab_utils_uni'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    yield importlib.import_module('lab_utils_uni')
+    for name in ('lab_utils_common', 'lab_utils_uni'):
+        sys.modules.pop(name, None)
+
+
+def lab_compute_cost(x, y, w, b):
+    """the compute_cost written in C1_W1_Lab05_Gradient_Descent"""
+    m = x.shape[0]
+    cost = 0
+    for i in range(m):
+        f_wb = w * x[i] + b
+        cost = cost + (f_wb - y[i])**2
+    return 1 / (2 * m) * cost
+
+
+def counted(f_compute_cost):
+    calls = []
+
+    def compute_cost(x, y, w, b):
+        calls.append(w)
+        return f_compute_cost(x, y, w, b)
+    return compute_cost, calls
+
+
+def test_lab_cost_uses_the_broadcasted_curve(lab):
+    slow = np.array([lab_compute_cost(X_TRAIN, Y_TRAIN, w, 100) for w in W_ARRAY])
+    compute_cost, calls = counted(lab_compute_cost)
+    cost = lab._cost_curve(X_TRAIN, Y_TRAIN, compute_cost, W_ARRAY, 100)
+    assert len(calls) == 3
+    np.testing.assert_allclose(cost, slow, rtol=1e-12)
+
+
+def test_other_cost_functions_are_evaluated_point_by_point(lab):
+    def scaled_cost(x, y, w, b):
+        return 2 * lab_compute_cost(x, y, w, b) + w
+
+    compute_cost, calls = counted(scaled_cost)
+    cost = lab._cost_curve(X_TRAIN, Y_TRAIN, compute_cost, W_ARRAY, 100)
+    assert len(calls) == 3 + len(W_ARRAY)
+    np.testing.assert_allclose(cost, [scaled_cost(X_TRAIN, Y_TRAIN, w, 100) for w in W_ARRAY])
+
+
+def test_plt_gradients_plots_the_same_curve(lab):
+    import matplotlib.pyplot as plt
+
+    def lab_compute_gradient(x, y, w, b):
+        err = w * x + b - y
+        return np.mean(err * x), np.mean(err)
+
+    lab.plt_gradients(X_TRAIN, Y_TRAIN, lab_compute_cost, lab_compute_gradient)
+    curve = plt.gcf().axes[0].lines[0].get_ydata()
+    plt.close('all')
+    np.testing.assert_allclose(curve, [lab_compute_cost(X_TRAIN, Y_TRAIN, w, 100) for w in W_ARRAY], rtol=1e-12)
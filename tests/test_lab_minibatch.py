@@ -0,0 +1,44 @@
+"""C1 week 2 optional labs: out-of-core mini-batch gradient descent (needs the labs' matplotlib/scipy)"""
+import importlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('scipy')
+
+LAB_DIR = (Path(__file__).resolve().parent.parent
+           / 'C1 - Supervised Machine Learning - Regression and Classification' / 'week2' / 'Optional Labs')
+
+
+@pytest.fixture
+def lab(monkeypatch):
+    # the lab modules load their style sheet and data relative to the lab folder
+    monkeypatch.chdir(LAB_DIR)
+    monkeypatch.syspath_prepend(str(LAB_DIR))
+    return importlib.import_module('lab_utils_multi')
+
+
+def test_blank_lines_do_not_end_the_scan(lab, tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text('1,2\n2,4\n\n3,6\n4,8\n')
+    stats, offsets = lab.scan_data(str(path), chunk_rows=1)
+    assert stats.m == 4
+    batches = list(lab.iter_minibatches(str(path), offsets, batch_size=1, chunk_rows=1))
+    assert sorted(float(y[0]) for _, y in batches) == [2.0, 4.0, 6.0, 8.0]
+
+
+def test_matches_least_squares_on_houses(lab):
+    data = np.loadtxt(LAB_DIR / 'data' / 'houses.txt', delimiter=',')
+    X, y = data[:, :-1], data[:, -1]
+    A = np.c_[X, np.ones(len(y))]
+    solution = np.linalg.lstsq(A, y, rcond=None)[0]
+
+    w, b, _ = lab.minibatch_gradient_descent('./data/houses.txt', alpha=lab.step_decay(0.1, 0.5, 1000),
+                                             num_epochs=300, batch_size=10, chunk_rows=32, seed=1,
+                                             verbose=False)
+    stats = lab.CostStats(X, y)
+    assert stats.m == len(y)
+    assert stats.cost(w, b) <= 1.01 * stats.cost(solution[:-1], solution[-1])
+    assert np.allclose(A @ np.r_[w, b], A @ solution, rtol=0.02)
@@ -0,0 +1,21 @@
+import markdown_protect
+
+
+def test_round_trip():
+    text = ("See `np.dot` and $$J(w,b)$$ or $x_i$.\n```python\nx = 1\n```\n"
+            "![fig](images/a.png) [link](http://a.b) <br>")
+    protected, items = markdown_protect.protect(text)
+    assert '`' not in protected and '$' not in protected and '<br>' not in protected
+    assert protected.count('__PROTECT_') == len(items) == 7
+    assert markdown_protect.restore(protected, items) == text
+
+
+def test_image_wins_over_link():
+    protected, items = markdown_protect.protect("![a](b.png)")
+    assert items == ["![a](b.png)"]
+    assert protected == "__PROTECT_0__"
+
+
+def test_restore_keeps_unknown_placeholders():
+    assert markdown_protect.restore("__PROTECT_5__ x", ["a"]) == "__PROTECT_5__ x"
+    assert markdown_protect.protect("plain text") == ("plain text", [])
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from notebook_io import NotebookDocument, atomic_write
+
+NOTEBOOK = {
+    'cells': [
+        {'cell_type': 'markdown', 'metadata': {}, 'source': ['# Title\n', 'Some "quoted" text']},
+        {'cell_type': 'code', 'execution_count': 1, 'metadata': {},
+         'outputs': [{'output_type': 'display_data',
+                      'data': {'image/png': 'iVBORw0KGgo' * 50, 'text/plain': ['<Figure>']}}],
+         'source': ['x = 1  # one\n', 'print(x)']},
+        {'cell_type': 'raw', 'metadata': {}},
+    ],
+    'metadata': {'kernelspec': {'name': 'python3'}},
+    'nbformat': 4,
+    'nbformat_minor': 5,
+}
+
+
+@pytest.fixture
+def notebook_path(tmp_path):
+    path = tmp_path / 'lab.ipynb'
+    path.write_text(json.dumps(NOTEBOOK, indent=1, ensure_ascii=False) + '\n', encoding='utf-8')
+    return path
+
+
+def test_scan_reads_only_type_and_source(notebook_path):
+    with NotebookDocument(notebook_path) as notebook:
+        assert notebook.cells == [
+            {'cell_type': 'markdown', 'source': ['# Title\n', 'Some "quoted" text']},
+            {'cell_type': 'code', 'source': ['x = 1  # one\n', 'print(x)']},
+            {'cell_type': 'raw'},
+        ]
+        assert notebook.changed_cells() == []
+        assert notebook.render() == notebook_path.read_bytes()
+
+
+def test_write_replaces_sources_and_keeps_outputs(notebook_path, tmp_path):
+    target = tmp_path / 'zh' / 'lab.ipynb'
+    with NotebookDocument(notebook_path) as notebook:
+        notebook.cells[0]['source'] = ['# 标题\n', '一些"引用"文字']
+        assert notebook.changed_cells() == [0]
+        assert notebook.write(target)
+        assert not notebook.write(target)
+
+    written = json.loads(target.read_text(encoding='utf-8'))
+    expected = json.loads(json.dumps(NOTEBOOK))
+    expected['cells'][0]['source'] = ['# 标题\n', '一些"引用"文字']
+    assert written == expected
+    original = notebook_path.read_bytes()
+    outputs = original[original.index(b'"outputs"'):original.index(b'"source": [\n    "x = 1')]
+    assert outputs in target.read_bytes()
+
+
+def test_atomic_write_skips_identical_content(tmp_path):
+    path = tmp_path / 'out.txt'
+    assert atomic_write(path, b'abc')
+    assert not atomic_write(path, b'abc')
+    assert atomic_write(path, b'abd')
+    assert path.read_bytes() == b'abd'
+    assert [p.name for p in tmp_path.iterdir()] == ['out.txt']
+
+
+def test_malformed_notebook_is_closed(tmp_path, monkeypatch):
+    path = tmp_path / 'broken.ipynb'
+    path.write_text('{"cells": [{"cell_type": "markdown", "source": ["unterminated', encoding='utf-8')
+    closed = []
+    original_close = NotebookDocument.close
+
+    def close(self):
+        closed.append(self)
+        original_close(self)
+
+    monkeypatch.setattr(NotebookDocument, 'close', close)
+    with pytest.raises(ValueError):
+        NotebookDocument(path)
+    assert len(closed) == 1
+    assert closed[0]._file.closed and closed[0]._data.closed
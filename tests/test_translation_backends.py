@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from translation_backends import Backend, BackendRegistry, plain_text
+from translation_engine import TranslationEngine
+from translation_metrics import get_metrics
+from translation_packing import build_packed_text
+from translation_ratelimit import RateLimitError
+
+
+def slow(text, api_key=None):
+    time.sleep(0.3)
+    return 'slow'
+
+
+def fast(text, api_key=None):
+    return 'fast'
+
+
+def test_answer_names_the_backend_that_won():
+    registry = BackendRegistry(initial_delay=0.05, min_delay=0.01, max_workers=4)
+    registry.register(Backend('primary', slow))
+    registry.register(Backend('backup', fast))
+    assert registry.answer('text') == ('fast', 'backup')
+    assert (registry.hedges, registry.hedge_wins) == (1, 1)
+    registry.close()
+
+
+def test_backend_records_its_own_latency():
+    get_metrics().reset()
+    backend = Backend('google', fast, metric='translation_request_seconds')
+    assert backend.request('text') == 'fast'
+    histograms = get_metrics().summary()['histograms']
+    assert histograms['translation_request_seconds']['model=google']['count'] == 1
+
+
+def test_primary_overload_is_reported_with_the_backup_result():
+    def overloaded(text, api_key=None):
+        raise RateLimitError("429", 2.0)
+
+    registry = BackendRegistry(initial_delay=5, max_workers=4)
+    registry.register(Backend('primary', overloaded))
+    registry.register(Backend('backup', fast))
+    with pytest.raises(RateLimitError) as info:
+        registry.request('text')
+    assert info.value.result == 'fast'
+    assert registry.answer('text') == ('fast', 'backup')
+
+    engine = TranslationEngine(registry.request, ['k'])
+    assert engine.translate_texts(['text']) == {'text': 'fast'}
+    assert engine.controller.overloads == 1
+    registry.close()
+
+
+def test_plain_text_backends_skip_packed_payloads():
+    seen = []
+
+    def google(text, api_key=None):
+        seen.append(text)
+        return 'google'
+
+    def failing(text, api_key=None):
+        raise ValueError("down")
+
+    registry = BackendRegistry(max_workers=4)
+    registry.register(Backend('ai', failing))
+    registry.register(Backend('google', google, accepts=plain_text))
+    assert registry.request('plain sentence') == 'google'
+    for payload in (build_packed_text(['a', 'b']), 'see __PROTECT_0__'):
+        with pytest.raises(ValueError):
+            registry.request(payload)
+    assert seen == ['plain sentence']
+    registry.close()
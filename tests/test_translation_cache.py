@@ -0,0 +1,22 @@
+from translation_cache import TranslationCache
+
+
+def test_cache_round_trip_and_key(tmp_path):
+    cache = TranslationCache(tmp_path / 'cache.sqlite')
+    key = TranslationCache.make_key('hello', 'model', 'prompt', 0.3)
+    assert key != TranslationCache.make_key('hello', 'model', 'prompt', 0.2)
+    assert cache.get(key) is None
+    cache.put(key, 'hello', '你好')
+    assert cache.get(key) == '你好'
+    assert cache.contains(key)
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = TranslationCache(tmp_path / 'cache.sqlite', max_entries=10)
+    for i in range(150):
+        cache.put(f'k{i}', str(i), str(i))
+    assert len(cache) <= 60
+    assert cache.contains('k149') and not cache.contains('k0')
+    cache.close()
@@ -0,0 +1,21 @@
+from translation_chunker import chunk_text, split_edges
+from translation_packing import estimate_tokens
+
+
+def test_chunks_join_to_original_and_fit_budget():
+    text = "\n\n".join(f"Paragraph {i}. " + "The cost function measures the error. " * 20 for i in range(6))
+    chunks = chunk_text(text, 120)
+    assert ''.join(chunks) == text
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 120 for chunk in chunks)
+
+
+def test_placeholders_are_not_split():
+    text = " ".join(f"word __PROTECT_{i}__" for i in range(200))
+    for chunk in chunk_text(text, 50):
+        assert chunk.count('__PROTECT_') == chunk.count('__', ) // 2
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("short", 100) == ["short"]
+    assert split_edges("  body \n") == ("  ", "body", " \n")
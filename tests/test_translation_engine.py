@@ -0,0 +1,56 @@
+import threading
+
+from translation_engine import TranslationEngine
+from translation_ratelimit import RateLimitError
+
+
+def test_translates_every_job():
+    engine = TranslationEngine(lambda text, key: text.upper(), ['k1', 'k2'], max_workers=2)
+    assert engine.translate_texts(['a', 'b', 'a', 'c']) == {'a': 'A', 'b': 'B', 'c': 'C'}
+
+
+def test_retries_errors_and_overloads():
+    calls = {}
+    lock = threading.Lock()
+
+    def request(text, key):
+        with lock:
+            calls[text] = calls.get(text, 0) + 1
+            count = calls[text]
+        if text == 'busy' and count == 1:
+            raise RateLimitError("429", 0)
+        if text == 'flaky' and count == 1:
+            raise ValueError("boom")
+        return text + '!'
+
+    engine = TranslationEngine(request, ['k'], max_workers=1, retry_delay=0)
+    assert engine.translate_texts(['busy', 'flaky']) == {'busy': 'busy!', 'flaky': 'flaky!'}
+    assert engine.errors == {}
+    assert engine.controller.overloads == 1
+
+
+def test_persistent_failure_falls_back_to_source():
+    def request(text, key):
+        raise ValueError("down")
+
+    engine = TranslationEngine(request, ['k'], max_retries=2, retry_delay=0)
+    assert engine.translate_texts(['x']) == {'x': 'x'}
+    assert 'x' in engine.errors
+
+
+def test_failures_are_retried_on_the_next_call():
+    down = {'value': True}
+
+    def request(text, key):
+        if down['value']:
+            raise ValueError("down")
+        return text.upper()
+
+    engine = TranslationEngine(request, ['k'], max_retries=1, retry_delay=0)
+    assert engine.translate_texts(['x']) == {'x': 'x'}
+    assert engine.results == {} and 'x' in engine.errors
+    down['value'] = False
+    assert engine.translate_texts(['x']) == {'x': 'X'}
+    assert engine.errors == {}
+    engine.reset()
+    assert engine.results == {}
@@ -0,0 +1,27 @@
+from translation_journal import TranslationJournal
+
+
+def test_resume_reads_every_worker_log(tmp_path):
+    journal = TranslationJournal(tmp_path / 'journal')
+    assert journal.load() == {}
+    journal.append('k1', '第一段')
+    journal.append('k2', '第二段')
+    journal.close()
+    # 另一个进程写的日志，最后一行在崩溃时只写了一半
+    (tmp_path / 'journal' / '999999.jsonl').write_text(
+        '{"key": "k3", "translation": "第三段"}\n{"key": "k4", "transl', encoding='utf-8')
+
+    resumed = TranslationJournal(tmp_path / 'journal')
+    assert resumed.load() == {'k1': '第一段', 'k2': '第二段', 'k3': '第三段'}
+    assert resumed.get('k2') == '第二段' and resumed.get('k4') is None
+    resumed.append('k4', '第四段')
+    resumed.close()
+    assert len(TranslationJournal(tmp_path / 'journal').load()) == 4
+
+
+def test_clear_removes_logs(tmp_path):
+    journal = TranslationJournal(tmp_path / 'journal')
+    journal.append('k1', '一')
+    journal.clear()
+    assert len(journal) == 0
+    assert TranslationJournal(tmp_path / 'journal').load() == {}
@@ -0,0 +1,19 @@
+from translation_manifest import NotebookManifest, cell_hash, manifest_path
+
+
+def test_manifest_keeps_only_used_cells(tmp_path):
+    target_dir = tmp_path / 'notebooks-zh'
+    path = manifest_path(target_dir, target_dir / 'week1' / 'lab.ipynb')
+    assert path == tmp_path / 'notebooks-zh-manifest' / 'week1' / 'lab.json'
+    cell = {'cell_type': 'markdown', 'source': ['Hello']}
+    assert cell_hash(cell) == cell_hash({'cell_type': 'markdown', 'source': 'Hello'})
+    assert cell_hash(cell) != cell_hash({'cell_type': 'code', 'source': 'Hello'})
+
+    manifest = NotebookManifest(path)
+    manifest.record(cell_hash(cell), ['你好'])
+    manifest.record('stale', ['旧'])
+    manifest.save()
+    manifest = NotebookManifest(path)
+    assert manifest.lookup(cell_hash(cell)) == ['你好']
+    manifest.save()
+    assert NotebookManifest(path).cells == {cell_hash(cell): ['你好']}
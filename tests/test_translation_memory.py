@@ -0,0 +1,34 @@
+from translation_memory import TranslationMemory
+
+SOURCE = "Set the learning rate alpha to 0.01 and run gradient descent for 1000 iterations."
+TRANSLATION = "将学习率 alpha 设为 0.01，并运行梯度下降 1000 次迭代。"
+
+
+def test_patch_replaces_values_that_appear_once():
+    text = SOURCE.replace('0.01', '0.1')
+    assert TranslationMemory.patch(SOURCE, TRANSLATION, text) == TRANSLATION.replace('0.01', '0.1')
+    # 被替换的词在旧译文中找不到时不能修补
+    assert TranslationMemory.patch(SOURCE, TRANSLATION, SOURCE.replace('descent', 'ascent')) is None
+    # "1" 只替换独立出现的那一处，不会替换进 "1000"
+    assert TranslationMemory.patch("Run 1 step.", "运行 1000 步，共 1 步。", "Run 2 step.") == "运行 1000 步，共 2 步。"
+
+
+def test_resolve_patches_near_duplicates_and_references_the_rest():
+    memory = TranslationMemory(threshold=0.8)
+    memory.add(SOURCE, TRANSLATION)
+    numbers = SOURCE.replace('1000', '5000')
+    reworded = SOURCE.replace('gradient descent', 'stochastic gradient descent')
+    unrelated = "Plot the cost function against the number of iterations."
+    patched, references, rest = memory.resolve([numbers, reworded, unrelated])
+    assert patched == {numbers: TRANSLATION.replace('1000', '5000')}
+    assert references == {reworded: (SOURCE, TRANSLATION)}
+    assert rest == [unrelated]
+    assert (memory.patched, memory.referenced) == (1, 1)
+
+
+def test_split_near_duplicates_keeps_one_leader():
+    memory = TranslationMemory(threshold=0.8)
+    texts = [SOURCE, SOURCE.replace('0.01', '0.1'), "Plot the cost function against the number of iterations."]
+    leaders, followers = memory.split_near_duplicates(texts)
+    assert leaders == [texts[0], texts[2]]
+    assert followers == [texts[1]]
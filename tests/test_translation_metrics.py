@@ -0,0 +1,48 @@
+import json
+
+from translation_metrics import Metrics, mask_key
+
+
+def test_prometheus_text_format():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.inc('translation_requests_total', model='m', status=200)
+    metrics.inc('translation_requests_total', 2, model='m', status=429)
+    metrics.set('translation_notebook_seconds', 1.5, notebook='week1/"lab".ipynb')
+    for value in (0.05, 0.5, 3.0):
+        metrics.observe('translation_request_seconds', value, model='m')
+    assert metrics.prometheus_text().splitlines() == [
+        '# TYPE translation_requests_total counter',
+        'translation_requests_total{model="m",status="200"} 1',
+        'translation_requests_total{model="m",status="429"} 2',
+        '# TYPE translation_notebook_seconds gauge',
+        'translation_notebook_seconds{notebook="week1/\\"lab\\".ipynb"} 1.5',
+        '# TYPE translation_request_seconds histogram',
+        'translation_request_seconds_bucket{model="m",le="0.1"} 1',
+        'translation_request_seconds_bucket{model="m",le="1"} 2',
+        'translation_request_seconds_bucket{model="m",le="+Inf"} 3',
+        'translation_request_seconds_sum{model="m"} 3.55',
+        'translation_request_seconds_count{model="m"} 3',
+    ]
+
+
+def test_merge_adds_worker_snapshots(tmp_path):
+    worker = Metrics(buckets=(0.1, 1.0))
+    worker.inc('translation_cache_hits_total', 3)
+    worker.observe('translation_request_seconds', 0.5, model='m')
+    main = Metrics(buckets=(0.1, 1.0))
+    main.inc('translation_cache_hits_total', 1)
+    main.merge(json.loads(json.dumps(worker.snapshot())))
+    main.merge(worker.snapshot())
+    summary = main.summary()
+    assert summary['counters']['translation_cache_hits_total'] == {'all': 7}
+    histogram = summary['histograms']['translation_request_seconds']['model=m']
+    assert histogram['count'] == 2 and histogram['mean'] == 0.5
+
+    main.write(tmp_path / 'metrics')
+    assert json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8')) == summary
+    assert (tmp_path / 'metrics.prom').read_text(encoding='utf-8') == main.prometheus_text()
+
+
+def test_mask_key_keeps_last_four_characters():
+    assert mask_key('sk-abcdef123456') == '...3456'
+    assert mask_key(None) == 'none'
@@ -0,0 +1,33 @@
+from translation_packing import build_packed_text, pack_segments, split_packed_text
+
+
+def test_pack_and_split_round_trip():
+    texts = ["first", "second line", "third"]
+    packed = build_packed_text(texts)
+    assert split_packed_text(packed, 3) == texts
+
+
+def test_split_rejects_missing_markers():
+    assert split_packed_text("<<<1>>> a <<<3>>> b", 2) == []
+
+
+def test_long_segments_are_not_packed():
+    batches = pack_segments(["a" * 2000, "b", "c"], max_tokens=2000, short_tokens=200)
+    assert batches == [["a" * 2000], ["b", "c"]]
+
+
+def test_failed_segments_are_reported_separately():
+    from translation_engine import TranslationEngine
+    from translation_packing import translate_packed
+
+    def request(text, key):
+        if 'bad' in text:
+            raise ValueError("down")
+        if text.startswith('<<<') or '\n\n<<<' in text:
+            return text.replace('good', 'GOOD')
+        return text.upper()
+
+    engine = TranslationEngine(request, ['k'], max_retries=1, retry_delay=0)
+    results, failed = translate_packed(engine, ['good one', 'bad one'], max_tokens=2000)
+    assert failed == {'bad one'}
+    assert results == {'good one': 'GOOD ONE', 'bad one': 'bad one'}
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from translation_planner import CorpusPlan, _balance, estimate_run
+
+
+def test_plan_deduplicates_segments():
+    plan = CorpusPlan()
+    plan.add(Path('a.ipynb'), ['x', 'y', 'x'])
+    plan.add(Path('a-Copy1.ipynb'), ['x', 'y'])
+    assert plan.unique == ['x', 'y']
+    assert plan.occurrences == 4
+    assert plan.dedup_ratio == 0.5
+    assert plan.redundant_notebooks() == [Path('a-Copy1.ipynb')]
+    assert sorted(sum(plan.shards(2), [])) == ['x', 'y']
+
+
+def test_balance_spreads_load():
+    assigned, totals = _balance([5, 4, 3, 3, 1], 2)
+    assert sorted(totals) == [8, 8]
+    assert sorted(sum(assigned, [])) == [0, 1, 2, 3, 4]
+
+
+def test_estimate_skips_cached_segments():
+    plan = CorpusPlan()
+    plan.add(Path('a.ipynb'), ['one two three', 'four five'])
+    estimate = estimate_run(plan, prompt_tokens=10, key_count=1, cached={'four five'})
+    assert estimate['segments'] == 1
+    assert estimate['cached_segments'] == 1
+    assert estimate['requests'] == 1
+    assert estimate['input_tokens'] > 10
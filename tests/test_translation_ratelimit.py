@@ -0,0 +1,44 @@
+import time
+from email.utils import formatdate
+
+from translation_ratelimit import AIMDController, backoff_delay, parse_retry_after
+
+
+def test_parse_retry_after_seconds_and_dates():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after(' 1.5 ') == 1.5
+    assert parse_retry_after('-3') == 0.0
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+
+def test_backoff_doubles_up_to_cap():
+    assert [backoff_delay(i, base=1.0, cap=5.0) for i in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_overload_halves_limit_and_pauses():
+    controller = AIMDController(initial=8, maximum=16)
+    before = time.monotonic()
+    controller.on_overload(retry_after=10)
+    assert controller.limit == 4
+    assert controller.resume_at >= before + 10
+    # 同一轮拥塞中的第二次失败不再减半，没有 Retry-After 时按指数退避暂停
+    controller.on_overload()
+    assert controller.limit == 4
+    assert controller.overloads == 2
+    assert controller.resume_at >= before + backoff_delay(1)
+
+
+def test_limit_grows_while_latency_is_flat_and_stops_when_it_rises():
+    controller = AIMDController(initial=2, maximum=4)
+    for _ in range(20):
+        controller.on_success(0.1)
+    assert controller.limit == 4
+    controller = AIMDController(initial=2, maximum=16)
+    controller.on_success(0.1)
+    limit = controller.limit
+    for _ in range(5):
+        controller.on_success(1.0)
+    assert controller.limit == limit
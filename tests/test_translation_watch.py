@@ -0,0 +1,42 @@
+import translation_watch
+from translation_watch import TranslationWatcher
+
+
+class Resettable:
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+def test_worker_survives_errors_and_resets_state(tmp_path, monkeypatch):
+    calls = []
+
+    def translate_notebook(translator, path, target_path, engine, manifest):
+        calls.append(path.name)
+        if path.name == 'broken.ipynb':
+            raise RuntimeError("boom")
+        return True
+
+    monkeypatch.setattr(translation_watch, 'translate_notebook', translate_notebook)
+    monkeypatch.setattr(translation_watch, 'default_metrics_path', lambda: tmp_path / 'metrics.json')
+    for name in ('broken.ipynb', 'good.ipynb'):
+        (tmp_path / name).write_text('{}')
+    translator, engine = Resettable(), Resettable()
+    watcher = TranslationWatcher(translator, engine, tmp_path, tmp_path / 'notebooks-zh')
+    watcher._worker.start()
+    watcher._enqueue(tmp_path / 'broken.ipynb')
+    watcher._enqueue(tmp_path / 'good.ipynb')
+    watcher.stop()
+    assert calls == ['broken.ipynb', 'good.ipynb']
+    assert watcher.translated == 1
+    assert translator.resets == engine.resets == 2
+
+
+def test_main_rejects_placeholder_keys(monkeypatch, capsys):
+    monkeypatch.setattr(translation_watch.config, 'api_keys', ['your-api-key-1', 'your-api-key-2'])
+    monkeypatch.setattr('sys.argv', ['translation_watch.py'])
+    monkeypatch.setattr(translation_watch, 'AITranslator', None)
+    translation_watch.main()
+    assert "请配置API密钥" in capsys.readouterr().out
@@ -1,13 +1,24 @@
 """
 批量翻译 Jupyter Notebook 文件为中文
-使用 googletrans 库进行翻译（如果可用）
+使用 googletrans 库或 Google translate_a/single 接口进行翻译（如果可用）
 """
+import importlib.util
 import json
 import os
 import re
 import sys
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+
+import markdown_protect
+from code_comments import translate_code_lines
+import translation_config as config
+from notebook_io import NotebookDocument
+from translation_backends import Backend, BackendRegistry, google_translate, googletrans_backend
+from translation_cache import TranslationCache, open_default_cache
+from translation_chunker import chunk_text, split_edges
+from translation_metrics import default_metrics_path, get_metrics
 
 # 设置UTF-8编码输出
 if sys.platform == 'win32':
@@ -15,34 +26,30 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-# 尝试导入翻译库
-TRANSLATOR_AVAILABLE = False
-translator = None
-use_requests = False
+# 翻译后端：googletrans（首次使用时才导入并创建客户端）和 translate_a/single 接口
+# 导入时不做网络请求；main() 启动后在后台探测各后端，之后优先使用最快的健康后端
+registry: Optional[BackendRegistry] = None
+cache: Optional[TranslationCache] = None
 
-# 方法1: 尝试使用googletrans
-try:
-    from googletrans import Translator
-    translator = Translator()
-    # 测试翻译是否可用
-    test_result = translator.translate("test", src='en', dest='zh-cn')
-    if test_result and test_result.text:
-        TRANSLATOR_AVAILABLE = True
-        print("✓ 使用 googletrans 翻译库")
-except Exception as e:
-    translator = None
-    # 方法2: 尝试使用requests直接调用（备用方案）
-    try:
-        import requests
-        import urllib.parse
-        # 测试requests是否可用
-        TRANSLATOR_AVAILABLE = True
-        use_requests = True
-        print("✓ 使用 requests 进行翻译（备用方案）")
-    except ImportError:
-        TRANSLATOR_AVAILABLE = False
-        print("⚠ 警告: 未找到翻译库，将跳过翻译（仅复制文件）")
-        print("安装命令: pip install googletrans==4.0.0rc1 或 pip install requests")
+# 两个后端都是Google翻译，缓存按各自的模型名存取
+CACHE_MODELS = ('googletrans', 'translate_a/single')
+
+def get_registry() -> BackendRegistry:
+    """按需建立后端注册表（只检查库是否已安装，不导入也不联网）"""
+    global registry
+    if registry is None:
+        registry = BackendRegistry(quantile=config.hedge_quantile, initial_delay=config.hedge_initial_delay,
+                                   min_delay=config.hedge_min_delay, max_workers=4, prefer_fastest=True)
+        if importlib.util.find_spec('googletrans') is not None:
+            registry.register(Backend('googletrans', factory=googletrans_backend,
+                                      metric='translation_request_seconds'))
+        if importlib.util.find_spec('requests') is not None:
+            registry.register(Backend('translate_a/single', google_translate,
+                                      metric='translation_request_seconds'))
+    return registry
+
+def translator_available() -> bool:
+    return bool(get_registry().backends)
 
 def translate_text(text: str, max_length: int = 4500) -> str:
     """
@@ -51,55 +58,44 @@ def translate_text(text: str, max_length: int = 4500) -> str:
     if not text or not text.strip():
         return text
     
-    # 如果文本太长，分段翻译
-    if len(text) > max_length:
-        # 按段落分割
-        paragraphs = text.split('\n\n')
-        translated_paragraphs = []
-        for para in paragraphs:
-            if para.strip():
-                translated_para = translate_text(para, max_length)
-                translated_paragraphs.append(translated_para)
-            else:
-                translated_paragraphs.append(para)
-        return '\n\n'.join(translated_paragraphs)
+    # 超出令牌预算或字符上限时，相邻段落合并成块、超长段落按句子切开后分块翻译
+    chunks = chunk_text(text, config.max_tokens // 2, max_length)
+    if len(chunks) > 1:
+        translated_chunks = []
+        for chunk in chunks:
+            leading, core, trailing = split_edges(chunk)
+            translated_chunks.append(leading + translate_text(core, max_length) + trailing)
+        return ''.join(translated_chunks)
     
-    if not TRANSLATOR_AVAILABLE:
+    if not translator_available():
         # 如果没有翻译库，返回原文
         return text
     
-    import time
+    # 查询本地缓存
+    if cache is not None:
+        for model in CACHE_MODELS:
+            cached = cache.get(TranslationCache.make_key(text, model, 'en->zh-cn', 0.0))
+            if cached is not None:
+                return cached
+    
+    # 各后端的请求延迟由注册表记入 translation_request_seconds，不含重试等待
+    translated, backend = _request_translation(text)
+    if cache is not None and backend is not None:
+        cache.put(TranslationCache.make_key(text, backend, 'en->zh-cn', 0.0), text, translated)
+    return translated
+
+def _request_translation(text: str) -> Tuple[str, Optional[str]]:
+    """
+    调用翻译服务，返回 (译文, 给出译文的后端名)；失败时返回 (原文, None)
+    """
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            # 使用Google翻译
-            if translator:
-                result = translator.translate(text, src='en', dest='zh-cn')
-                # 添加小延迟以避免API限制
-                time.sleep(0.1)
-                return result.text
-            elif use_requests:
-                # 使用requests备用方案
-                import requests
-                import urllib.parse
-                url = "https://translate.googleapis.com/translate_a/single"
-                params = {
-                    'client': 'gtx',
-                    'sl': 'en',
-                    'tl': 'zh-cn',
-                    'dt': 't',
-                    'q': text
-                }
-                response = requests.get(url, params=params, timeout=10)
-                if response.status_code == 200:
-                    result = response.json()
-                    if result and len(result) > 0 and len(result[0]) > 0:
-                        translated = ''.join([item[0] for item in result[0] if item[0]])
-                        time.sleep(0.1)
-                        return translated
-                return text
-            else:
-                return text
+            # 首选最快的健康后端，超时未返回或失败时补发给另一个后端
+            translated, backend = get_registry().answer(text)
+            # 添加小延迟以避免API限制
+            time.sleep(0.1)
+            return translated, backend
         except Exception as e:
             if attempt < max_retries - 1:
                 wait_time = (attempt + 1) * 2
@@ -107,16 +103,16 @@ def translate_text(text: str, max_length: int = 4500) -> str:
                 time.sleep(wait_time)
             else:
                 print(f"    翻译失败，使用原文: {str(e)[:50]}")
-                return text
+                return text, None
     
-    return text
+    return text, None
 
 def translate_markdown_cell(source: List[str]) -> List[str]:
     """
     翻译markdown单元格内容
     """
     # 如果没有翻译库，直接返回原文
-    if not TRANSLATOR_AVAILABLE:
+    if not translator_available():
         return source
     
     # 合并所有行
@@ -126,52 +122,14 @@ def translate_markdown_cell(source: List[str]) -> List[str]:
     if not full_text.strip():
         return source
     
-    # 保护代码块和链接
-    code_blocks = []
-    links = []
-    images = []
-    
-    # 提取代码块
-    code_block_pattern = r'```[\s\S]*?```'
-    for i, match in enumerate(re.finditer(code_block_pattern, full_text)):
-        placeholder = f"__CODE_BLOCK_{i}__"
-        code_blocks.append((placeholder, match.group()))
-        full_text = full_text.replace(match.group(), placeholder, 1)
-    
-    # 提取链接
-    link_pattern = r'\[([^\]]+)\]\(([^\)]+)\)'
-    for i, match in enumerate(re.finditer(link_pattern, full_text)):
-        placeholder = f"__LINK_{i}__"
-        links.append((placeholder, match.group()))
-        full_text = full_text.replace(match.group(), placeholder, 1)
-    
-    # 提取图片标签
-    img_pattern = r'<img[^>]+>'
-    for i, match in enumerate(re.finditer(img_pattern, full_text)):
-        placeholder = f"__IMG_{i}__"
-        images.append((placeholder, match.group()))
-        full_text = full_text.replace(match.group(), placeholder, 1)
-    
-    # 提取HTML标签
-    html_pattern = r'<[^>]+>'
-    html_tags = []
-    for i, match in enumerate(re.finditer(html_pattern, full_text)):
-        placeholder = f"__HTML_{i}__"
-        html_tags.append((placeholder, match.group()))
-        full_text = full_text.replace(match.group(), placeholder, 1)
+    # 保护代码块、链接、图片和HTML标签等（单次扫描）
+    full_text, protected_items = markdown_protect.protect(full_text)
     
     # 翻译文本
     translated_text = translate_text(full_text)
     
-    # 恢复代码块、链接和图片
-    for placeholder, original in code_blocks:
-        translated_text = translated_text.replace(placeholder, original, 1)
-    for placeholder, original in links:
-        translated_text = translated_text.replace(placeholder, original, 1)
-    for placeholder, original in images:
-        translated_text = translated_text.replace(placeholder, original, 1)
-    for placeholder, original in html_tags:
-        translated_text = translated_text.replace(placeholder, original, 1)
+    # 按序号恢复保护内容
+    translated_text = markdown_protect.restore(translated_text, protected_items)
     
     # 转换回列表格式（保持原有的换行结构）
     # 尝试保持原有的行结构
@@ -188,38 +146,13 @@ def translate_markdown_cell(source: List[str]) -> List[str]:
 
 def translate_code_cell(source: List[str]) -> List[str]:
     """
-    翻译代码单元格中的注释
+    翻译代码单元格中的注释和文档字符串（连续的整行注释合并为一段翻译）
     """
     # 如果没有翻译库，直接返回原文
-    if not TRANSLATOR_AVAILABLE:
+    if not translator_available():
         return source
     
-    translated_source = []
-    for line in source:
-        # 只翻译注释行（以#开头的行，但排除shebang等）
-        if line.strip().startswith('#'):
-            # 提取注释内容
-            comment_match = re.match(r'(\s*)(#+)(\s*)(.*)', line)
-            if comment_match:
-                indent = comment_match.group(1)
-                hashes = comment_match.group(2)
-                space = comment_match.group(3)
-                comment_text = comment_match.group(4)
-                
-                if comment_text.strip():
-                    # 翻译注释内容
-                    translated_comment = translate_text(comment_text)
-                    translated_line = f"{indent}{hashes}{space}{translated_comment}\n"
-                    translated_source.append(translated_line)
-                else:
-                    translated_source.append(line)
-            else:
-                translated_source.append(line)
-        else:
-            # 保持代码不变
-            translated_source.append(line)
-    
-    return translated_source
+    return translate_code_lines(source, translate_text)
 
 def translate_notebook(notebook_path: Path, output_path: Path) -> None:
     """
@@ -228,42 +161,40 @@ def translate_notebook(notebook_path: Path, output_path: Path) -> None:
     print(f"正在翻译: {notebook_path.relative_to(notebook_path.parents[3])}")
     
     try:
-        # 读取原始notebook
-        with open(notebook_path, 'r', encoding='utf-8') as f:
-            notebook = json.load(f)
-        
-        # 翻译每个单元格
-        for i, cell in enumerate(notebook.get('cells', [])):
-            cell_type = cell.get('cell_type')
+        # 读取原始notebook（只解析单元格的cell_type/source，outputs按原字节保留）
+        with NotebookDocument(notebook_path) as notebook:
+            # 翻译每个单元格
+            for i, cell in enumerate(notebook.cells):
+                cell_type = cell.get('cell_type')
             
-            if cell_type == 'markdown':
-                # 翻译markdown单元格
-                source = cell.get('source', [])
-                if source:
-                    if isinstance(source, list):
-                        cell['source'] = translate_markdown_cell(source)
-                    elif isinstance(source, str):
-                        cell['source'] = translate_markdown_cell([source])
+                if cell_type == 'markdown':
+                    # 翻译markdown单元格
+                    source = cell.get('source', [])
+                    if source:
+                        if isinstance(source, list):
+                            cell['source'] = translate_markdown_cell(source)
+                        elif isinstance(source, str):
+                            cell['source'] = translate_markdown_cell([source])
                         
-            elif cell_type == 'code':
-                # 翻译代码单元格中的注释
-                source = cell.get('source', [])
-                if source:
-                    if isinstance(source, list):
-                        cell['source'] = translate_code_cell(source)
-                    elif isinstance(source, str):
-                        lines = source.split('\n')
-                        translated_lines = translate_code_cell([l + '\n' for l in lines])
-                        cell['source'] = ''.join(translated_lines)
+                elif cell_type == 'code':
+                    # 翻译代码单元格中的注释
+                    source = cell.get('source', [])
+                    if source:
+                        if isinstance(source, list):
+                            cell['source'] = translate_code_cell(source)
+                        elif isinstance(source, str):
+                            lines = source.split('\n')
+                            translated_lines = translate_code_cell([l + '\n' for l in lines])
+                            cell['source'] = ''.join(translated_lines)
         
-        # 确保输出目录存在
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+            # 确保输出目录存在
+            output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # 保存翻译后的notebook
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(notebook, f, ensure_ascii=False, indent=1)
+            # 保存翻译后的notebook（原子替换；内容未变化时不改写）
+            written = notebook.write(output_path)
+            get_metrics().inc('translation_writes_total', result='written' if written else 'unchanged')
         
-        print(f"  [完成]")
+        print(f"  [完成]" if written else f"  [完成] 译文未变化，跳过写入")
         
     except Exception as e:
         print(f"  [错误]: {e}")
@@ -291,15 +222,24 @@ def main():
     # 创建输出目录
     output_dir.mkdir(exist_ok=True)
     
+    # 打开共享翻译缓存
+    global cache
+    cache = open_default_cache()
+    
     # 查找所有notebook文件
     notebooks = find_all_notebooks(root_dir)
     
     print(f"找到 {len(notebooks)} 个notebook文件")
     print(f"输出目录: {output_dir}\n")
     
-    if not TRANSLATOR_AVAILABLE:
+    backends = get_registry()
+    if not translator_available():
         print("注意: 未安装翻译库，将使用简单替换。")
-        print("建议安装: pip install googletrans==4.0.0rc1\n")
+        print("建议安装: pip install googletrans==4.0.0rc1 或 pip install requests\n")
+    else:
+        # 后台探测各后端，不阻塞翻译；探测完成后优先使用最快的健康后端
+        backends.probe()
+        print(f"翻译后端: {', '.join(backend.name for backend in backends.backends)}\n")
     
     # 翻译每个文件
     success_count = 0
@@ -309,15 +249,26 @@ def main():
         relative_path = notebook_path.relative_to(root_dir)
         output_path = output_dir / relative_path
         
+        start = time.perf_counter()
         try:
             translate_notebook(notebook_path, output_path)
             success_count += 1
         except Exception as e:
             print(f"  [失败]: {e}")
+        get_metrics().set('translation_notebook_seconds', time.perf_counter() - start,
+                          notebook=relative_path.as_posix())
     
     print(f"\n{'='*60}")
     print(f"翻译完成！")
     print(f"成功: {success_count}/{len(notebooks)} 个文件")
+    cache_stats = cache.stats()
+    print(f"缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次, 共 {cache_stats['entries']} 条")
+    cache.close()
+    for name, item in backends.stats()['backends'].items():
+        print(f"后端 {name}: 请求 {item['requests']} 次, 胜出 {item['wins']} 次, 失败 {item['failures']} 次")
+    backends.close()
+    get_metrics().write(default_metrics_path())
+    print(f"指标: {default_metrics_path()}.json / .prom")
     print(f"输出目录: {output_dir}")
 
 if __name__ == '__main__':
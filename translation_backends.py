@@ -0,0 +1,302 @@
+"""
+翻译后端注册表与对冲请求
+注册多个后端（主API、第二组密钥、Google translate_a/single 等），请求先发给首选后端，
+超过该后端历史p95延迟仍未返回时，向下一个可用后端补发一份相同请求，先返回者胜出
+后端可以只给出构造函数，首次使用时才创建；probe() 在后台试译一小段文本，
+按探测和实际请求的延迟优先选用最快的健康后端
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, List, Optional, Tuple
+
+from markdown_protect import PLACEHOLDER_RE
+from translation_metrics import get_metrics
+from translation_packing import PACK_HEADER
+from translation_ratelimit import OverloadError
+
+RequestFn = Callable[[str, Optional[str]], str]
+
+
+class Backend:
+    def __init__(self, name: str, request_fn: Optional[RequestFn] = None, api_keys: Optional[List[str]] = None,
+                 window: int = 200, failure_limit: int = 3, cooldown: float = 60.0,
+                 factory: Optional[Callable[[], RequestFn]] = None, metric: Optional[str] = None,
+                 accepts: Optional[Callable[[str], bool]] = None):
+        """
+        request_fn(text, api_key) -> 译文，失败时抛出异常
+        factory: 不直接给出 request_fn 时，首次使用才调用它创建（如导入第三方库、建立客户端）；
+                 创建失败的后端不再使用
+        api_keys: 该后端自己的密钥池；为空时调用方传入的密钥原样转交
+        failure_limit: 连续失败次数达到该值后暂停使用 cooldown 秒
+        metric: 给出时把每次成功请求的延迟记入该直方图（标签 model=后端名），
+                不含调用方的重试等待；request_fn 自己记录延迟时不用设置
+        accepts(text): 该后端能否处理这份请求文本，不能处理时不向它发送或补发；默认都能处理
+        """
+        if request_fn is None and factory is None:
+            raise ValueError("request_fn 和 factory 至少给出一个")
+        self.name = name
+        self.request_fn = request_fn
+        self.factory = factory
+        self.available = True
+        self.api_keys = api_keys or []
+        self.failure_limit = failure_limit
+        self.cooldown = cooldown
+        self.metric = metric
+        self.accepts = accepts
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.wins = 0
+        self.failures = 0
+        self._consecutive_failures = 0
+        self._disabled_until = 0.0
+        self._key_index = 0
+        self._lock = threading.Lock()
+
+    def healthy(self) -> bool:
+        return self.available and time.monotonic() >= self._disabled_until
+
+    def median(self) -> Optional[float]:
+        """历史延迟中位数，没有样本时返回None"""
+        return self.quantile(0.5, 1)
+
+    def _resolve(self) -> RequestFn:
+        """按需创建后端"""
+        if self.request_fn is None:
+            with self._lock:
+                if self.request_fn is None and self.available:
+                    try:
+                        self.request_fn = self.factory()
+                    except Exception:
+                        self.available = False
+                        raise
+        if self.request_fn is None:
+            raise RuntimeError(f"后端 {self.name} 不可用")
+        return self.request_fn
+
+    def probe(self, text: str = 'test') -> bool:
+        """试译一小段文本：成功时延迟计入历史，失败时暂停使用 cooldown 秒"""
+        try:
+            self.request(text)
+            return True
+        except Exception:
+            with self._lock:
+                self._disabled_until = time.monotonic() + self.cooldown
+            return False
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        """历史延迟的分位数，样本不足时返回None"""
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _pick_key(self, api_key: Optional[str]) -> Optional[str]:
+        if not self.api_keys or api_key in self.api_keys:
+            return api_key
+        with self._lock:
+            key = self.api_keys[self._key_index % len(self.api_keys)]
+            self._key_index += 1
+        return key
+
+    def request(self, text: str, api_key: Optional[str] = None) -> str:
+        start = time.monotonic()
+        with self._lock:
+            self.requests += 1
+        try:
+            result = self._resolve()(text, self._pick_key(api_key))
+        except Exception:
+            with self._lock:
+                self.failures += 1
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_limit:
+                    self._disabled_until = time.monotonic() + self.cooldown
+                    self._consecutive_failures = 0
+            raise
+        latency = time.monotonic() - start
+        with self._lock:
+            self.latencies.append(latency)
+            self._consecutive_failures = 0
+        if self.metric is not None:
+            get_metrics().observe(self.metric, latency, model=self.name)
+        return result
+
+
+class BackendRegistry:
+    def __init__(self, quantile: float = 0.95, min_samples: int = 20, initial_delay: float = 10.0,
+                 min_delay: float = 1.0, max_workers: int = 32, prefer_fastest: bool = False):
+        """
+        quantile: 补发阈值取首选后端延迟的该分位数
+        initial_delay: 延迟样本不足 min_samples 时的补发阈值（秒）
+        min_delay: 补发阈值下限，避免延迟很低时几乎每个请求都补发
+        prefer_fastest: 按延迟中位数选首选后端；否则按注册顺序
+        """
+        self.backends: List[Backend] = []
+        self.prefer_fastest = prefer_fastest
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+
+    def register(self, backend: Backend) -> Backend:
+        self.backends.append(backend)
+        return backend
+
+    def hedge_delay(self, backend: Backend) -> float:
+        observed = backend.quantile(self.quantile, self.min_samples)
+        return max(self.min_delay, observed if observed is not None else self.initial_delay)
+
+    def _candidates(self, text: Optional[str] = None) -> List[Backend]:
+        usable = [backend for backend in self.backends if backend.available
+                  and (text is None or backend.accepts is None or backend.accepts(text))]
+        healthy = [backend for backend in usable if backend.healthy()] or usable
+        if self.prefer_fastest:
+            # 有延迟样本的后端按中位数排在前面，其余保持注册顺序
+            medians = {backend.name: backend.median() for backend in healthy}
+            healthy.sort(key=lambda backend: (medians[backend.name] is None, medians[backend.name] or 0.0))
+        return healthy
+
+    def preferred(self) -> Optional[Backend]:
+        """当前的首选后端"""
+        candidates = self._candidates()
+        return candidates[0] if candidates else None
+
+    def probe(self, text: str = 'test') -> list:
+        """在后台探测所有后端，立即返回各探测任务的 Future"""
+        return [self._executor.submit(backend.probe, text) for backend in self.backends]
+
+    def request(self, text: str, api_key: Optional[str] = None) -> str:
+        """
+        对冲请求，返回最先成功的译文（供并发引擎调用）
+        首选后端过载（429、超时）而由其他后端给出译文时，仍抛出首选后端的 OverloadError，
+        译文放在它的 result 属性中：并发引擎据此降速，同时直接采用该译文
+        """
+        translated, _, overload = self._hedge(text, api_key)
+        if overload is not None:
+            overload.result = translated
+            raise overload
+        return translated
+
+    def answer(self, text: str, api_key: Optional[str] = None) -> Tuple[str, str]:
+        """对冲请求，返回 (译文, 给出译文的后端名)"""
+        translated, name, _ = self._hedge(text, api_key)
+        return translated, name
+
+    def _hedge(self, text: str, api_key: Optional[str]) -> Tuple[str, str, Optional[OverloadError]]:
+        """
+        首选后端超过p95仍未返回（或已失败）时补发给下一个能处理该文本的后端，取最先成功的结果
+        返回 (译文, 后端名, 胜出前首选后端抛出的 OverloadError 或 None)
+        所有后端都失败时抛出最先失败的异常（首选后端429时仍是 OverloadError，并发控制器会降速）
+        """
+        candidates = self._candidates(text)
+        if not candidates:
+            raise RuntimeError("没有可用的翻译后端")
+        pending: dict = {}
+        errors: List[Exception] = []
+        overload: Optional[OverloadError] = None
+
+        def launch(backend: Backend):
+            future = self._executor.submit(backend.request, text, api_key)
+            pending[future] = backend
+
+        launch(candidates[0])
+        remaining = candidates[1:]
+        while pending:
+            timeout = self.hedge_delay(candidates[0]) if remaining else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                backend = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    with backend._lock:
+                        backend.wins += 1
+                    if backend is not candidates[0]:
+                        with self._lock:
+                            self.hedge_wins += 1
+                        get_metrics().inc('translation_hedge_wins_total', backend=backend.name)
+                    return future.result(), backend.name, overload
+                if backend is candidates[0] and isinstance(error, OverloadError):
+                    overload = error
+                errors.append(error)
+            # 超时未返回或已有后端失败：补发给下一个后端
+            if remaining and (not done or not pending):
+                if not done:
+                    with self._lock:
+                        self.hedges += 1
+                    get_metrics().inc('translation_hedges_total', backend=remaining[0].name)
+                launch(remaining.pop(0))
+        raise errors[0]
+
+    def stats(self) -> dict:
+        return {
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'backends': {backend.name: {'requests': backend.requests, 'wins': backend.wins,
+                                        'failures': backend.failures, 'available': backend.available,
+                                        'p95': backend.quantile(0.95, 1)}
+                         for backend in self.backends},
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def open_default_registry(primary: RequestFn, backup: Optional[RequestFn] = None,
+                          backup_keys: Optional[List[str]] = None) -> BackendRegistry:
+    """
+    按 translation_config 中的设置建立后端注册表：
+    主API -> 第二组密钥（如配置） -> Google translate_a/single（如启用）
+    """
+    import translation_config as config
+    registry = BackendRegistry(quantile=config.hedge_quantile, initial_delay=config.hedge_initial_delay,
+                               min_delay=config.hedge_min_delay, max_workers=config.max_concurrency * 2)
+    registry.register(Backend('ai', primary))
+    if backup is not None:
+        registry.register(Backend('backup', backup, backup_keys))
+    if config.google_fallback:
+        # Google翻译没有提示词，只接收不含打包标记和保护占位符的普通文本
+        registry.register(Backend('google', google_translate, accepts=plain_text))
+    return registry
+
+
+def plain_text(text: str) -> bool:
+    """不含打包标记和保护占位符的文本，不需要提示词说明就能直接翻译"""
+    return PACK_HEADER not in text and PLACEHOLDER_RE.search(text) is None
+
+
+def google_translate(text: str, api_key: Optional[str] = None) -> str:
+    """Google translate_a/single 免费接口（共享连接池），失败时抛出异常"""
+    from translation_http import get_session
+    response = get_session().get(
+        "https://translate.googleapis.com/translate_a/single",
+        params={'client': 'gtx', 'sl': 'en', 'tl': 'zh-cn', 'dt': 't', 'q': text},
+        timeout=10,
+    )
+    if response.status_code == 429:
+        raise OverloadError("Google翻译限制 (HTTP 429)")
+    if response.status_code != 200:
+        raise Exception(f"Google翻译失败: HTTP {response.status_code}")
+    result = response.json()
+    if not result or not result[0]:
+        raise Exception("Google翻译响应格式错误")
+    return ''.join(item[0] for item in result[0] if item[0])
+
+
+def googletrans_backend() -> RequestFn:
+    """googletrans 后端的构造函数：导入库并创建客户端（未安装时抛出 ImportError）"""
+    from googletrans import Translator
+    client = Translator()
+
+    def request(text: str, api_key: Optional[str] = None) -> str:
+        result = client.translate(text, src='en', dest='zh-cn')
+        if not result or not result.text:
+            raise Exception("googletrans 返回空结果")
+        return result.text
+
+    return request
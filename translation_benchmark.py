@@ -0,0 +1,223 @@
+"""
+翻译流程基准测试
+protect: 对比逐模式循环替换（旧实现）与单次扫描（markdown_protect）的保护/恢复耗时
+pipeline: 在离线模拟服务上完整翻译仓库中的notebook，统计吞吐量和延迟分位数
+"""
+import argparse
+import contextlib
+import io
+import json
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import markdown_protect
+import translation_config as config
+from mock_translation_server import add_server_arguments, server_from_args
+from notebook_io import NotebookDocument
+from translation_engine import TranslationEngine
+from translation_packing import estimate_tokens
+from translation_ratelimit import OverloadError
+
+SKIP_DIRS = ('notebooks-zh', 'archive', '.git', '.ipynb_checkpoints')
+
+
+def legacy_protect(text: str) -> tuple:
+    """旧实现：每种模式扫描一遍，再用 str.replace 逐个替换（作为对照）"""
+    patterns = [pattern for _, pattern in markdown_protect.PROTECT_PATTERNS]
+    protected_items = []
+    for i, pattern in enumerate(patterns):
+        for j, match in enumerate(list(re.finditer(pattern, text))):
+            placeholder = f"__PROTECT_{i}_{j}__"
+            protected_items.append((placeholder, match.group()))
+            text = text.replace(match.group(), placeholder, 1)
+    return text, protected_items
+
+
+def legacy_restore(text: str, protected_items: list) -> str:
+    for placeholder, original in protected_items:
+        text = text.replace(placeholder, original)
+    return text
+
+
+def find_notebooks(root: Path) -> List[Path]:
+    return [path for path in root.rglob('*.ipynb')
+            if not any(skip in str(path) for skip in SKIP_DIRS)]
+
+
+def largest_notebooks(root: Path, count: int) -> List[Path]:
+    return sorted(find_notebooks(root), key=lambda p: p.stat().st_size, reverse=True)[:count]
+
+
+def markdown_texts(paths: List[Path]) -> List[str]:
+    texts = []
+    for path in paths:
+        with NotebookDocument(path) as notebook:
+            for cell in notebook.cells:
+                if cell.get('cell_type') == 'markdown':
+                    source = cell.get('source') or []
+                    texts.append(source if isinstance(source, str) else ''.join(source))
+    return texts
+
+
+def time_round_trip(texts: List[str], protect: Callable, restore: Callable, repeat: int) -> float:
+    """返回多轮中最快一轮的耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            protected, items = protect(text)
+            restore(protected, items)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_protect(args):
+    paths = largest_notebooks(Path(args.root), args.notebooks)
+    texts = markdown_texts(paths)
+    total_chars = sum(len(text) for text in texts)
+    print(f"📚 {len(paths)} 个最大的notebook，{len(texts)} 个markdown单元格，{total_chars} 个字符")
+
+    broken = sum(1 for text in texts
+                 if markdown_protect.restore(*markdown_protect.protect(text)) != text)
+    print(f"   单次扫描往返不一致: {broken}")
+
+    legacy = time_round_trip(texts, legacy_protect, legacy_restore, args.repeat)
+    single = time_round_trip(texts, markdown_protect.protect, markdown_protect.restore, args.repeat)
+    print(f"   逐模式替换: {legacy * 1000:.2f} ms")
+    print(f"   单次扫描:   {single * 1000:.2f} ms  (加速 {legacy / single:.1f}x)")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩法分位数，q取0-100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class RequestRecorder:
+    """包装请求函数，记录每次请求的延迟、令牌数和过载次数"""
+    def __init__(self, request_fn: Callable[[str, str], str]):
+        self.request_fn = request_fn
+        self.latencies: List[float] = []
+        self.tokens = 0
+        self.overloads = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str, api_key: str) -> str:
+        start = time.perf_counter()
+        try:
+            result = self.request_fn(text, api_key)
+        except OverloadError:
+            with self._lock:
+                self.overloads += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(latency)
+            self.tokens += estimate_tokens(text) + estimate_tokens(result)
+        return result
+
+
+def bench_pipeline(args) -> Dict[str, float]:
+    from ai_translate_simple import AITranslator, translate_notebook
+
+    root = Path(args.root).resolve()
+    notebooks = sorted(find_notebooks(root))
+    if args.notebooks:
+        notebooks = notebooks[:args.notebooks]
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = server_from_args(args).start()
+        base_url = server.url
+
+    keys = [f"mock-key-{i + 1}" for i in range(args.keys)]
+    translator = AITranslator(keys, base_url, 'mock-model')
+    recorder = RequestRecorder(translator.request_translation)
+    engine = TranslationEngine(recorder, keys, max_workers=config.max_workers,
+                               max_retries=config.max_retries,
+                               max_concurrency=args.concurrency or config.max_concurrency)
+
+    print(f"📚 {len(notebooks)} 个notebook，服务: {base_url}")
+    failures = 0
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            for path in notebooks:
+                target = Path(output_dir) / 'notebooks-zh' / path.relative_to(root)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ok = translate_notebook(translator, path, target, engine)
+                failures += not ok
+            wall = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.stop()
+
+    latencies = recorder.latencies
+    report = {
+        'notebooks': len(notebooks),
+        'failed_notebooks': failures,
+        'requests': len(latencies),
+        'overloads': recorder.overloads,
+        'errors': recorder.errors,
+        'tokens': recorder.tokens,
+        'wall_time': wall,
+        'requests_per_second': len(latencies) / wall if wall else 0.0,
+        'tokens_per_second': recorder.tokens / wall if wall else 0.0,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'latency_p99': percentile(latencies, 99),
+        'final_concurrency': engine.controller.limit,
+        'connection_reuse': translator.session.stats()['reuse_rate'],
+    }
+    print(f"   请求: {report['requests']} 次成功, {report['overloads']} 次过载, {report['errors']} 次错误")
+    print(f"   吞吐: {report['requests_per_second']:.1f} 请求/秒, {report['tokens_per_second']:.0f} 令牌/秒")
+    print(f"   延迟: p50 {report['latency_p50'] * 1000:.0f} ms, p95 {report['latency_p95'] * 1000:.0f} ms, "
+          f"p99 {report['latency_p99'] * 1000:.0f} ms")
+    print(f"   总耗时: {wall:.2f} 秒, 最终并发 {report['final_concurrency']:.1f}, "
+          f"连接复用率 {report['connection_reuse']:.0%}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"   报告已写入: {args.output}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="翻译流程基准测试")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    protect_parser = subparsers.add_parser('protect', help="markdown内容保护耗时")
+    protect_parser.add_argument('--root', default='.', help="notebook所在目录")
+    protect_parser.add_argument('--notebooks', type=int, default=5, help="取最大的几个notebook")
+    protect_parser.add_argument('--repeat', type=int, default=20, help="重复轮数，取最快一轮")
+    protect_parser.set_defaults(func=bench_protect)
+
+    pipeline_parser = subparsers.add_parser('pipeline', help="在模拟服务上测试翻译吞吐量")
+    pipeline_parser.add_argument('--root', default='.', help="notebook所在目录")
+    pipeline_parser.add_argument('--notebooks', type=int, default=0, help="只翻译前几个notebook（0为全部）")
+    pipeline_parser.add_argument('--url', default=None, help="使用已运行的服务地址，不启动内置模拟服务")
+    pipeline_parser.add_argument('--keys', type=int, default=3, help="模拟API密钥数")
+    pipeline_parser.add_argument('--concurrency', type=int, default=0, help="并发上限（0使用配置文件）")
+    pipeline_parser.add_argument('--output', default=None, help="JSON报告输出路径")
+    add_server_arguments(pipeline_parser)
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+翻译缓存 - 基于SQLite的内容寻址缓存
+以 (保护后的原文, 模型, 提示词, temperature) 的哈希为键，相同文本不会重复请求
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from translation_metrics import get_metrics
+
+
+class TranslationCache:
+    def __init__(self, path: Union[str, Path], max_entries: int = 200000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            ' key TEXT PRIMARY KEY,'
+            ' source TEXT NOT NULL,'
+            ' translation TEXT NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)')
+
+    @staticmethod
+    def make_key(text: str, model: str, prompt: str, temperature: float) -> str:
+        """计算缓存键"""
+        digest = hashlib.sha256()
+        for part in (model, prompt, repr(float(temperature)), text):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """查询缓存，命中时更新使用时间"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT translation FROM translations WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                get_metrics().inc('translation_cache_lookups_total', result='miss')
+                return None
+            self.hits += 1
+            get_metrics().inc('translation_cache_lookups_total', result='hit')
+            self._conn.execute('UPDATE translations SET last_used = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def contains(self, key: str) -> bool:
+        """检查是否已缓存（不计入命中统计，也不更新使用时间）"""
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM translations WHERE key = ?', (key,)).fetchone() is not None
+
+    def put(self, key: str, source: str, translation: str):
+        """写入缓存，超过容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO translations (key, source, translation, last_used) VALUES (?, ?, ?, ?)',
+                (key, source, translation, time.time())
+            )
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 100:
+                self._evict()
+
+    def _evict(self):
+        """按最近使用时间淘汰超出 max_entries 的条目（调用方持有锁）"""
+        self._puts_since_evict = 0
+        count = self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM translations WHERE key IN '
+                '(SELECT key FROM translations ORDER BY last_used LIMIT ?)', (excess,)
+            )
+
+    def recent_entries(self, limit: int) -> List[Tuple[str, str]]:
+        """返回最近使用的 (原文, 译文) 条目，供翻译记忆建立索引"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT source, translation FROM translations ORDER BY last_used DESC LIMIT ?', (limit,)
+            ).fetchall()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        """返回命中统计"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._conn.close()
+
+
+def open_default_cache() -> TranslationCache:
+    """按 translation_config 中的设置打开共享缓存"""
+    import translation_config as config
+    root_dir = Path(__file__).parent
+    return TranslationCache(root_dir / config.cache_path, max_entries=config.cache_max_entries)
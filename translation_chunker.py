@@ -0,0 +1,81 @@
+"""
+按令牌预算切分长文本
+相邻段落合并到预算以内再请求，超出预算的单个段落在句子边界处切开（仍超出时按词切开），
+切分点只落在空白处，保护占位符（__PROTECT_n__）不会被拆开；各块依次拼接后与原文完全一致
+"""
+import re
+from typing import List, Optional
+
+from translation_packing import estimate_tokens
+
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+# 句末标点后的空白，排除常见缩写
+_SENTENCE_BREAK = re.compile(r'(?<![Ee]\.g\.)(?<![Ii]\.e\.)(?<!etc\.)(?<!vs\.)(?<!Fig\.)(?<=[.!?。！？])\s+')
+_WORD_BREAK = re.compile(r'\s+')
+
+
+def _split_after(text: str, pattern: re.Pattern) -> List[str]:
+    """在匹配处切开，分隔符留在前一块末尾"""
+    pieces = []
+    pos = 0
+    for match in pattern.finditer(text):
+        if match.end() > pos and match.start() > 0:
+            pieces.append(text[pos:match.end()])
+            pos = match.end()
+    if pos < len(text):
+        pieces.append(text[pos:])
+    return pieces
+
+
+def _fits(text: str, budget: int, max_chars: Optional[int]) -> bool:
+    return estimate_tokens(text) <= budget and (max_chars is None or len(text) <= max_chars)
+
+
+def _pack(pieces: List[str], budget: int, max_chars: Optional[int]) -> List[str]:
+    """顺序合并相邻小块，不超过预算"""
+    chunks: List[str] = []
+    current = ''
+    for piece in pieces:
+        if current and not _fits(current + piece, budget, max_chars):
+            chunks.append(current)
+            current = ''
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_oversized(piece: str, budget: int, max_chars: Optional[int]) -> List[str]:
+    """把超出预算的段落先按句子、再按词切成不超预算的小块"""
+    if _fits(piece, budget, max_chars):
+        return [piece]
+    sentences = []
+    for sentence in _split_after(piece, _SENTENCE_BREAK):
+        if _fits(sentence, budget, max_chars):
+            sentences.append(sentence)
+        else:
+            # 单个句子仍然过长，按词切开（单个词超长时只能独立成块）
+            sentences.extend(_pack(_split_after(sentence, _WORD_BREAK), budget, max_chars))
+    return _pack(sentences, budget, max_chars)
+
+
+def chunk_text(text: str, budget: int, max_chars: Optional[int] = None) -> List[str]:
+    """
+    将文本切分为令牌数不超过 budget（且字符数不超过 max_chars）的块
+    ''.join(结果) == text
+    """
+    if _fits(text, budget, max_chars):
+        return [text]
+    pieces = []
+    for paragraph in _split_after(text, _PARAGRAPH_BREAK):
+        pieces.extend(_split_oversized(paragraph, budget, max_chars))
+    return _pack(pieces, budget, max_chars)
+
+
+def split_edges(chunk: str) -> tuple:
+    """拆出块首尾的空白，返回 (前导空白, 正文, 尾随空白)"""
+    core = chunk.strip()
+    if not core:
+        return chunk, '', ''
+    start = chunk.index(core)
+    return chunk[:start], core, chunk[start + len(core):]
@@ -0,0 +1,235 @@
+"""
+兼容OpenAI接口的翻译客户端
+两个AI翻译脚本共用的请求部分：构建请求体、解析响应、缓存键、供并发引擎调用的单次请求，
+以及查询断点日志/缓存/翻译记忆后打包翻译片段的流程。
+各脚本的子类只给出提示词（prompt_messages）和逐单元格的翻译方法
+"""
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import translation_config as config
+from translation_backends import BackendRegistry, open_default_registry
+from translation_cache import TranslationCache
+from translation_engine import TranslationEngine
+from translation_http import get_session
+from translation_journal import TranslationJournal
+from translation_memory import TranslationMemory, reference_prompt
+from translation_metrics import get_metrics, record_response
+from translation_packing import translate_packed
+from translation_ratelimit import OverloadError, RateLimitError, parse_retry_after
+
+
+class ChatTranslator:
+    temperature = 0.3
+    response_prefixes: Tuple[str, ...] = ('翻译结果：', '翻译：', '中文翻译：', '译文：')  # 译文前需要去掉的说明
+
+    def __init__(self, api_keys: List[str], base_url: str, model: str):
+        self.api_keys = api_keys
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.current_key_index = 0
+        self.request_count = 0
+        self.error_count = 0
+        self.translated: Dict[str, str] = {}  # 并发引擎的结果表
+        self._recording: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self.cache: Optional[TranslationCache] = None
+        self.session = get_session()
+        self.journal: Optional[TranslationJournal] = None
+        self.failed: set = set()  # 翻译失败、退回原文的文本
+        self.memory: Optional[TranslationMemory] = None
+        self.references: Dict[str, Tuple[str, str]] = {}  # 片段 -> 翻译记忆中相似的 (原文, 译文)
+
+    def get_current_key(self) -> str:
+        """获取当前使用的API密钥"""
+        return self.api_keys[self.current_key_index % len(self.api_keys)]
+
+    def rotate_key(self):
+        """轮换到下一个API密钥"""
+        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+        print(f"  -> 切换到API密钥 {self.current_key_index + 1}/{len(self.api_keys)}")
+
+    def prompt_messages(self, text: str) -> List[dict]:
+        """翻译 text 的提示词消息（由子类给出）"""
+        raise NotImplementedError
+
+    def build_payload(self, text: str) -> dict:
+        """构建翻译请求体"""
+        messages = self.prompt_messages(text)
+        # 翻译记忆中的相似译文作为参考，放在最后一条用户消息之前
+        if text in self.references:
+            messages.insert(len(messages) - 1, {'role': 'system', 'content': reference_prompt(*self.references[text])})
+        return {
+            'model': self.model,
+            'messages': messages,
+            'temperature': self.temperature,
+            'max_tokens': config.max_tokens
+        }
+
+    def parse_response(self, response) -> str:
+        """从API响应中提取译文"""
+        result = response.json()
+        if 'choices' in result and len(result['choices']) > 0:
+            translated_text = result['choices'][0]['message']['content'].strip()
+            # 清理不必要的前缀
+            for prefix in self.response_prefixes:
+                if translated_text.startswith(prefix):
+                    translated_text = translated_text[len(prefix):].strip()
+            return translated_text
+        raise Exception("API响应格式错误")
+
+    def cache_key(self, text: str) -> str:
+        """计算文本的缓存键（提示词模板取自空文本的请求体）"""
+        payload = self.build_payload('')
+        prompt = json.dumps(payload['messages'], ensure_ascii=False)
+        return TranslationCache.make_key(text, self.model, prompt, payload['temperature'])
+
+    def request_translation(self, text: str, api_key: str) -> str:
+        """发送单次翻译请求（供并发引擎调用），失败时抛出异常"""
+        headers = {
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        }
+        payload = self.build_payload(text)
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=30
+            )
+        except requests.Timeout as e:
+            get_metrics().inc('translation_requests_total', model=self.model, status='timeout')
+            raise OverloadError(f"请求超时: {e}")
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.request_count += 1
+        if response.status_code != 200:
+            record_response(response, self.model, api_key, latency)
+        if response.status_code == 429:
+            raise RateLimitError("API限制 (HTTP 429)", parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code != 200:
+            with self._lock:
+                self.error_count += 1
+            raise Exception(f"HTTP {response.status_code}: {response.text[:100]}")
+        translated_text = self.parse_response(response)
+        prompt_text = ''.join(message['content'] for message in payload['messages'])
+        record_response(response, self.model, api_key, latency, prompt_text, translated_text)
+        return translated_text
+
+    def translate_segments(self, texts: List[str], engine: TranslationEngine) -> Dict[str, str]:
+        """查询断点日志和缓存后，将其余文本打包交给并发引擎翻译；返回结果不含翻译失败的文本"""
+        results = {}
+        pending = []
+        for text in texts:
+            if text in self.translated:
+                results[text] = self.translated[text]
+                continue
+            key = self.cache_key(text)
+            cached = self.journal.get(key) if self.journal is not None else None
+            if cached is None and self.cache is not None:
+                cached = self.cache.get(key)
+            if cached is not None:
+                results[text] = cached
+            else:
+                pending.append(text)
+
+        # 每个片段完成后立即写入断点日志
+        on_segment = None
+        if self.journal is not None:
+            on_segment = lambda text, translated_text: self.journal.append(self.cache_key(text), translated_text)
+
+        # 彼此相似的片段分两轮：先翻译代表片段，其余片段再从翻译记忆中修补复用
+        waves = [pending]
+        if pending and self.memory is not None:
+            waves = list(self.memory.split_near_duplicates(pending))
+        for wave in waves:
+            if wave:
+                results.update(self._translate_wave(wave, engine, on_segment))
+        return results
+
+    def _translate_wave(self, texts: List[str], engine: TranslationEngine, on_segment=None) -> Dict[str, str]:
+        """翻译一批片段；翻译记忆命中的片段修补复用或附带参考译文"""
+        translated, failed = {}, set()
+        referenced = []
+        if self.memory is not None:
+            translated, references, texts = self.memory.resolve(texts)
+            self.references.update(references)
+            referenced = list(references)
+
+        if texts:
+            part, part_failed = translate_packed(engine, texts, config.max_tokens,
+                                                 config.pack_short_tokens, config.pack_max_segments, on_segment)
+            translated.update(part)
+            failed |= part_failed
+        if referenced:
+            # 附带参考译文的片段逐段请求，不参与打包
+            part, part_failed = translate_packed(engine, referenced, config.max_tokens, 0, 1, on_segment)
+            translated.update(part)
+            failed |= part_failed
+
+        # 失败的片段不进入结果表和缓存，之后的请求会重新翻译
+        translated = {text: value for text, value in translated.items() if text not in failed}
+        self.failed.difference_update(translated)
+        self.failed.update(failed)
+        for text, translated_text in translated.items():
+            if self.cache is not None:
+                self.cache.put(self.cache_key(text), text, translated_text)
+            if self.memory is not None:
+                self.memory.add(text, translated_text)
+        return translated
+
+    def reset(self):
+        """清空结果表、失败记录和参考译文（常驻运行时每个notebook之后调用）"""
+        self.translated.clear()
+        self.failed.clear()
+        self.references.clear()
+
+    def collect_texts(self, cells: List[dict]) -> List[str]:
+        """预演单元格翻译，收集所有需要请求的文本"""
+        self._recording = []
+        try:
+            for cell in cells:
+                source = cell_source_lines(cell)
+                if not source:
+                    continue
+                if cell.get('cell_type') == 'markdown':
+                    self.translate_markdown_cell(source)
+                elif cell.get('cell_type') == 'code':
+                    self.translate_code_cell(source)
+            return list(dict.fromkeys(self._recording))
+        finally:
+            self._recording = None
+
+    def translate_markdown_cell(self, source: List[str]) -> List[str]:
+        raise NotImplementedError
+
+    def translate_code_cell(self, source: List[str]) -> List[str]:
+        raise NotImplementedError
+
+
+def cell_source_lines(cell: dict) -> List[str]:
+    """获取单元格源码的行列表"""
+    source = cell.get('source', [])
+    if isinstance(source, str):
+        if cell.get('cell_type') == 'markdown':
+            return [source]
+        source = source.split('\n')
+        source = [line + '\n' for line in source[:-1]] + [source[-1]]
+    return source
+
+
+def open_registry(translator: ChatTranslator) -> BackendRegistry:
+    """主API + translation_config 中配置的备用后端，用于对冲请求"""
+    backup = None
+    if config.backup_api_keys:
+        backup = type(translator)(config.backup_api_keys, config.backup_base_url, config.backup_model)
+        backup.references = translator.references  # 对冲请求使用与主API相同的请求内容
+    return open_default_registry(translator.request_translation,
+                                 backup.request_translation if backup is not None else None,
+                                 config.backup_api_keys)
@@ -12,15 +12,52 @@ api_keys = [
 base_url = "https://api.poe.com/v1/"
 model = "GPT-5-mini"
 
+# 备用后端（对冲请求）：主API超过p95延迟仍未返回时，向备用后端补发同一请求，先返回者胜出
+backup_api_keys = []         # 第二组密钥，为空时不启用
+backup_base_url = base_url   # 第二组密钥对应的API地址（可以是另一家服务商）
+backup_model = model
+google_fallback = False      # 是否把Google translate_a/single作为最后的备用后端（译文质量较低）
+hedge_quantile = 0.95        # 补发阈值取主API延迟的该分位数
+hedge_initial_delay = 10.0   # 延迟样本不足时的补发阈值（秒）
+hedge_min_delay = 1.0        # 补发阈值下限（秒）
+
 # 翻译设置
 max_retries = 3              # 最大重试次数
-request_delay = (0.5, 1.0)   # 请求间隔（秒），随机范围
+request_delay = (0.5, 1.0)   # 已不起作用：请求间隔由自适应并发控制器（max_concurrency）调节
 timeout = 30                 # 请求超时时间（秒）
+transport_retries = 2        # 连接失败、502/503/504 时的传输层重试次数
 temperature = 0.3            # 翻译创造性（0-1，越低越保守）
 max_tokens = 2000            # 最大生成令牌数
 
+# 请求打包设置
+pack_short_tokens = 200      # 令牌数不超过该值的片段（注释、短markdown）会被合并到同一请求
+pack_max_segments = 40       # 每个打包请求最多包含的片段数
+
+# 运行估算设置（只用于 translation_planner.py 和启动时的预估，不影响翻译）
+price_per_1k_input = 0.00025     # 输入令牌单价（美元/千令牌）
+price_per_1k_output = 0.002      # 输出令牌单价（美元/千令牌）
+estimated_output_ratio = 1.0     # 译文令牌数相对原文的比例
+estimated_base_latency = 1.5     # 单次请求的固定延迟（秒）
+estimated_output_speed = 60      # 生成速度（令牌/秒）
+
+# 翻译记忆设置
+memory_threshold = 0.85      # 模糊匹配相似度阈值（0-1），只差变量名或数字的片段直接复用旧译文；设为0关闭
+memory_max_entries = 20000   # 启动时从缓存载入翻译记忆的最近条目数
+
 # 并发设置
-max_workers = 2              # 最大并发线程数（建议不超过2避免API限制）
+max_workers = 2              # 每个密钥的初始并发数（建议不超过2避免API限制）
+max_concurrency = 16         # 自适应并发上限：延迟平稳时逐步提高，遇到429/超时减半
+max_processes = 2            # 并行翻译notebook的进程数（ai_translate_simple.py），并发上限在进程间平分
+
+# 断点续传设置
+journal_dir = ".translation_journal"   # 断点日志目录，每个片段完成后立即写入，中断后重新运行可继续
+
+# 缓存设置
+cache_path = ".translation_cache.sqlite"   # 翻译缓存文件（相对项目根目录）
+cache_max_entries = 200000                 # 缓存最大条目数，超出后淘汰最久未使用的条目
+
+# 指标设置
+metrics_path = ".translation_metrics"    # 运行结束后写出 .translation_metrics.json 汇总和 .translation_metrics.prom
 
 # 文件过滤设置
 skip_patterns = [
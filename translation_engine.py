@@ -0,0 +1,130 @@
+"""
+异步并发翻译引擎
+使用asyncio调度翻译请求，限制同时在途的请求数量，
+每个工作协程绑定一个API密钥，所有结果写入同一个结果表
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional
+
+from translation_metrics import get_metrics
+from translation_ratelimit import AIMDController, OverloadError
+
+ResultCallback = Callable[[Hashable, str], None]
+
+MAX_OVERLOAD_RETRIES = 10
+
+
+class TranslationEngine:
+    def __init__(self, request_fn: Callable[[str, str], str], api_keys: List[str],
+                 max_workers: int = 2, max_retries: int = 3, retry_delay: float = 3.0,
+                 max_concurrency: Optional[int] = None):
+        """
+        request_fn: 单次请求函数 (text, api_key) -> 译文，失败时抛出异常；
+                    过载（429、超时）时应抛出 OverloadError
+        max_workers: 每个API密钥的初始并发数，初始总并发数 = max_workers * 密钥数
+        max_concurrency: 自适应并发的上限，默认与初始并发数相同
+        """
+        self.request_fn = request_fn
+        self.api_keys = api_keys
+        self.max_in_flight = max(1, max_workers) * max(1, len(api_keys))
+        self.controller = AIMDController(initial=self.max_in_flight,
+                                         maximum=max(max_concurrency or 0, self.max_in_flight))
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # 共享结果表：任务ID -> 译文（只保存成功的结果，失败的任务记入 errors，下次调用时重新请求）
+        self.results: Dict[Hashable, str] = {}
+        self.errors: Dict[Hashable, str] = {}
+
+    def key_for_worker(self, worker_id: int) -> str:
+        """按工作协程编号分配API密钥"""
+        return self.api_keys[worker_id % len(self.api_keys)]
+
+    async def _worker(self, worker_id: int, queue: asyncio.Queue, executor: ThreadPoolExecutor,
+                      on_result: Optional[ResultCallback] = None):
+        """工作协程：从队列取任务，使用自己的密钥发送请求"""
+        loop = asyncio.get_running_loop()
+        api_key = self.key_for_worker(worker_id)
+        metrics = get_metrics()
+        while True:
+            job_id, text, attempt, overloads = await queue.get()
+            retry = None
+            await self.controller.acquire()
+            start = loop.time()
+            try:
+                self.results[job_id] = await loop.run_in_executor(executor, self.request_fn, text, api_key)
+                self.errors.pop(job_id, None)
+                self.controller.on_success(loop.time() - start)
+                if on_result is not None:
+                    on_result(job_id, self.results[job_id])
+            except OverloadError as e:
+                # 降低并发并暂停，任务放回队列（不计入普通重试次数）
+                self.controller.on_overload(e.retry_after)
+                metrics.set('translation_concurrency_limit', self.controller.limit)
+                if e.result is not None:
+                    # 备用后端已给出译文，只需降速
+                    self.results[job_id] = e.result
+                    self.errors.pop(job_id, None)
+                    if on_result is not None:
+                        on_result(job_id, e.result)
+                elif overloads + 1 < MAX_OVERLOAD_RETRIES:
+                    metrics.inc('translation_retries_total', reason='overload')
+                    queue.put_nowait((job_id, text, attempt, overloads + 1))
+                else:
+                    print(f"    API持续过载，使用原文: {str(e)[:80]}")
+                    metrics.inc('translation_failures_total', reason='overload')
+                    self.errors[job_id] = str(e)
+            except Exception as e:
+                if attempt + 1 < self.max_retries:
+                    retry = (job_id, text, attempt + 1, overloads)
+                    metrics.inc('translation_retries_total', reason='error')
+                else:
+                    print(f"    翻译失败，使用原文: {str(e)[:80]}")
+                    metrics.inc('translation_failures_total', reason='error')
+                    self.errors[job_id] = str(e)
+            finally:
+                await self.controller.release()
+            if retry is not None:
+                # 等待后放回队列，由其他密钥的工作协程重试
+                await asyncio.sleep(self.retry_delay * retry[2])
+                queue.put_nowait(retry)
+            queue.task_done()
+
+    async def _run(self, jobs: Dict[Hashable, str], on_result: Optional[ResultCallback] = None):
+        queue: asyncio.Queue = asyncio.Queue()
+        for job_id, text in jobs.items():
+            queue.put_nowait((job_id, text, 0, 0))
+
+        # 按并发上限启动工作协程，实际并发由控制器调节
+        self.controller.attach()
+        worker_count = min(self.controller.maximum, len(jobs))
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            workers = [asyncio.create_task(self._worker(i, queue, executor, on_result))
+                       for i in range(worker_count)]
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def translate_all(self, jobs: Dict[Hashable, str],
+                      on_result: Optional[ResultCallback] = None) -> Dict[Hashable, str]:
+        """
+        并发翻译所有任务，返回 任务ID -> 译文（失败的任务为原文，原因见 errors）
+        on_result: 每个请求成功后立即调用 (任务ID, 译文)，用于实时记录进度
+        """
+        pending = {job_id: text for job_id, text in jobs.items() if job_id not in self.results}
+        for job_id in pending:
+            self.errors.pop(job_id, None)
+        if pending:
+            asyncio.run(self._run(pending, on_result))
+        return {job_id: self.results.get(job_id, text) for job_id, text in jobs.items()}
+
+    def reset(self):
+        """清空结果表和错误记录（常驻运行时每个notebook之后调用，避免无限增长）"""
+        self.results.clear()
+        self.errors.clear()
+
+    def translate_texts(self, texts: List[str],
+                        on_result: Optional[ResultCallback] = None) -> Dict[str, str]:
+        """以原文为任务ID翻译一组文本（相同文本只请求一次）"""
+        return self.translate_all({text: text for text in texts}, on_result)
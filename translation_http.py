@@ -0,0 +1,73 @@
+"""
+共享HTTP连接池
+所有翻译后端共用一个带连接池和keep-alive的 requests.Session，
+避免每次请求重新建立TCP+TLS连接，并在传输层重试连接错误和网关错误
+"""
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PooledSession:
+    def __init__(self, pool_size: int = 16, retries: int = 2, backoff_factor: float = 0.5):
+        """
+        pool_size: 每个主机保持的最大连接数，应不小于并发数
+        retries: 传输层重试次数（连接失败、502/503/504），429由并发控制器处理
+        """
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,  # 读超时不重试，避免重复计费，由上层按过载处理
+            status=retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'GET', 'POST'}),
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+            respect_retry_after_header=False,  # 否则urllib3会在传输层等待并重试429，绕过并发控制器
+        )
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.session.post(url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.session.get(url, **kwargs)
+
+    def stats(self) -> Dict[str, float]:
+        """连接复用统计：请求数、新建连接数、复用率"""
+        connections = 0
+        request_count = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            connections += pool.num_connections
+            request_count += pool.num_requests
+        return {
+            'requests': request_count,
+            'connections': connections,
+            'reuse_rate': 1 - connections / request_count if request_count else 0.0,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_shared_session: Optional[PooledSession] = None
+_shared_lock = threading.Lock()
+
+
+def get_session() -> PooledSession:
+    """获取进程内共享的连接池，池大小取 translation_config 中的并发上限"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            import translation_config as config
+            _shared_session = PooledSession(pool_size=config.max_concurrency,
+                                            retries=config.transport_retries)
+        return _shared_session
@@ -0,0 +1,61 @@
+"""
+翻译断点日志（预写日志）
+每个片段翻译完成后立即追加一行到日志文件，进程崩溃或Ctrl-C后重新运行时直接复用，
+每个进程写自己的日志文件，避免多进程同时追加同一个文件
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+class TranslationJournal:
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.entries: Dict[str, str] = {}
+        self._file = None
+
+    def load(self) -> Dict[str, str]:
+        """读取所有进程的日志，返回 缓存键 -> 译文"""
+        self.entries = {}
+        if not self.directory.exists():
+            return self.entries
+        for path in sorted(self.directory.glob('*.jsonl')):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 崩溃时写了一半的最后一行
+                        continue
+                    self.entries[record['key']] = record['translation']
+        return self.entries
+
+    def get(self, key: str) -> Optional[str]:
+        return self.entries.get(key)
+
+    def append(self, key: str, translation: str):
+        """追加一条记录并立即刷新到磁盘"""
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{os.getpid()}.jsonl"
+            self._file = open(path, 'a', encoding='utf-8')
+        self._file.write(json.dumps({'key': key, 'translation': translation}, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.entries[key] = translation
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        """整轮翻译完成后清空日志（结果已在缓存和清单中）"""
+        self.close()
+        if self.directory.exists():
+            for path in self.directory.glob('*.jsonl'):
+                path.unlink()
+        self.entries = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,79 @@
+"""
+单元格级增量翻译清单
+每个notebook对应一个清单文件，记录 源单元格哈希 -> 翻译后的source，
+源文件修改后只有哈希变化的单元格需要重新翻译；
+整本翻译成功时还记录源文件的内容哈希，源文件只是被touch、内容未变时不必再处理
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from notebook_io import atomic_write, file_digest
+
+MANIFEST_VERSION = 1
+
+
+def cell_hash(cell: dict) -> str:
+    """计算单元格内容哈希（类型 + 源码）"""
+    source = cell.get('source', [])
+    if isinstance(source, list):
+        source = ''.join(source)
+    digest = hashlib.sha256()
+    digest.update(cell.get('cell_type', '').encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def manifest_path(target_dir: Path, target_path: Path) -> Path:
+    """清单文件路径：与 notebooks-zh/ 同级的 notebooks-zh-manifest/ 目录下，保持相对路径"""
+    relative_path = target_path.relative_to(target_dir)
+    manifest_dir = target_dir.parent / f"{target_dir.name}-manifest"
+    return manifest_dir / relative_path.with_suffix('.json')
+
+
+class NotebookManifest:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.cells: Dict[str, Union[str, List[str]]] = {}
+        self._used: Dict[str, Union[str, List[str]]] = {}
+        self.source_digest: Optional[str] = None  # 上次完整翻译时源文件的sha256
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self.cells = data.get('cells', {})
+                    self.source_digest = data.get('source_digest')
+            except (OSError, ValueError):
+                # 清单损坏时视为空清单，整本重新翻译
+                self.cells = {}
+
+    def lookup(self, key: str) -> Optional[Union[str, List[str]]]:
+        """按单元格哈希查找已有的译文，命中时返回翻译后的source"""
+        if key in self.cells:
+            self._used[key] = self.cells[key]
+            return self.cells[key]
+        return None
+
+    def record(self, key: str, translated_source: Union[str, List[str]]):
+        """记录单元格译文"""
+        self._used[key] = translated_source
+
+    def save(self):
+        """只保存本次用到的条目，已删除单元格的旧译文随之清理；内容未变化时不改写"""
+        data = {'version': MANIFEST_VERSION, 'cells': self._used}
+        if self.source_digest is not None:
+            data['source_digest'] = self.source_digest
+        atomic_write(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8'))
+        self.cells = dict(self._used)
+
+
+def source_unchanged(target_dir: Path, source_path: Path, target_path: Path) -> bool:
+    """源文件内容与上次完整翻译时相同（只是修改时间变了）"""
+    path = manifest_path(target_dir, target_path)
+    if not path.exists():
+        return False
+    digest = NotebookManifest(path).source_digest
+    return digest is not None and digest == file_digest(source_path)
@@ -0,0 +1,174 @@
+"""
+模糊翻译记忆
+用词二元组倒排索引查找与新片段相似的已译片段（例如只差一个变量名或数字的说明文字）：
+差异部分在旧译文中原样出现时直接替换复用，不发请求；否则把旧译文作为参考随请求发送
+"""
+import re
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD = re.compile(r'\w+')
+_TOKEN = re.compile(r'\w+|[^\w\s]+|\s+')
+
+
+def _shingles(text: str) -> Set[Tuple[str, str]]:
+    words = _WORD.findall(text.lower())
+    return set(zip(words, words[1:]))
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+
+class TranslationMemory:
+    def __init__(self, threshold: float = 0.85, min_words: int = 4, max_postings: int = 500):
+        """
+        threshold: 相似度阈值（按词元计算的 SequenceMatcher 比例）
+        min_words: 少于该词数的片段不建索引（太短的片段相似度没有意义）
+        max_postings: 出现次数超过该值的二元组不参与候选统计，避免常见短语拖慢查询
+        """
+        self.threshold = threshold
+        self.min_words = min_words
+        self.max_postings = max_postings
+        self.sources: List[str] = []
+        self.translations: List[str] = []
+        self._index: Dict[Tuple[str, str], List[int]] = {}
+        self._known: Set[str] = set()
+        self._lock = threading.Lock()
+        self.patched = 0
+        self.referenced = 0
+
+    def add(self, source: str, translation: str):
+        """记录一条已译片段"""
+        shingles = _shingles(source)
+        if len(shingles) + 1 < self.min_words or source == translation:
+            return
+        with self._lock:
+            if source in self._known:
+                return
+            self._known.add(source)
+            entry = len(self.sources)
+            self.sources.append(source)
+            self.translations.append(translation)
+            for shingle in shingles:
+                self._index.setdefault(shingle, []).append(entry)
+
+    def load(self, entries: Iterable[Tuple[str, str]]):
+        for source, translation in entries:
+            self.add(source, translation)
+
+    def lookup(self, text: str, candidates: int = 5) -> Optional[Tuple[str, str, float]]:
+        """返回最相似的 (原文, 译文, 相似度)，低于阈值时返回None"""
+        shingles = _shingles(text)
+        if len(shingles) + 1 < self.min_words:
+            return None
+        counts: Counter = Counter()
+        with self._lock:
+            for shingle in shingles:
+                postings = self._index.get(shingle)
+                if postings and len(postings) <= self.max_postings:
+                    counts.update(postings)
+            sources, translations = self.sources, self.translations
+        # 共享二元组太少的候选不可能达到阈值
+        minimum = len(shingles) * self.threshold / 2
+        tokens = _tokens(text)
+        best = None
+        for entry, shared in counts.most_common(candidates):
+            if shared < minimum or sources[entry] == text:
+                continue
+            matcher = SequenceMatcher(None, _tokens(sources[entry]), tokens, autojunk=False)
+            if matcher.real_quick_ratio() < self.threshold or matcher.quick_ratio() < self.threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= self.threshold and (best is None or ratio > best[2]):
+                best = (sources[entry], translations[entry], ratio)
+        return best
+
+    @staticmethod
+    def patch(source: str, translation: str, text: str) -> Optional[str]:
+        """
+        把旧原文到新原文的差异套用到旧译文上
+        只处理替换：被替换的片段（变量名、数字、占位符等）必须在旧译文中作为独立词恰好出现一次，否则返回None
+        """
+        old_tokens, new_tokens = _tokens(source), _tokens(text)
+        matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+        edits = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                continue
+            old = ''.join(old_tokens[i1:i2])
+            if tag != 'replace' or not old.strip():
+                return None
+            # 前后不能紧跟字母数字，避免把 "3" 替换进 "30"
+            found = list(re.finditer(rf'(?<![A-Za-z0-9_]){re.escape(old)}(?![A-Za-z0-9_])', translation))
+            if len(found) != 1:
+                return None
+            edits.append((found[0].start(), found[0].end(), ''.join(new_tokens[j1:j2])))
+        edits.sort()
+        parts = []
+        pos = 0
+        for start, end, new in edits:
+            if start < pos:
+                return None
+            parts.append(translation[pos:start])
+            parts.append(new)
+            pos = end
+        parts.append(translation[pos:])
+        return ''.join(parts)
+
+    def split_near_duplicates(self, texts: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        把一批待翻译片段分为 (先翻译的片段, 与其中某段相似、可等其译文进入记忆后再处理的片段)
+        """
+        batch = TranslationMemory(self.threshold, self.min_words, self.max_postings)
+        leaders: List[str] = []
+        followers: List[str] = []
+        for text in texts:
+            if batch.lookup(text) is not None:
+                followers.append(text)
+            else:
+                leaders.append(text)
+                batch.add(text, '\0')
+        return leaders, followers
+
+    def resolve(self, texts: List[str]) -> Tuple[Dict[str, str], Dict[str, Tuple[str, str]], List[str]]:
+        """
+        把待翻译片段分为三类：
+        (可直接修补复用的 片段 -> 译文, 需附带参考译文的 片段 -> (旧原文, 旧译文), 其余片段)
+        """
+        patched: Dict[str, str] = {}
+        references: Dict[str, Tuple[str, str]] = {}
+        rest: List[str] = []
+        for text in texts:
+            match = self.lookup(text)
+            if match is None:
+                rest.append(text)
+                continue
+            source, translation, _ = match
+            result = self.patch(source, translation, text)
+            if result is not None:
+                patched[text] = result
+            else:
+                references[text] = (source, translation)
+        self.patched += len(patched)
+        self.referenced += len(references)
+        return patched, references, rest
+
+
+def reference_prompt(source: str, translation: str) -> str:
+    """附在请求中的参考译文说明"""
+    return (f"参考：下面是一段相似原文及其已有译文，请保持术语和措辞一致，只翻译不同之处。\n"
+            f"相似原文：\n{source}\n参考译文：\n{translation}\n\n")
+
+
+def open_default_memory(cache) -> Optional[TranslationMemory]:
+    """按 translation_config 中的设置从缓存的最近条目建立翻译记忆，阈值为0时返回None"""
+    import translation_config as config
+    if config.memory_threshold <= 0:
+        return None
+    memory = TranslationMemory(threshold=config.memory_threshold)
+    if cache is not None:
+        memory.load(cache.recent_entries(config.memory_max_entries))
+    return memory
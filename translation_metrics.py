@@ -0,0 +1,230 @@
+"""
+翻译流程指标
+线程安全的计数器、直方图和数值指标，按标签区分（后端、密钥、notebook等），
+运行结束后写出JSON汇总和Prometheus文本格式文件；多进程时各进程的快照可合并
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def mask_key(api_key: Optional[str]) -> str:
+    """指标中只保留密钥末4位"""
+    return f"...{api_key[-4:]}" if api_key else 'none'
+
+
+class Metrics:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        # 直方图：名称 -> 标签 -> [各桶计数..., +Inf计数, 总和]
+        self.histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器加值"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """设置数值指标（如每个notebook的耗时）"""
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """记录一次观测值到直方图"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            bins = series.get(key)
+            if bins is None:
+                bins = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bins[i] += 1
+                    break
+            else:
+                bins[len(self.buckets)] += 1
+            bins[-1] += value
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """计时上下文：耗时记入直方图"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        """可序列化的快照（用于跨进程传递和合并）"""
+        with self._lock:
+            return {
+                'counters': {name: [[list(key), value] for key, value in series.items()]
+                             for name, series in self.counters.items()},
+                'gauges': {name: [[list(key), value] for key, value in series.items()]
+                           for name, series in self.gauges.items()},
+                'histograms': {name: [[list(key), list(bins)] for key, bins in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def merge(self, snapshot: dict):
+        """合并另一个进程的快照"""
+        with self._lock:
+            for name, items in snapshot.get('counters', {}).items():
+                series = self.counters.setdefault(name, {})
+                for key, value in items:
+                    key = tuple(tuple(pair) for pair in key)
+                    series[key] = series.get(key, 0) + value
+            for name, items in snapshot.get('gauges', {}).items():
+                series = self.gauges.setdefault(name, {})
+                for key, value in items:
+                    series[tuple(tuple(pair) for pair in key)] = value
+            for name, items in snapshot.get('histograms', {}).items():
+                series = self.histograms.setdefault(name, {})
+                for key, bins in items:
+                    key = tuple(tuple(pair) for pair in key)
+                    current = series.setdefault(key, [0.0] * len(bins))
+                    for i, count in enumerate(bins):
+                        current[i] += count
+
+    def _quantile(self, bins: List[float], q: float) -> float:
+        """按桶线性插值估算分位数"""
+        total = sum(bins[:-1])
+        if not total:
+            return 0.0
+        target = q * total
+        cumulative = 0.0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if cumulative + bins[i] >= target:
+                return lower + (bound - lower) * (target - cumulative) / bins[i]
+            cumulative += bins[i]
+            lower = bound
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        """JSON汇总：计数器和数值指标原样输出，直方图给出次数、总和、均值和分位数"""
+        def label_text(key: LabelKey) -> str:
+            return ','.join(f'{name}={value}' for name, value in key) or 'all'
+
+        with self._lock:
+            histograms = {}
+            for name, series in self.histograms.items():
+                histograms[name] = {}
+                for key, bins in series.items():
+                    count = sum(bins[:-1])
+                    histograms[name][label_text(key)] = {
+                        'count': count,
+                        'sum': bins[-1],
+                        'mean': bins[-1] / count if count else 0.0,
+                        'p50': self._quantile(bins, 0.50),
+                        'p95': self._quantile(bins, 0.95),
+                        'p99': self._quantile(bins, 0.99),
+                    }
+            return {
+                'counters': {name: {label_text(key): value for key, value in series.items()}
+                             for name, series in self.counters.items()},
+                'gauges': {name: {label_text(key): value for key, value in series.items()}
+                           for name, series in self.gauges.items()},
+                'histograms': histograms,
+            }
+
+    def prometheus_text(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f'# TYPE {name} counter')
+                lines.extend(f'{name}{_format_labels(key)} {value:g}' for key, value in sorted(series.items()))
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f'# TYPE {name} gauge')
+                lines.extend(f'{name}{_format_labels(key)} {value:g}' for key, value in sorted(series.items()))
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {name} histogram')
+                for key, bins in sorted(series.items()):
+                    cumulative = 0.0
+                    for bound, count in zip(self.buckets, bins):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(key, ("le", f"{bound:g}"))} {cumulative:g}')
+                    cumulative += bins[len(self.buckets)]
+                    lines.append(f'{name}_bucket{_format_labels(key, ("le", "+Inf"))} {cumulative:g}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {bins[-1]:g}')
+                    lines.append(f'{name}_count{_format_labels(key)} {cumulative:g}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Union[str, Path]):
+        """写出 <path>.json 汇总和 <path>.prom 文本"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        with open(path.with_suffix('.prom'), 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """进程内共享的指标"""
+    return _metrics
+
+
+def default_metrics_path() -> Path:
+    """按 translation_config 中的设置返回指标文件路径（不含扩展名）"""
+    import translation_config as config
+    return Path(__file__).parent / config.metrics_path
+
+
+def record_response(response, model: str, api_key: Optional[str], latency: float,
+                    prompt_text: str = '', translated: Optional[str] = None):
+    """记录一次API请求：延迟、状态码、收发字节、429（按密钥）以及成功时的令牌数"""
+    from translation_packing import estimate_tokens
+    metrics = get_metrics()
+    metrics.observe('translation_request_seconds', latency, model=model)
+    metrics.inc('translation_requests_total', model=model, status=response.status_code)
+    body = response.request.body if response.request is not None else None
+    metrics.inc('translation_bytes_sent_total', len(body or b''), model=model)
+    metrics.inc('translation_bytes_received_total', len(response.content or b''), model=model)
+    if response.status_code == 429:
+        metrics.inc('translation_rate_limited_total', key=mask_key(api_key))
+    if translated is None:
+        return
+    usage = {}
+    try:
+        usage = response.json().get('usage') or {}
+    except (ValueError, AttributeError):
+        pass
+    metrics.inc('translation_tokens_total', usage.get('prompt_tokens') or estimate_tokens(prompt_text),
+                direction='in', model=model)
+    metrics.inc('translation_tokens_total', usage.get('completion_tokens') or estimate_tokens(translated),
+                direction='out', model=model)
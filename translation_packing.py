@@ -0,0 +1,110 @@
+"""
+多片段请求打包
+把一个notebook中的短文本（代码注释、短markdown单元格）按 max_tokens 预算合并成少量请求，
+片段之间用编号标记分隔，返回后按标记拆分回各个片段
+"""
+import re
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+PACK_HEADER = "以下是多个独立片段，每个片段以 <<<编号>>> 开头。请逐段翻译，原样保留每个编号标记及其顺序，不要合并或省略片段。"
+MARKER_PATTERN = re.compile(r'<{2,3}\s*(\d+)\s*>{2,3}')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计令牌数：英文约4个字符一个令牌，中文等非ASCII字符约一个字符一个令牌"""
+    ascii_count = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_count + 3) // 4 + (len(text) - ascii_count)
+
+
+def pack_segments(texts: List[str], max_tokens: int, short_tokens: int = 200,
+                  max_segments: int = 40) -> List[List[str]]:
+    """
+    将文本分组：短文本按令牌预算合并，长文本单独成组
+    译文长度与原文相近，预算取 max_tokens 的一半给输出留余量
+    """
+    budget = max_tokens // 2
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if tokens > short_tokens:
+            batches.append([text])
+            continue
+        if current and (current_tokens + tokens > budget or len(current) >= max_segments):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens + 3  # 编号标记的开销
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_packed_text(batch: List[str]) -> str:
+    """用编号标记拼接片段"""
+    parts = [PACK_HEADER]
+    for i, text in enumerate(batch, 1):
+        parts.append(f"<<<{i}>>>\n{text}")
+    return '\n\n'.join(parts)
+
+
+def split_packed_text(translated: str, count: int) -> List[str]:
+    """按编号标记拆分译文，标记缺失、重复或乱序时返回空列表"""
+    matches = list(MARKER_PATTERN.finditer(translated))
+    if [int(m.group(1)) for m in matches] != list(range(1, count + 1)):
+        return []
+    segments = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(translated)
+        segments.append(translated[match.end():end].strip())
+    return segments
+
+
+def translate_packed(engine, texts: List[str], max_tokens: int, short_tokens: int = 200,
+                     max_segments: int = 40,
+                     on_segment: Optional[Callable[[str, str], None]] = None) -> Tuple[Dict[str, str], Set[str]]:
+    """
+    通过并发引擎打包翻译文本
+    返回 (原文 -> 译文, 翻译失败的原文集合)；打包请求失败或无法拆分时逐段重新请求
+    on_segment: 每个片段翻译完成后立即调用 (原文, 译文)
+    """
+    batches = pack_segments(texts, max_tokens, short_tokens, max_segments)
+    packed = {build_packed_text(batch) if len(batch) > 1 else batch[0]: batch for batch in batches}
+
+    def handle_result(job_id: str, translated: str):
+        batch = packed.get(job_id, [job_id])
+        if len(batch) == 1:
+            on_segment(batch[0], translated)
+        else:
+            for text, segment in zip(batch, split_packed_text(translated, len(batch))):
+                on_segment(text, segment)
+
+    callback = handle_result if on_segment is not None else None
+    packed_results = engine.translate_texts(list(packed), callback)
+
+    results: Dict[str, str] = {}
+    retry: List[str] = []
+    for packed_text, batch in packed.items():
+        if packed_text in engine.errors:
+            if len(batch) > 1:
+                retry.extend(batch)
+            continue
+        if len(batch) == 1:
+            results[batch[0]] = packed_results[packed_text]
+            continue
+        segments = split_packed_text(packed_results[packed_text], len(batch))
+        if segments:
+            results.update(zip(batch, segments))
+        else:
+            retry.extend(batch)
+
+    if retry:
+        print(f"    {len(retry)} 个片段无法从打包结果中拆分，逐段重新翻译...")
+        retried = engine.translate_texts(retry, callback)
+        results.update((text, retried[text]) for text in retry if text not in engine.errors)
+
+    failed = {text for text in texts if text not in results}
+    for text in failed:
+        results[text] = text
+    return results, failed
@@ -0,0 +1,232 @@
+"""
+全库翻译规划
+翻译前扫描所有待翻译notebook，收集每个单元格经过保护和注释提取后的待翻译片段，
+按内容去重：-Copy1、-checkpoint 等副本中的相同片段只翻译一次，结果分发给所有包含它的notebook
+也可单独运行，估算一轮翻译的请求数、令牌、费用和耗时并输出JSON计划：
+    python translation_planner.py --keys 3 --output plan.json
+"""
+import argparse
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from notebook_io import NotebookDocument
+from translation_manifest import NotebookManifest, cell_hash, manifest_path
+from translation_packing import build_packed_text, estimate_tokens, pack_segments
+
+
+class CorpusPlan:
+    def __init__(self):
+        self.notebooks: List[Path] = []
+        self.sizes: List[int] = []  # 各notebook的待翻译片段数
+        self.segments: Dict[str, List[int]] = {}  # 片段 -> 包含它的notebook序号
+        self.occurrences = 0  # 各notebook内去重后的片段数之和
+
+    def add(self, notebook: Path, texts: List[str]):
+        index = len(self.notebooks)
+        self.notebooks.append(notebook)
+        self.sizes.append(len(set(texts)))
+        for text in dict.fromkeys(texts):
+            self.segments.setdefault(text, []).append(index)
+            self.occurrences += 1
+
+    @property
+    def unique(self) -> List[str]:
+        return list(self.segments)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """去重节省的片段比例"""
+        return 1 - len(self.segments) / self.occurrences if self.occurrences else 0.0
+
+    def redundant_notebooks(self) -> List[Path]:
+        """所有片段都在其他notebook中出现过的notebook（通常是副本和检查点）"""
+        first_seen = {text: owners[0] for text, owners in self.segments.items()}
+        owned = set(first_seen.values())
+        return [path for i, path in enumerate(self.notebooks) if self.sizes[i] and i not in owned]
+
+    def shards(self, count: int) -> List[List[str]]:
+        """把去重后的片段轮流分成 count 份，供多个进程分别翻译"""
+        unique = self.unique
+        return [shard for shard in (unique[i::count] for i in range(max(1, count))) if shard]
+
+    def print_report(self):
+        print(f"去重规划: {len(self.notebooks)} 个notebook, 片段 {self.occurrences} 处, "
+              f"去重后 {len(self.segments)} 段 (节省 {self.dedup_ratio:.0%})")
+        redundant = self.redundant_notebooks()
+        if redundant:
+            print(f"  {len(redundant)} 个notebook的内容完全与其他notebook重复（副本或检查点）")
+
+
+def plan_corpus(translator, notebooks: List[Tuple[Path, Path]],
+                target_dir: Optional[Path] = None) -> CorpusPlan:
+    """
+    预演所有notebook的翻译，收集待翻译片段
+    translator: 提供 collect_texts(cells) 的翻译器
+    target_dir: 给出时跳过清单中已有译文的未变化单元格
+    """
+    plan = CorpusPlan()
+    for source_path, target_path in notebooks:
+        with NotebookDocument(source_path) as notebook:
+            cells = notebook.cells
+            if target_dir is not None:
+                manifest = NotebookManifest(manifest_path(target_dir, target_path))
+                cells = [cell for cell in cells if manifest.lookup(cell_hash(cell)) is None]
+            plan.add(source_path, translator.collect_texts(cells))
+    return plan
+
+
+def _balance(loads: List[float], bins: int) -> Tuple[List[List[int]], List[float]]:
+    """最长处理时间优先：把各项分配到负载最小的箱子，返回 (各箱的项序号, 各箱负载)"""
+    heap = [(0.0, i) for i in range(max(1, bins))]
+    assigned: List[List[int]] = [[] for _ in heap]
+    totals = [0.0] * len(heap)
+    for item in sorted(range(len(loads)), key=lambda i: loads[i], reverse=True):
+        total, slot = heapq.heappop(heap)
+        assigned[slot].append(item)
+        totals[slot] = total + loads[item]
+        heapq.heappush(heap, (totals[slot], slot))
+    return assigned, totals
+
+
+def estimate_run(plan: CorpusPlan, prompt_tokens: int, key_count: int, cached: Optional[Set[str]] = None,
+                 root: Optional[Path] = None) -> dict:
+    """
+    估算翻译一轮的请求数、令牌数、费用和耗时，返回可写成JSON的计划
+    prompt_tokens: 每个请求中提示词模板的令牌数
+    cached: 已在缓存中、无需请求的片段
+    结果中的 keys 按令牌数把notebook均分给各个密钥，可据此把一轮翻译拆给不同密钥分别运行
+    耗时不计 config.request_delay：自适应并发控制器取代了每次请求后的固定间隔，该设置已不起作用
+    """
+    import translation_config as config
+    cached = cached or set()
+    pending = [text for text in plan.segments if text not in cached]
+
+    # 每个片段计入第一个包含它的notebook
+    per_notebook: List[List[str]] = [[] for _ in plan.notebooks]
+    for text in pending:
+        per_notebook[plan.segments[text][0]].append(text)
+
+    def cost_of(texts: List[str]) -> dict:
+        batches = pack_segments(texts, config.max_tokens, config.pack_short_tokens, config.pack_max_segments)
+        input_tokens = output_tokens = 0
+        durations = []
+        for batch in batches:
+            text_tokens = sum(estimate_tokens(text) for text in batch)
+            overhead = prompt_tokens + (estimate_tokens(build_packed_text(batch)) - text_tokens
+                                        if len(batch) > 1 else 0)
+            output = int(text_tokens * config.estimated_output_ratio)
+            input_tokens += text_tokens + overhead
+            output_tokens += output
+            durations.append(config.estimated_base_latency + output / config.estimated_output_speed)
+        return {
+            'segments': len(texts),
+            'requests': len(batches),
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'cost': (input_tokens * config.price_per_1k_input + output_tokens * config.price_per_1k_output) / 1000,
+            'durations': durations,
+        }
+
+    def relative(path: Path) -> str:
+        return str(path.relative_to(root)) if root is not None else str(path)
+
+    notebooks = [cost_of(texts) for texts in per_notebook]
+    total = cost_of(pending)
+    durations = total.pop('durations')
+    concurrency = max(1, config.max_workers * key_count)
+    _, slots = _balance(durations, concurrency)
+    _, peak_slots = _balance(durations, max(concurrency, config.max_concurrency))
+
+    # 按令牌数把notebook分给各个密钥
+    loads = [item['input_tokens'] + item['output_tokens'] for item in notebooks]
+    assigned, _ = _balance(loads, key_count)
+    keys = []
+    for key_index, items in enumerate(assigned):
+        share = [notebooks[i] for i in items]
+        keys.append({
+            'key': key_index,
+            'notebooks': sorted(relative(plan.notebooks[i]) for i in items),
+            'requests': sum(item['requests'] for item in share),
+            'input_tokens': sum(item['input_tokens'] for item in share),
+            'output_tokens': sum(item['output_tokens'] for item in share),
+            'cost': sum(item['cost'] for item in share),
+        })
+
+    return {
+        'model': config.model,
+        'notebooks': len(plan.notebooks),
+        'segment_occurrences': plan.occurrences,
+        'unique_segments': len(plan.segments),
+        'cached_segments': len(plan.segments) - len(pending),
+        'dedup_ratio': plan.dedup_ratio,
+        **total,
+        'concurrency': concurrency,
+        'wall_time': max(slots) if durations else 0.0,
+        'wall_time_at_max_concurrency': max(peak_slots) if durations else 0.0,
+        'per_notebook': [
+            {'path': relative(path), **{k: v for k, v in item.items() if k != 'durations'}}
+            for path, item in zip(plan.notebooks, notebooks) if item['segments']
+        ],
+        'keys': keys,
+    }
+
+
+def estimate_for(translator, plan: CorpusPlan, key_count: int, cache=None,
+                 root: Optional[Path] = None) -> dict:
+    """用翻译器的提示词模板和缓存估算 plan 的开销"""
+    cached = set()
+    if cache is not None:
+        cached = {text for text in plan.segments if cache.contains(translator.cache_key(text))}
+    prompt = translator.build_payload('')
+    prompt_tokens = sum(estimate_tokens(message['content']) for message in prompt['messages'])
+    return estimate_run(plan, prompt_tokens, max(1, key_count), cached, root)
+
+
+def print_estimate(estimate: dict):
+    print(f"预计: {estimate['requests']} 次请求 ({estimate['segments']} 段待翻译, "
+          f"{estimate['cached_segments']} 段已缓存)")
+    print(f"  令牌: 输入约 {estimate['input_tokens']}, 输出约 {estimate['output_tokens']}, "
+          f"费用约 ${estimate['cost']:.4f}")
+    print(f"  耗时: 并发 {estimate['concurrency']} 时约 {estimate['wall_time'] / 60:.1f} 分钟, "
+          f"达到并发上限时约 {estimate['wall_time_at_max_concurrency'] / 60:.1f} 分钟")
+
+
+def main():
+    """只做规划不翻译：估算一轮翻译的开销并输出JSON计划"""
+    from ai_translate_simple import AITranslator, find_notebooks_to_translate
+    from translation_cache import open_default_cache
+    import translation_config as config
+
+    parser = argparse.ArgumentParser(description="估算翻译的请求数、令牌、费用和耗时")
+    parser.add_argument('--keys', type=int, default=len(config.api_keys), help="API密钥数")
+    parser.add_argument('--target-dir', default=None, help="译文目录（默认 notebooks-zh）")
+    parser.add_argument('--output', default=None, help="JSON计划输出路径")
+    parser.add_argument('--no-cache', action='store_true', help="不扣除已缓存的片段")
+    args = parser.parse_args()
+
+    root_dir = Path(__file__).parent.resolve()
+    target_dir = Path(args.target_dir).resolve() if args.target_dir else root_dir / 'notebooks-zh'
+    translator = AITranslator(['plan'], config.base_url, config.model)
+    notebooks = find_notebooks_to_translate(root_dir, target_dir)
+    plan = plan_corpus(translator, notebooks, target_dir)
+    plan.print_report()
+
+    cache = None if args.no_cache else open_default_cache()
+    estimate = estimate_for(translator, plan, args.keys, cache, root_dir)
+    if cache is not None:
+        cache.close()
+    print_estimate(estimate)
+    for item in estimate['keys']:
+        print(f"  密钥 {item['key'] + 1}: {len(item['notebooks'])} 个notebook, {item['requests']} 次请求, "
+              f"费用约 ${item['cost']:.4f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(estimate, f, ensure_ascii=False, indent=2)
+        print(f"计划已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
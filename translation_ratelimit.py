@@ -0,0 +1,105 @@
+"""
+自适应并发控制（AIMD：加性增、乘性减）
+延迟平稳时逐步提高并发数，遇到429或超时时并发数减半并暂停请求，
+优先按服务端返回的 Retry-After 等待
+"""
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class OverloadError(Exception):
+    """服务端过载（超时等），需要降低并发"""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.result: Optional[str] = None  # 对冲请求中备用后端已给出的译文，无需重试
+
+
+class RateLimitError(OverloadError):
+    """HTTP 429 请求过多"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或HTTP日期），返回等待秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """没有 Retry-After 时的指数退避时间"""
+    return min(cap, base * (2 ** attempt))
+
+
+class AIMDController:
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = 16,
+                 increase: float = 1.0, decrease: float = 0.5, latency_tolerance: float = 1.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency: Optional[float] = None      # 延迟的指数移动平均
+        self.min_latency: Optional[float] = None  # 观察到的最低平均延迟
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.overloads = 0
+        self._last_decrease = 0.0
+        self._consecutive_overloads = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def attach(self):
+        """在新的事件循环中使用前调用"""
+        self._condition = asyncio.Condition()
+        self.in_flight = 0
+
+    async def acquire(self):
+        """等待暂停结束且在途请求数低于当前并发上限"""
+        while True:
+            delay = self.resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            async with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                await self._condition.wait()
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, latency: float):
+        """请求成功：延迟没有明显上升时加性增加并发"""
+        self._consecutive_overloads = 0
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if self.min_latency is None or self.latency < self.min_latency:
+            self.min_latency = self.latency
+        if self.latency <= self.min_latency * self.latency_tolerance:
+            # 每完成约一轮（limit个）请求并发数加一
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def on_overload(self, retry_after: Optional[float] = None):
+        """429或超时：乘性减少并发并暂停请求"""
+        now = time.monotonic()
+        self.overloads += 1
+        # 同一轮拥塞中的多个失败只减一次
+        if now - self._last_decrease > (self.latency or 1.0):
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._last_decrease = now
+        delay = retry_after if retry_after is not None else backoff_delay(self._consecutive_overloads)
+        self._consecutive_overloads += 1
+        self.resume_at = max(self.resume_at, now + delay)
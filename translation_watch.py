@@ -0,0 +1,260 @@
+"""
+监视模式：持续增量翻译
+常驻运行，在内存中保存notebook路径、修改时间和单元格哈希的索引。轮询时只重新列出修改时间变化的目录，
+其余只对已知文件做一次stat，不再每轮 rglob 全库；源文件变化（且停止修改 settle 秒后）时在后台线程中
+重新翻译，清单中未变化的单元格直接复用，只请求变化的单元格；请求经同一个自适应并发引擎发出。
+    python translation_watch.py --interval 2
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import translation_config as config
+from ai_translate_simple import SKIP_DIRS, AITranslator, find_notebooks_to_translate, translate_notebook
+from notebook_io import NotebookDocument
+from translation_cache import open_default_cache
+from translation_client import open_registry
+from translation_engine import TranslationEngine
+from translation_manifest import NotebookManifest, cell_hash, manifest_path
+from translation_memory import open_default_memory
+from translation_metrics import default_metrics_path, get_metrics
+
+
+def _skipped(name: str) -> bool:
+    return any(skip in name.lower() for skip in SKIP_DIRS)
+
+
+class NotebookIndex:
+    def __init__(self, root: Path):
+        self.root = root
+        self.dirs: Dict[Path, int] = {}  # 目录 -> 修改时间(ns)
+        self.files: Dict[Path, Tuple[int, int]] = {}  # notebook -> (修改时间(ns), 大小)
+        self.cells: Dict[Path, List[str]] = {}  # notebook -> 各单元格哈希
+
+    def _list_dir(self, directory: Path, changed: List[Path]):
+        """列出目录：记录子目录和notebook，新出现的notebook加入 changed"""
+        try:
+            self.dirs[directory] = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            self.dirs.pop(directory, None)
+            return
+        for entry in entries:
+            if _skipped(entry.name):
+                continue
+            path = Path(entry.path)
+            if entry.is_dir(follow_symlinks=False):
+                if path not in self.dirs:
+                    self._list_dir(path, changed)
+            elif entry.name.endswith('.ipynb') and path not in self.files:
+                stat = entry.stat()
+                self.files[path] = (stat.st_mtime_ns, stat.st_size)
+                changed.append(path)
+
+    def scan(self) -> List[Path]:
+        """首次完整扫描，返回所有notebook"""
+        found: List[Path] = []
+        self._list_dir(self.root, found)
+        for path in found:
+            self.refresh_cells(path)
+        return found
+
+    def poll(self) -> Tuple[List[Path], List[Path]]:
+        """
+        检查变化，返回 (新增或修改的notebook, 删除的notebook)
+        只有修改时间变化的目录才重新列出，已知文件各stat一次
+        """
+        changed: List[Path] = []
+        removed: List[Path] = []
+        for directory, mtime in list(self.dirs.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                # 目录已删除，其下的目录和文件随后在stat时清理
+                del self.dirs[directory]
+                continue
+            if current != mtime:
+                self._list_dir(directory, changed)
+        for path, signature in list(self.files.items()):
+            if path in changed:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.files[path]
+                self.cells.pop(path, None)
+                removed.append(path)
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != signature:
+                self.files[path] = (stat.st_mtime_ns, stat.st_size)
+                changed.append(path)
+        return changed, removed
+
+    def refresh_cells(self, path: Path) -> Optional[int]:
+        """重新计算单元格哈希，返回与上次相比新增或变化的单元格数（无法解析时返回None）"""
+        try:
+            with NotebookDocument(path) as notebook:
+                keys = [cell_hash(cell) for cell in notebook.cells]
+        except (OSError, ValueError):
+            # 正在写入或格式错误，等下次修改后再处理
+            return None
+        previous = set(self.cells.get(path, ()))
+        self.cells[path] = keys
+        return sum(1 for key in keys if key not in previous)
+
+
+class TranslationWatcher:
+    def __init__(self, translator: AITranslator, engine: TranslationEngine, root: Path, target_dir: Path,
+                 interval: float = 2.0, settle: float = 1.0):
+        """
+        interval: 轮询间隔（秒）
+        settle: 文件停止修改该时长后才翻译，避免编辑器保存过程中读到半个文件
+        """
+        self.translator = translator
+        self.engine = engine
+        self.root = root
+        self.target_dir = target_dir
+        self.interval = interval
+        self.settle = settle
+        self.index = NotebookIndex(root)
+        self.translated = 0
+        self._waiting: Dict[Path, float] = {}  # notebook -> 最后一次变化的时间
+        self._queue: "queue.Queue[Optional[Path]]" = queue.Queue()
+        self._queued: set = set()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._work, name='translation-watch', daemon=True)
+
+    def target_for(self, source_path: Path) -> Path:
+        return self.target_dir / source_path.relative_to(self.root)
+
+    def _enqueue(self, path: Path):
+        with self._lock:
+            if path in self._queued:
+                return
+            self._queued.add(path)
+        self._queue.put(path)
+
+    def _work(self):
+        """后台线程：逐个翻译排队的notebook，单个notebook出错时记录后继续"""
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            with self._lock:
+                self._queued.discard(path)
+            try:
+                self._translate(path)
+            except Exception:
+                print(f"翻译 {path} 时出错:")
+                traceback.print_exc()
+                get_metrics().inc('translation_watch_notebooks_total', result='error')
+            finally:
+                # 结果表只在一个notebook内使用：清空后失败的文本下次重新请求，内存也不会随运行时间增长
+                self.translator.reset()
+                self.engine.reset()
+
+    def _translate(self, path: Path):
+        if not path.exists():
+            return
+        metrics = get_metrics()
+        target_path = self.target_for(path)
+        manifest = NotebookManifest(manifest_path(self.target_dir, target_path))
+        start = time.perf_counter()
+        ok = translate_notebook(self.translator, path, target_path, self.engine, manifest)
+        metrics.set('translation_notebook_seconds', time.perf_counter() - start,
+                    notebook=target_path.relative_to(self.target_dir).as_posix())
+        metrics.inc('translation_watch_notebooks_total', result='ok' if ok else 'failed')
+        metrics.write(default_metrics_path())
+        self.translated += 1
+
+    def start(self):
+        """首次扫描：建立索引，翻译已过期的notebook"""
+        found = self.index.scan()
+        print(f"监视 {self.root}: {len(found)} 个notebook, {len(self.index.dirs)} 个目录")
+        self._worker.start()
+        for source_path, _ in find_notebooks_to_translate(self.root, self.target_dir):
+            if source_path in self.index.files:
+                self._enqueue(source_path)
+
+    def poll_once(self):
+        """检查一次变化，把已稳定的变化notebook排入翻译队列"""
+        changed, removed = self.index.poll()
+        now = time.monotonic()
+        for path in changed:
+            self._waiting[path] = now
+        for path in removed:
+            self._waiting.pop(path, None)
+            print(f"已删除: {path.relative_to(self.root)}（保留已有译文）")
+        for path, changed_at in list(self._waiting.items()):
+            if now - changed_at < self.settle:
+                continue
+            del self._waiting[path]
+            previous = self.index.cells.get(path)
+            changed_cells = self.index.refresh_cells(path)
+            if changed_cells is None:
+                continue
+            get_metrics().inc('translation_watch_changes_total')
+            if self.index.cells[path] == previous and self.target_for(path).exists():
+                # 只有修改时间变化，单元格内容和顺序都没变
+                continue
+            # 删除或调整顺序的单元格在清单中都有译文，重新写出时不发请求
+            print(f"变化: {path.relative_to(self.root)}（{changed_cells} 个单元格需要翻译）")
+            self._enqueue(path)
+
+    def run(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.poll_once()
+        finally:
+            self.stop()
+
+    def stop(self, wait: bool = True):
+        self._queue.put(None)
+        if wait and self._worker.is_alive():
+            self._worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监视源notebook，变化时增量翻译")
+    parser.add_argument('--interval', type=float, default=2.0, help="轮询间隔（秒）")
+    parser.add_argument('--settle', type=float, default=1.0, help="文件停止修改多久后开始翻译（秒）")
+    parser.add_argument('--target-dir', default=None, help="译文目录（默认 notebooks-zh）")
+    args = parser.parse_args()
+
+    api_keys = [key.strip() for item in config.api_keys for key in item.split(',') if key.strip()]
+    # 与批量翻译脚本一样，示例密钥（your-api-key-N）视为未配置
+    if not api_keys or any(key.startswith('your-api-key') for key in api_keys):
+        print("错误: 请配置API密钥!")
+        print("编辑 translation_config.py，将 api_keys 中的示例密钥替换为真实密钥")
+        return
+
+    root_dir = Path(__file__).parent.resolve()
+    target_dir = Path(args.target_dir).resolve() if args.target_dir else root_dir / 'notebooks-zh'
+
+    translator = AITranslator(api_keys, config.base_url, config.model)
+    translator.cache = open_default_cache()
+    translator.memory = open_default_memory(translator.cache)
+    registry = open_registry(translator)
+    engine = TranslationEngine(registry.request, api_keys, max_workers=config.max_workers,
+                               max_retries=config.max_retries, max_concurrency=config.max_concurrency)
+
+    watcher = TranslationWatcher(translator, engine, root_dir, target_dir, args.interval, args.settle)
+    print("按 Ctrl+C 停止")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print(f"\n已停止，共翻译 {watcher.translated} 次")
+    finally:
+        registry.close()
+        translator.cache.close()
+
+
+if __name__ == "__main__":
+    main()